@@ -1,9 +1,76 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from routers import transaction_router
 from logging_utils import get_logger
+from metrics_utils import render_metrics
+from services.stream_consumer import STREAM, DetectionConsumer
+from services.merchant_sketch import MERCHANT_SKETCHES
+from services.notification_broker import NOTIFICATION_BROKER
+from services.blocking_io import shutdown_executors
+from services.idempotency import IDEMPOTENCY_STORE, purge_expired_keys
+from services.admission_control import AdmissionControlMiddleware
+from services.archive_service import ARCHIVE_RETENTION_MONTHS, archive_expired
+from db.db import SessionLocal, async_engine, engine
+from db.partitions import maintain_partitions
+from db.replica import REPLICA_HEALTH
 
-app = FastAPI()
+LOGGER = get_logger("BankIQ-Guardian")
+
+
+def load_merchant_sketches():
+    """
+    Restore merchant sketches from disk, then catch up from the ledger.
+    An unreadable file is ignored, so the whole ledger is replayed instead.
+    """
+    try:
+        loaded = MERCHANT_SKETCHES.load()
+    except Exception as e:
+        LOGGER.warning(f"Merchant sketch file unreadable, rebuilding from the ledger: {e}")
+        loaded = False
+    try:
+        db = SessionLocal()
+        try:
+            added = MERCHANT_SKETCHES.load_from_ledger(db)
+        finally:
+            db.close()
+        LOGGER.info(f"Merchant sketches ready ({len(MERCHANT_SKETCHES)} users, {added} ledger rows replayed, from disk: {loaded})")
+    except Exception as e:
+        LOGGER.warning(f"Merchant sketch ledger catch-up skipped: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_merchant_sketches()
+    consumer = None
+    if STREAM is not None:
+        consumer = DetectionConsumer(
+            STREAM,
+            slow_path=transaction_router.block_streamed_transaction,
+            fast_path=transaction_router.approve_streamed_transaction,
+        )
+        await consumer.start()
+    background = [asyncio.create_task(purge_expired_keys(IDEMPOTENCY_STORE))]
+    if NOTIFICATION_BROKER.fanout is not None:
+        background.append(asyncio.create_task(NOTIFICATION_BROKER.listen()))
+    if REPLICA_HEALTH.configured:
+        background.append(asyncio.create_task(REPLICA_HEALTH.monitor()))
+    # upcoming monthly partitions, plus archival when a retention window is set
+    archive = (lambda: archive_expired(engine)) if ARCHIVE_RETENTION_MONTHS > 0 else None
+    background.append(asyncio.create_task(maintain_partitions(engine, archive=archive)))
+    yield
+    for task in background:
+        task.cancel()
+    if consumer is not None:
+        await consumer.stop()
+    MERCHANT_SKETCHES.save()
+    shutdown_executors()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.title = "guardian"
 
 api = FastAPI(root_path="/api")
@@ -12,6 +79,8 @@ app.mount("/api", api, name="api")
 
 
 api.include_router(transaction_router.router, prefix="/transactions")
+# token buckets in front of the LLM-backed verification routes
+api.add_middleware(AdmissionControlMiddleware)
 origins = ["http://localhost:5173"]
 app.add_middleware(
     CORSMiddleware,
@@ -21,17 +90,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-LOGGER = get_logger("BankIQ-Guardian")
-
-
-# Dummy in-memory database
-TRANSACTIONS_DB = []
-
-NOTIFICATIONS_DB = []
-
 
 @api.get("/healthcheck")
 async def api_healthcheck():
     return {"status": "guardian api is running"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return render_metrics()
@@ -1,7 +1,10 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from db.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_pool
 
 # Load environment variables
 load_dotenv()
@@ -12,27 +15,108 @@ DATABASE_URL = os.getenv(
     "sqlite:///./app.db"  # Default to SQLite for local development
 )
 
-# SQLite-specific connection args
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# Pool sizing. Every pod holds up to (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# connections per engine (sync and async), so size these against the
+# Postgres max_connections budget divided by the HPA max replicas
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))        # seconds to wait for a connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))        # recycle connections after 1 hour
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = no limit
+
+def pool_options(url: str = DATABASE_URL, async_driver: bool = False) -> dict:
+    """Engine keyword arguments for pooling and per-statement timeouts."""
+    if url.startswith("sqlite"):
+        # SQLite-specific connection args; its pools are not size-limited
+        return {"connect_args": {} if async_driver else {"check_same_thread": False}}
+
+    options = {
+        "poolclass": TimedAsyncAdaptedQueuePool if async_driver else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "connect_args": {},
+    }
+    if DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
 
 # Create engine
 engine = create_engine(
     DATABASE_URL,
-    connect_args=connect_args,
     pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,   # Recycle connections after 1 hour
+    pool_recycle=DB_POOL_RECYCLE,
+    **pool_options(),
 )
+instrument_pool(engine, "sync")
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency for FastAPI to get database session"""
-    db = SessionLocal()
-    try:
+def insert_for(dialect_name: str):
+    """`insert` construct with ON CONFLICT support for the given dialect (Postgres or SQLite)"""
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)"""
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+# Async engine for the API; the sync engine above stays for scripts and
+# background work that runs outside the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    **pool_options(async_driver=True),
+)
+instrument_pool(async_engine.sync_engine, "async")
+
+# expire_on_commit=False: attributes stay loaded after commit, since lazy
+# refreshes are not possible on an AsyncSession outside an await
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica. Without DATABASE_READ_URL the read factories are
+# the primary ones; see db/replica.py for how reads are routed
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+        **pool_options(DATABASE_READ_URL),
+    )
+    instrument_pool(read_engine, "sync_read")
+    async_read_engine = create_async_engine(
+        os.getenv("ASYNC_DATABASE_READ_URL", to_async_url(DATABASE_READ_URL)),
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+        **pool_options(DATABASE_READ_URL, async_driver=True),
+    )
+    instrument_pool(async_read_engine.sync_engine, "async_read")
+    ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+    AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+else:
+    read_engine = None
+    async_read_engine = None
+    ReadSessionLocal = SessionLocal
+    AsyncReadSessionLocal = AsyncSessionLocal
+
+
+async def get_db():
+    """Dependency for FastAPI to get an async database session"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,143 @@
+"""
+Versioned schema migrations.
+
+Each module in db/migrations/versions is named NNNN_description.py and
+defines `upgrade(conn)`; applied versions are recorded in the
+schema_migrations table, so every database moves through the same steps
+in the same order. A module may set `TRANSACTIONAL = False` when its
+statements cannot run inside a transaction (CREATE INDEX CONCURRENTLY).
+"""
+
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from datetime import datetime
+from types import ModuleType
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from db.migrations import versions
+
+MIGRATIONS_TABLE = "schema_migrations"
+_ADVISORY_LOCK_ID = 72_201_611  # serializes concurrent migration runs on Postgres
+
+_metadata = MetaData()
+schema_migrations = Table(
+    MIGRATIONS_TABLE,
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+
+def discover() -> list[Migration]:
+    """All migrations in version order."""
+    migrations = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        number, _, name = info.name.partition("_")
+        if not number.isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        migrations.append(Migration(int(number), name, module))
+    migrations.sort(key=lambda m: m.version)
+    seen = set()
+    for m in migrations:
+        if m.version in seen:
+            raise RuntimeError(f"Duplicate migration version {m.version:04d}")
+        seen.add(m.version)
+    return migrations
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    if not inspect(conn).has_table(MIGRATIONS_TABLE):
+        return set()
+    return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+def pending(engine: Engine) -> list[Migration]:
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    return [m for m in discover() if m.version not in done]
+
+
+def migrate(engine: Engine, target: int | None = None, log=print) -> list[Migration]:
+    """Apply pending migrations up to `target` (default: latest). Returns those applied."""
+    applied = []
+    with engine.connect() as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            conn.commit()
+        try:
+            schema_migrations.create(conn, checkfirst=True)
+            conn.commit()
+            done = applied_versions(conn)
+            conn.commit()
+            for migration in discover():
+                if migration.version in done or (target is not None and migration.version > target):
+                    continue
+                log(f"Applying migration {migration.version:04d}_{migration.name}")
+                if migration.transactional:
+                    with conn.begin():
+                        migration.module.upgrade(conn)
+                        _record(conn, migration)
+                else:
+                    conn.execution_options(isolation_level="AUTOCOMMIT")
+                    try:
+                        migration.module.upgrade(conn)
+                        _record(conn, migration)
+                    finally:
+                        conn.commit()  # end the autobegun (no-op) transaction
+                        conn.execution_options(isolation_level=conn.default_isolation_level)
+                applied.append(migration)
+        finally:
+            if is_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ADVISORY_LOCK_ID})
+                conn.commit()
+    return applied
+
+
+def _record(conn: Connection, migration: Migration):
+    conn.execute(schema_migrations.insert().values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+    ))
+
+
+# Helpers for migration modules
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def create_index(conn: Connection, name: str, table: str, columns: list[str],
+                 unique: bool = False, include: list[str] | None = None):
+    """
+    CREATE INDEX IF NOT EXISTS. On Postgres the index is built CONCURRENTLY
+    when the connection is in autocommit mode, so writes are not blocked,
+    and `include` adds covering columns.
+    """
+    concurrently = ""
+    suffix = ""
+    if conn.dialect.name == "postgresql":
+        if conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+            concurrently = "CONCURRENTLY "
+        if include:
+            suffix = f" INCLUDE ({', '.join(include)})"
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {concurrently}IF NOT EXISTS {name} "
+        f"ON {table} ({', '.join(columns)}){suffix}"
+    ))
@@ -0,0 +1,39 @@
+"""Tables as first deployed: transactions and transaction_ledger."""
+
+from sqlalchemy import (
+    Column, Date, DateTime, Enum, ForeignKey, Integer, MetaData, Numeric, String, Table, UniqueConstraint,
+)
+
+metadata = MetaData()
+
+transactions = Table(
+    "transactions",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("vendor", String(120), nullable=False),
+    Column("category", String(80), nullable=False),
+    Column("tx_date", Date, nullable=False),
+    Column("status", Enum("pending", "verified", "failed", "approved", name="txstatus"), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+transaction_ledger = Table(
+    "transaction_ledger",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("tx_id", Integer, ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("vendor", String(120), nullable=False),
+    Column("category", String(80), nullable=False),
+    Column("tx_date", Date, nullable=False),
+    Column("provider_ref", String(120), nullable=True),
+    Column("approved_at", DateTime, nullable=False),
+    UniqueConstraint("tx_id", name="uq_ledger_tx_id"),
+)
+
+
+def upgrade(conn):
+    # checkfirst: databases created earlier with create_all already have these
+    metadata.create_all(conn, checkfirst=True)
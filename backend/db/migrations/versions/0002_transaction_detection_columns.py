@@ -0,0 +1,23 @@
+"""User, location, currency and timestamp columns used by detection."""
+
+from sqlalchemy import text
+from db.migrations import has_column
+
+COLUMNS = {
+    "user_id": "VARCHAR(64)",
+    "country": "VARCHAR(64)",
+    "currency": "VARCHAR(3) NOT NULL DEFAULT 'USD'",
+    "tx_ts": "TIMESTAMP",
+}
+
+
+def upgrade(conn):
+    for name, ddl in COLUMNS.items():
+        if not has_column(conn, "transactions", name):
+            conn.execute(text(f"ALTER TABLE transactions ADD COLUMN {name} {ddl}"))
+
+    # existing rows get their creation time as the transaction timestamp
+    conn.execute(text("UPDATE transactions SET tx_ts = created_at WHERE tx_ts IS NULL"))
+    if conn.dialect.name == "postgresql":
+        # SQLite cannot tighten a column in place; the ORM always sets tx_ts
+        conn.execute(text("ALTER TABLE transactions ALTER COLUMN tx_ts SET NOT NULL"))
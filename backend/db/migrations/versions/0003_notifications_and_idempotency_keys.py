@@ -0,0 +1,32 @@
+"""Persistent notifications and Idempotency-Key storage."""
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, UniqueConstraint
+
+metadata = MetaData()
+
+notifications = Table(
+    "notifications",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("user_id", String(64), nullable=False),
+    Column("message", Text, nullable=False),
+    Column("read", Boolean, nullable=False, default=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+idempotency_keys = Table(
+    "idempotency_keys",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("scope", String(64), nullable=False),
+    Column("key", String(128), nullable=False),
+    Column("request_hash", String(64), nullable=False),
+    Column("response", Text, nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,27 @@
+"""
+Composite indexes for the hot query paths:
+detection features and profile rebuilds (user_id, tx_ts), keyset listings
+and exports (tx_date, id) optionally narrowed by status or vendor, the
+llm-service "recent transactions" query (tx_date), ledger exports,
+notification polling and idempotency key expiry.
+"""
+
+from db.migrations import create_index
+
+# Built CONCURRENTLY on Postgres so the transactions table stays writable
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_transactions_user_ts", "transactions", ["user_id", "tx_ts"], ["amount", "country", "status"]),
+    ("ix_transactions_date_id", "transactions", ["tx_date", "id"], None),
+    ("ix_transactions_status_date_id", "transactions", ["status", "tx_date", "id"], None),
+    ("ix_transactions_vendor_date_id", "transactions", ["vendor", "tx_date", "id"], None),
+    ("ix_ledger_date_id", "transaction_ledger", ["tx_date", "id"], None),
+    ("ix_notifications_user_created", "notifications", ["user_id", "created_at"], None),
+    ("ix_idempotency_expires_at", "idempotency_keys", ["expires_at"], None),
+]
+
+
+def upgrade(conn):
+    for name, table, columns, include in INDEXES:
+        create_index(conn, name, table, columns, include=include)
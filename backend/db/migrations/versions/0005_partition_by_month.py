@@ -0,0 +1,114 @@
+"""
+Rebuild transactions and transaction_ledger as tables range-partitioned by
+month on tx_date (Postgres only; other databases keep plain tables).
+
+Postgres requires the partition key in every unique constraint, so the
+primary keys become (id, tx_date), the ledger's unique constraint becomes
+(tx_id, tx_date) and it references transactions (id, tx_date); ids still
+come from the original sequences and stay unique on their own. Existing
+rows are copied into the new tables inside the migration transaction, so
+run it in a maintenance window on large databases.
+"""
+
+from sqlalchemy import text
+from db.migrations import create_index
+from db.partitions import create_default_partition, ensure_partitions, is_partitioned, month_start
+
+TRANSACTION_COLUMNS = (
+    "id", "user_id", "amount", "currency", "vendor", "category", "country",
+    "tx_date", "tx_ts", "status", "created_at", "updated_at",
+)
+LEDGER_COLUMNS = ("id", "tx_id", "amount", "vendor", "category", "tx_date", "provider_ref", "approved_at")
+
+INDEXES = [
+    ("ix_transactions_id", "transactions", ["id"], None),
+    ("ix_transactions_user_ts", "transactions", ["user_id", "tx_ts"], ["amount", "country", "status"]),
+    ("ix_transactions_date_id", "transactions", ["tx_date", "id"], None),
+    ("ix_transactions_status_date_id", "transactions", ["status", "tx_date", "id"], None),
+    ("ix_transactions_vendor_date_id", "transactions", ["vendor", "tx_date", "id"], None),
+    ("ix_transaction_ledger_id", "transaction_ledger", ["id"], None),
+    ("ix_transaction_ledger_tx_id", "transaction_ledger", ["tx_id"], None),
+    ("ix_ledger_date_id", "transaction_ledger", ["tx_date", "id"], None),
+]
+
+
+def _set_aside(conn, table: str) -> str:
+    """Rename a table out of the way and drop its constraints and indexes so the names can be reused."""
+    sequence = conn.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table})
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    old = f"{table}_unpartitioned"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    constraints = conn.scalars(
+        text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) "
+             "ORDER BY contype = 'f' DESC"),  # foreign keys first
+        {"table": old},
+    ).all()
+    for name in constraints:
+        conn.execute(text(f'ALTER TABLE {old} DROP CONSTRAINT IF EXISTS "{name}"'))
+    for name in conn.scalars(text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": old}).all():
+        conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    return sequence
+
+
+def upgrade(conn):
+    if conn.dialect.name != "postgresql" or is_partitioned(conn, "transactions"):
+        return
+
+    # constraints referencing transactions must go before it is renamed
+    ledger_sequence = _set_aside(conn, "transaction_ledger")
+    tx_sequence = _set_aside(conn, "transactions")
+
+    conn.execute(text(f"""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('{tx_sequence}'),
+            user_id VARCHAR(64),
+            amount NUMERIC(12, 2) NOT NULL,
+            currency VARCHAR(3) NOT NULL DEFAULT 'USD',
+            vendor VARCHAR(120) NOT NULL,
+            category VARCHAR(80) NOT NULL,
+            country VARCHAR(64),
+            tx_date DATE NOT NULL,
+            tx_ts TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            status txstatus NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT transactions_pkey PRIMARY KEY (id, tx_date)
+        ) PARTITION BY RANGE (tx_date)
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE transaction_ledger (
+            id INTEGER NOT NULL DEFAULT nextval('{ledger_sequence}'),
+            tx_id INTEGER NOT NULL,
+            amount NUMERIC(12, 2) NOT NULL,
+            vendor VARCHAR(120) NOT NULL,
+            category VARCHAR(80) NOT NULL,
+            tx_date DATE NOT NULL,
+            provider_ref VARCHAR(120),
+            approved_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT transaction_ledger_pkey PRIMARY KEY (id, tx_date),
+            CONSTRAINT uq_ledger_tx_id UNIQUE (tx_id, tx_date),
+            CONSTRAINT transaction_ledger_tx_id_fkey FOREIGN KEY (tx_id, tx_date)
+                REFERENCES transactions (id, tx_date) ON DELETE CASCADE
+        ) PARTITION BY RANGE (tx_date)
+    """))
+
+    # one partition per month from the oldest row through the months ahead
+    oldest = conn.scalar(text("SELECT min(tx_date) FROM transactions_unpartitioned"))
+    ensure_partitions(conn, start=month_start(oldest) if oldest else None)
+    for table in ("transactions", "transaction_ledger"):
+        create_default_partition(conn, table)
+
+    columns = ", ".join(TRANSACTION_COLUMNS)
+    conn.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_unpartitioned"))
+    columns = ", ".join(LEDGER_COLUMNS)
+    conn.execute(text(
+        f"INSERT INTO transaction_ledger ({columns}) SELECT {columns} FROM transaction_ledger_unpartitioned"
+    ))
+    conn.execute(text("DROP TABLE transaction_ledger_unpartitioned"))
+    conn.execute(text("DROP TABLE transactions_unpartitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {tx_sequence} OWNED BY transactions.id"))
+    conn.execute(text(f"ALTER SEQUENCE {ledger_sequence} OWNED BY transaction_ledger.id"))
+
+    # indexes on a partitioned table cascade to every current and future partition
+    for name, table, index_columns, include in INDEXES:
+        create_index(conn, name, table, index_columns, include=include)
@@ -0,0 +1,48 @@
+"""daily_aggregates: approved count and amount per (day, category, vendor), seeded from the ledger."""
+
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, Date, DateTime, Integer, MetaData, Numeric, PrimaryKeyConstraint, String, Table, func, insert, literal,
+    select,
+)
+
+metadata = MetaData()
+
+daily_aggregates = Table(
+    "daily_aggregates",
+    metadata,
+    Column("day", Date, nullable=False),
+    Column("category", String(80), nullable=False),
+    Column("vendor", String(120), nullable=False),
+    Column("approved_count", Integer, nullable=False),
+    Column("approved_amount", Numeric(18, 2), nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    PrimaryKeyConstraint("day", "category", "vendor", name="pk_daily_aggregates"),
+)
+
+# only the ledger columns the seed reads; the table itself comes from 0001
+transaction_ledger = Table(
+    "transaction_ledger",
+    metadata,
+    Column("id", Integer),
+    Column("amount", Numeric(12, 2)),
+    Column("vendor", String(120)),
+    Column("category", String(80)),
+    Column("tx_date", Date),
+)
+
+
+def upgrade(conn):
+    daily_aggregates.create(conn, checkfirst=True)
+    ledger = transaction_ledger.c
+    grouped = (
+        select(
+            ledger.tx_date, ledger.category, ledger.vendor,
+            func.count(ledger.id), func.sum(ledger.amount), literal(datetime.utcnow(), DateTime),
+        )
+        .group_by(ledger.tx_date, ledger.category, ledger.vendor)
+    )
+    conn.execute(insert(daily_aggregates).from_select(
+        ["day", "category", "vendor", "approved_count", "approved_amount", "updated_at"], grouped
+    ))
@@ -0,0 +1,11 @@
+"""Lease on in-progress Idempotency-Key claims, so a claim left by a crashed request can be taken over."""
+
+from sqlalchemy import text
+from db.migrations import has_column
+
+
+def upgrade(conn):
+    if not has_column(conn, "idempotency_keys", "locked_until"):
+        conn.execute(text("ALTER TABLE idempotency_keys ADD COLUMN locked_until TIMESTAMP"))
+    # claims already in progress become takeable at once
+    conn.execute(text("UPDATE idempotency_keys SET locked_until = created_at WHERE locked_until IS NULL"))
@@ -0,0 +1,165 @@
+"""
+Monthly range partitions of transactions and transaction_ledger on
+tx_date (Postgres only). Partitions are named <table>_YYYY_MM; a DEFAULT
+partition catches rows dated outside the created months so inserts never
+fail, and `ensure_partitions` keeps the coming months created ahead of time,
+moving any rows the DEFAULT partition already holds for a month into it.
+"""
+
+import asyncio
+import os
+import re
+from datetime import date
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_MAINTENANCE_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "21600"))
+
+# parents before children: the ledger references transactions (id, tx_date)
+PARTITIONED_TABLES = ("transactions", "transaction_ledger")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.scalar(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+             "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"),
+        {"table": table},
+    ))
+
+
+def partition_months(conn: Connection, table: str) -> list[date]:
+    """Months that currently have an attached partition (excluding DEFAULT)."""
+    names = conn.scalars(
+        text("SELECT c.relname FROM pg_inherits i "
+             "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+             "WHERE p.relname = :table"),
+        {"table": table},
+    )
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    months = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(conn: Connection, table: str, month: date):
+    month = month_start(month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+
+def create_default_partition(conn: Connection, table: str):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+
+def _default_has_rows(conn: Connection, table: str, month: date) -> bool:
+    return bool(conn.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM ONLY {table}_default WHERE tx_date >= :start AND tx_date < :end)"),
+        {"start": month, "end": add_months(month, 1)},
+    ))
+
+
+def create_month_partitions(conn: Connection, month: date, tables) -> list[str]:
+    """
+    Create `month`'s partition of each of `tables` (in PARTITIONED_TABLES
+    order). Postgres refuses to create a partition while the DEFAULT
+    partition holds rows for its range (rows dated past the months created
+    ahead), so those rows are set aside and re-inserted through the parent
+    once the partition exists; ledger rows go first so deleting their
+    transactions does not cascade to them. Returns the partitions created.
+    """
+    month = month_start(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    in_month = "tx_date >= :start AND tx_date < :end"
+    moving = [
+        table for table in tables
+        if conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{table}_default"})
+        and _default_has_rows(conn, table, month)
+    ]
+    if moving:
+        # parents before children, the order writers lock them in
+        for table in PARTITIONED_TABLES:
+            conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+        for table in reversed(moving):
+            conn.execute(text(
+                f"CREATE TEMP TABLE {table}_moving ON COMMIT DROP AS "
+                f"SELECT * FROM ONLY {table}_default WHERE {in_month}"
+            ), bounds)
+            conn.execute(text(f"DELETE FROM ONLY {table}_default WHERE {in_month}"), bounds)
+
+    for table in tables:
+        create_partition(conn, table, month)
+
+    for table in moving:
+        moved = conn.execute(text(f"INSERT INTO {table} SELECT * FROM {table}_moving")).rowcount
+        conn.execute(text(f"DROP TABLE {table}_moving"))
+        LOGGER.info(f"Moved {moved} rows of {table} for {month:%Y-%m} out of {table}_default")
+    return [partition_name(table, month) for table in tables]
+
+
+def ensure_partitions(conn: Connection, start: date | None = None,
+                      months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    """
+    Create any missing monthly partitions from `start` (default: this month)
+    through `months_ahead` months from now. Returns the partitions created.
+    """
+    first = month_start(start or date.today())
+    last = add_months(month_start(date.today()), months_ahead)
+    existing = {
+        table: set(partition_months(conn, table))
+        for table in PARTITIONED_TABLES if is_partitioned(conn, table)
+    }
+    created = []
+    month = first
+    while month <= last:
+        missing = [table for table, months in existing.items() if month not in months]
+        if missing:
+            created.extend(create_month_partitions(conn, month, missing))
+        month = add_months(month, 1)
+    return created
+
+
+def run_maintenance(engine: Engine, archive=None):
+    """One maintenance pass: create upcoming partitions, then run `archive` if given."""
+    with engine.begin() as conn:
+        created = ensure_partitions(conn)
+    if created:
+        LOGGER.info(f"Created partitions: {', '.join(created)}")
+    if archive is not None:
+        archive()
+
+
+async def maintain_partitions(engine: Engine, interval_seconds: float = PARTITION_MAINTENANCE_SECONDS,
+                              archive=None):
+    """Background loop around `run_maintenance`; `archive` is a blocking callable."""
+    while True:
+        try:
+            await run_in_threadpool(run_maintenance, engine, archive)
+        except Exception as e:
+            LOGGER.warning(f"Partition maintenance failed: {e}")
+        await asyncio.sleep(interval_seconds)
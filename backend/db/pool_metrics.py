@@ -0,0 +1,88 @@
+"""
+Connection pool telemetry: checkout wait time, connections in use,
+overflow, new connections, invalidations and checkout timeouts, labelled
+by engine so sync and async pools can be sized separately
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from metrics_utils import Counter, Gauge, Histogram
+
+POOL_SIZE = Gauge("db_pool_size", "Configured pool size (persistent connections)", ["engine"])
+POOL_MAX_OVERFLOW = Gauge("db_pool_max_overflow", "Configured maximum overflow connections", ["engine"])
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool", ["engine"])
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Overflow connections currently open beyond pool_size", ["engine"])
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout", ["engine"]
+)
+POOL_CONNECTS = Counter("db_pool_connections_opened_total", "New DBAPI connections opened", ["engine"])
+POOL_INVALIDATIONS = Counter(
+    "db_pool_invalidations_total", "Connections invalidated (soft: recycled on next checkout)", ["engine", "soft"]
+)
+
+
+class _TimedCheckout:
+    """Mixin timing the wait for a connection, including waits that time out."""
+
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(engine=self.metrics_name)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.metrics_name)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(engine, name: str):
+    """Attach pool event listeners to a sync Engine (use async_engine.sync_engine for async)."""
+    pool = engine.pool
+    if isinstance(pool, _TimedCheckout):
+        pool.metrics_name = name
+    if isinstance(pool, QueuePool):
+        POOL_SIZE.set(pool.size(), engine=name)
+        POOL_MAX_OVERFLOW.set(pool._max_overflow, engine=name)
+
+    def _sample():
+        if isinstance(pool, QueuePool):
+            POOL_OVERFLOW.set(max(0, pool.overflow()), engine=name)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        POOL_CONNECTS.inc(engine=name)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKED_OUT.inc(engine=name)
+        _sample()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec(engine=name)
+        _sample()
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        POOL_INVALIDATIONS.inc(engine=name, soft="false")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        POOL_INVALIDATIONS.inc(engine=name, soft="true")
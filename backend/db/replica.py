@@ -0,0 +1,124 @@
+"""
+Read/write routing: reads go to the replica (DATABASE_READ_URL) unless it
+is unavailable, lagging too far behind, or the client wrote recently and
+needs to read its own writes, in which case they go to the primary
+"""
+
+import asyncio
+import os
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from db.db import (
+    AsyncReadSessionLocal, AsyncSessionLocal, DATABASE_READ_URL, ReadSessionLocal, SessionLocal,
+    async_read_engine,
+)
+from metrics_utils import Counter, Gauge
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+# how long after a write the same client keeps reading from the primary
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+LAST_WRITE_COOKIE = "last_write_at"
+
+READ_ROUTING = Counter(
+    "db_read_sessions_total", "Read sessions by target engine and routing reason", ["target", "reason"]
+)
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Replication lag measured on the read replica")
+REPLICA_AVAILABLE = Gauge("db_replica_available", "1 while reads may be routed to the replica")
+
+# Postgres: zero when everything received has been replayed, otherwise the
+# age of the last replayed transaction
+_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaHealth:
+    """Latest replica probe result, refreshed by `monitor`"""
+
+    def __init__(self, configured: bool):
+        self.configured = configured
+        self.available = configured
+        self.lag_seconds = 0.0
+        REPLICA_AVAILABLE.set(1 if configured else 0)
+
+    def usable(self) -> bool:
+        return self.configured and self.available
+
+    async def check(self, engine=async_read_engine, max_lag: float = DB_REPLICA_MAX_LAG_SECONDS):
+        try:
+            async with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    self.lag_seconds = float(await conn.scalar(_LAG_QUERY) or 0)
+                else:
+                    await conn.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            available = self.lag_seconds <= max_lag
+        except Exception as e:
+            LOGGER.warning(f"Read replica check failed: {e}")
+            available = False
+        if available != self.available:
+            LOGGER.warning(f"Read replica {'back in rotation' if available else 'out of rotation'} "
+                           f"(lag {self.lag_seconds:.1f}s)")
+        self.available = available
+        REPLICA_LAG.set(self.lag_seconds)
+        REPLICA_AVAILABLE.set(1 if available else 0)
+
+    async def monitor(self, interval_seconds: float = DB_REPLICA_CHECK_SECONDS):
+        while True:
+            await self.check()
+            await asyncio.sleep(interval_seconds)
+
+
+REPLICA_HEALTH = ReplicaHealth(configured=bool(DATABASE_READ_URL))
+
+
+def mark_write(response: Response):
+    """Pin this client's reads to the primary for DB_READ_YOUR_WRITES_SECONDS."""
+    # truncated, not rounded: a stamp in the future would not count as a recent write
+    response.set_cookie(
+        LAST_WRITE_COOKIE, f"{int(time.time() * 1000) / 1000:.3f}",
+        max_age=max(1, int(DB_READ_YOUR_WRITES_SECONDS)), httponly=True, samesite="lax",
+    )
+
+
+def _wrote_recently(request: Request | None) -> bool:
+    if request is None:
+        return False
+    try:
+        written_at = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return 0 <= time.time() - written_at < DB_READ_YOUR_WRITES_SECONDS
+
+
+def _route(request: Request | None = None) -> str:
+    if not REPLICA_HEALTH.configured:
+        reason = "no_replica"
+    elif not REPLICA_HEALTH.available:
+        reason = "replica_unavailable"
+    elif _wrote_recently(request):
+        reason = "read_your_writes"
+    else:
+        READ_ROUTING.inc(target="replica", reason="default")
+        return "replica"
+    READ_ROUTING.inc(target="primary", reason=reason)
+    return "primary"
+
+
+async def get_read_db(request: Request):
+    """Dependency for read-only routes: an async session on the replica when it is safe to use"""
+    factory = AsyncReadSessionLocal if _route(request) == "replica" else AsyncSessionLocal
+    async with factory() as db:
+        yield db
+
+
+def read_session_factory():
+    """Sync session factory for background reads (exports, detection features)."""
+    return ReadSessionLocal if _route() == "replica" else SessionLocal
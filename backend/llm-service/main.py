@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
-from db_config import get_db, engine
+from fastapi.responses import JSONResponse, PlainTextResponse
+from db_config import get_db, get_read_db, engine, render_pool_metrics
 from sqlalchemy import text
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -26,8 +26,8 @@ class VerifyRequest(BaseModel):
     context: str
 
 def fetch_recent_transactions():
-    """Fetch recent transactions from our PostgreSQL database"""
-    db = get_db()
+    """Fetch recent transactions from our PostgreSQL database (read replica if configured)"""
+    db = get_read_db()
     try:
         # Query our transactions table (matches our schema)
         result = db.execute(text("""
@@ -164,3 +164,9 @@ Is this answer semantically correct based on the question and context? Return on
         return {"result": verdict}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Connection pool metrics for Prometheus"""
+    return render_pool_metrics()
@@ -1,7 +1,7 @@
 from datetime import datetime, date
 from enum import Enum
 
-from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, Enum as SAEnum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, Index, Enum as SAEnum
 from db.db import Base
 
 
@@ -14,12 +14,26 @@ class TxStatus(str, Enum):
 
 class TransactionDB(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Detection features filter on user and a time window; the INCLUDE
+        # columns let Postgres answer them from the index alone
+        Index("ix_transactions_user_ts", "user_id", "tx_ts", postgresql_include=["amount", "country", "status"]),
+        # Keyset pagination for listings: ORDER BY tx_date DESC, id DESC,
+        # optionally narrowed by status or vendor
+        Index("ix_transactions_date_id", "tx_date", "id"),
+        Index("ix_transactions_status_date_id", "status", "tx_date", "id"),
+        Index("ix_transactions_vendor_date_id", "vendor", "tx_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String(64), nullable=True)
     amount = Column(Numeric(12, 2), nullable=False)
     vendor = Column(String(120), nullable=False)
     category = Column(String(80), nullable=False)
+    country = Column(String(64), nullable=True)
+    currency = Column(String(3), default="USD", nullable=False)
     tx_date = Column(Date, nullable=False)
+    tx_ts = Column(DateTime, default=datetime.utcnow, nullable=False)
     status = Column(SAEnum(TxStatus), default=TxStatus.pending, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, Date, DateTime, Integer, Numeric, String, PrimaryKeyConstraint
+from db.db import Base
+
+
+class DailyAggregateDB(Base):
+    __tablename__ = "daily_aggregates"
+    __table_args__ = (
+        # one row per (day, category, vendor); approvals upsert into it, and
+        # range reads by day are served by the primary key
+        PrimaryKeyConstraint("day", "category", "vendor", name="pk_daily_aggregates"),
+    )
+
+    day = Column(Date, nullable=False)                  # ledger tx_date
+    category = Column(String(80), nullable=False)
+    vendor = Column(String(120), nullable=False)
+    approved_count = Column(Integer, default=0, nullable=False)
+    approved_amount = Column(Numeric(18, 2), default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, UniqueConstraint
+from db.db import Base
+
+
+class IdempotencyKeyDB(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # one stored response per key and endpoint; concurrent first attempts
+        # race on this constraint and exactly one wins
+        UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),
+        Index("ix_idempotency_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String(64), nullable=False)          # endpoint the key was used on
+    key = Column(String(128), nullable=False)           # Idempotency-Key header
+    request_hash = Column(String(64), nullable=False)   # sha256 of the request body
+    response = Column(Text, nullable=True)              # JSON body; NULL while in progress
+    locked_until = Column(DateTime, nullable=True)      # in-progress claim lease; past it, a retry takes over
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,11 +1,16 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Numeric, String, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Numeric, String, Date, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from db.db import Base
+from models.Transcation import TransactionDB
 
 class TransactionLedger(Base):
     __tablename__ = "transaction_ledger"
-    __table_args__ = (UniqueConstraint("tx_id", name="uq_ledger_tx_id"),)
+    __table_args__ = (
+        UniqueConstraint("tx_id", name="uq_ledger_tx_id"),
+        # ledger exports stream in (tx_date, id) order
+        Index("ix_ledger_date_id", "tx_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tx_id = Column(Integer, ForeignKey("transactions.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -15,4 +20,4 @@ class TransactionLedger(Base):
     tx_date = Column(Date, nullable=False)
     provider_ref = Column(String(120), nullable=True)   # external reference / payment id
     approved_at = Column(DateTime, default=datetime.utcnow, nullable=False) 
-    transaction = relationship("TransactionDB", backref="ledger_entry")
+    transaction = relationship(TransactionDB, backref="ledger_entry")
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Boolean, DateTime, Index
+from db.db import Base
+
+
+class NotificationDB(Base):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        # polling reads "this user's notifications since <cursor>"
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(String(36), primary_key=True)  # notification_id (uuid4)
+    user_id = Column(String(64), nullable=False)
+    message = Column(Text, nullable=False)
+    read = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -9,6 +9,8 @@ class Transaction(BaseModel):
     amount: float
     currency: str
     merchant: str
+    category: Optional[str] = None
+    country: Optional[str] = None
     transaction_date: datetime
     status: Optional[str] = "pending"
     suspicious_flag: Optional[bool] = False
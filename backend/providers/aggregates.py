@@ -0,0 +1,131 @@
+"""
+Daily aggregates: approved count and amount per (day, category, vendor).
+Approvals add to them in the same transaction that writes the ledger row,
+and any date range can be rebuilt from the ledger.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+from db.db import insert_for
+from models.aggregates import DailyAggregateDB
+from models.ledger import TransactionLedger
+
+_KEY = (DailyAggregateDB.day, DailyAggregateDB.category, DailyAggregateDB.vendor)
+
+
+def daily_aggregate_upsert(dialect_name: str, entries):
+    """
+    One INSERT ... ON CONFLICT DO UPDATE adding ledger entries (anything with
+    tx_date, category, vendor and amount) to their daily totals. Entries are
+    summed per key first, because one statement may not update a row twice,
+    and keys are sorted so concurrent upserts lock rows in the same order.
+    Returns None when there is nothing to add.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for entry in entries:
+        total = totals[(entry.tx_date, entry.category, entry.vendor)]
+        total[0] += 1
+        total[1] += entry.amount
+    if not totals:
+        return None
+
+    now = datetime.utcnow()
+    stmt = insert_for(dialect_name)(DailyAggregateDB).values([
+        {"day": day, "category": category, "vendor": vendor,
+         "approved_count": count, "approved_amount": amount, "updated_at": now}
+        for (day, category, vendor), (count, amount) in sorted(totals.items())
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=list(_KEY),
+        set_={
+            "approved_count": DailyAggregateDB.approved_count + stmt.excluded.approved_count,
+            "approved_amount": DailyAggregateDB.approved_amount + stmt.excluded.approved_amount,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def backfill_statements(date_from: date | None = None, date_to: date | None = None):
+    """
+    Statements replacing the aggregates in [date_from, date_to] with totals
+    recomputed from the ledger; open bounds mean everything.
+    """
+    ledger_range, aggregate_range = [], []
+    if date_from is not None:
+        ledger_range.append(TransactionLedger.tx_date >= date_from)
+        aggregate_range.append(DailyAggregateDB.day >= date_from)
+    if date_to is not None:
+        ledger_range.append(TransactionLedger.tx_date <= date_to)
+        aggregate_range.append(DailyAggregateDB.day <= date_to)
+
+    grouped = (
+        select(
+            TransactionLedger.tx_date,
+            TransactionLedger.category,
+            TransactionLedger.vendor,
+            func.count(TransactionLedger.id),
+            func.sum(TransactionLedger.amount),
+            literal(datetime.utcnow(), DailyAggregateDB.updated_at.type),
+        )
+        .where(*ledger_range)
+        .group_by(TransactionLedger.tx_date, TransactionLedger.category, TransactionLedger.vendor)
+    )
+    return [
+        delete(DailyAggregateDB).where(*aggregate_range),
+        insert(DailyAggregateDB).from_select(
+            ["day", "category", "vendor", "approved_count", "approved_amount", "updated_at"], grouped
+        ),
+    ]
+
+
+def backfill_daily_aggregates(db: Session, date_from: date | None = None, date_to: date | None = None) -> int:
+    """
+    Rebuild the aggregates for a date range from the ledger in one
+    transaction. Without bounds the range is the ledger's own span, so
+    totals of months already archived out of the ledger are kept.
+    Returns the number of aggregate rows written.
+    """
+    if date_from is None or date_to is None:
+        first, last = db.execute(select(func.min(TransactionLedger.tx_date), func.max(TransactionLedger.tx_date))).one()
+        if first is None:
+            return 0
+        date_from = date_from or first
+        date_to = date_to or last
+
+    if db.get_bind().dialect.name == "postgresql":
+        # hold off concurrent approvals' upserts while the range is replaced
+        db.execute(text("LOCK TABLE daily_aggregates IN EXCLUSIVE MODE"))
+    for stmt in backfill_statements(date_from, date_to):
+        db.execute(stmt)
+    written = db.scalar(
+        select(func.count()).select_from(DailyAggregateDB)
+        .where(DailyAggregateDB.day >= date_from, DailyAggregateDB.day <= date_to)
+    )
+    db.commit()
+    return written
+
+
+def daily_aggregates_query(
+    date_from: date,
+    date_to: date,
+    by: str = "day",
+    category: str | None = None,
+    vendor: str | None = None,
+):
+    """Totals per day, or per day and `by` ("category" or "vendor"), oldest day first."""
+    keys = [DailyAggregateDB.day]
+    if by in ("category", "vendor"):
+        keys.append(getattr(DailyAggregateDB, by))
+    stmt = select(
+        *keys,
+        func.sum(DailyAggregateDB.approved_count).label("approved_count"),
+        func.sum(DailyAggregateDB.approved_amount).label("approved_amount"),
+    ).where(DailyAggregateDB.day >= date_from, DailyAggregateDB.day <= date_to)
+    if category is not None:
+        stmt = stmt.where(DailyAggregateDB.category == category)
+    if vendor is not None:
+        stmt = stmt.where(DailyAggregateDB.vendor == vendor)
+    return stmt.group_by(*keys).order_by(*keys)
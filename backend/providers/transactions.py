@@ -1,23 +1,52 @@
-from datetime import datetime
-from sqlite3 import IntegrityError
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import func, insert, select, tuple_, update
 from sqlalchemy.orm import Session
+from db.db import insert_for
 from models.ledger import TransactionLedger
+from providers.aggregates import daily_aggregate_upsert
 from models.Transcation import TransactionDB, TxStatus
 from schemas.transaction import TransactionIn
+from services.merchant_sketch import MERCHANT_SKETCHES
+from services.profile_cache import PROFILE_CACHE
 #from provider.verification import Verificaiton
 
-def create_transaction(db: Session, payload: TransactionIn) -> TransactionDB:
+def transaction_ts(payload: TransactionIn, now: datetime | None = None) -> datetime:
     """
-    Create a new transaction in the database.
-    Returns the created transaction (already committed).
+    When the transaction happened (naive UTC), from the payload's date and
+    time. Without a time, a transaction dated today happened now and an
+    older one at the start of its day, as the CSV loader stores them.
     """
-    tx = TransactionDB(
+    now = now or datetime.utcnow()
+    if payload.time is not None:
+        ts = datetime.combine(payload.date, payload.time)
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        return ts
+    if payload.date == now.date():
+        return now
+    return datetime.combine(payload.date, datetime.min.time())
+
+
+def new_transaction(payload: TransactionIn) -> TransactionDB:
+    return TransactionDB(
+        user_id=payload.user_id,
         amount=payload.amount,
         vendor=payload.vendor,
         category=payload.category,
+        country=payload.country,
+        currency=payload.currency,
         tx_date=payload.date,
+        tx_ts=transaction_ts(payload),
         status=TxStatus.pending,
     )
+
+
+def create_transaction(db: Session, payload: TransactionIn) -> TransactionDB:
+    """
+    Create a new transaction in the database.
+    Returns the created transaction (already committed).
+    """
+    tx = new_transaction(payload)
     # Note: Verification is triggered after transaction creation
     # via background task in the router
     db.add(tx)
@@ -26,43 +55,238 @@ def create_transaction(db: Session, payload: TransactionIn) -> TransactionDB:
     return tx
 
 
+def transactions_insert(payloads: list[TransactionIn]) -> tuple:
+    """
+    Multi-row INSERT ... RETURNING for a batch of payloads, as (statement, rows).
+    Core insert on the table: every row has the same keys, so the driver
+    sends one statement (the ORM would split batches on NULL columns).
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": p.user_id,
+            "amount": p.amount,
+            "vendor": p.vendor,
+            "category": p.category,
+            "country": p.country,
+            "currency": p.currency,
+            "tx_date": p.date,
+            "tx_ts": transaction_ts(p, now),
+            "status": TxStatus.pending,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for p in payloads
+    ]
+    table = TransactionDB.__table__
+    # RETURNING rows come back in payload order; Postgres still sends one
+    # statement, SQLite (no insert sentinel support) one per row
+    return insert(table).returning(*table.c, sort_by_parameter_order=True), rows
+
+
+def create_transactions(db: Session, payloads: list[TransactionIn]) -> list:
+    """
+    Insert many transactions with a single multi-row INSERT ... RETURNING
+    in one database transaction. Returns the inserted rows in payload order.
+    """
+    if not payloads:
+        return []
+    stmt, rows = transactions_insert(payloads)
+    inserted = db.execute(stmt, rows).all()
+    db.commit()
+    return inserted
+
+
 def get_transaction(db: Session, tx_id: int) -> TransactionDB | None:
     return db.get(TransactionDB, tx_id)
 
 
+def list_transactions_query(
+    limit: int,
+    after: tuple[date, int] | None = None,
+    status: TxStatus | None = None,
+    vendor: str | None = None,
+    category: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+):
+    """
+    Select one page of transactions ordered by (tx_date, id) descending.
+    `after` is the (tx_date, id) of the last row of the previous page, so each
+    page is an index range scan regardless of how deep the client has paged.
+    """
+    stmt = select(TransactionDB)
+    if status is not None:
+        stmt = stmt.where(TransactionDB.status == status)
+    if vendor is not None:
+        stmt = stmt.where(TransactionDB.vendor == vendor)
+    if category is not None:
+        stmt = stmt.where(TransactionDB.category == category)
+    if date_from is not None:
+        stmt = stmt.where(TransactionDB.tx_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(TransactionDB.tx_date <= date_to)
+    if after is not None:
+        stmt = stmt.where(tuple_(TransactionDB.tx_date, TransactionDB.id) < tuple_(*after))
+    return stmt.order_by(TransactionDB.tx_date.desc(), TransactionDB.id.desc()).limit(limit)
 
 
-def approve_transaction(db: Session, tx_id: int, provider_ref: str | None) -> tuple[TransactionDB, TransactionLedger | None]:
-    tx = db.get(TransactionDB, tx_id)
-    if not tx:
-        return None, None
+def list_transactions(
+    db: Session,
+    limit: int,
+    after: tuple[date, int] | None = None,
+    status: TxStatus | None = None,
+    vendor: str | None = None,
+    category: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> list[TransactionDB]:
+    """One page of transactions ordered by (tx_date, id) descending."""
+    stmt = list_transactions_query(
+        limit, after=after, status=status, vendor=vendor,
+        category=category, date_from=date_from, date_to=date_to,
+    )
+    return list(db.scalars(stmt))
 
-    # set status to approved
-    tx.status = TxStatus.approved
-    tx.updated_at = datetime.utcnow()
-    db.add(tx)
 
-    # write a permanent ledger record (idempotent via unique constraint)
-    ledger = TransactionLedger(
-        tx_id=tx.id,
-        amount=tx.amount,
-        vendor=tx.vendor,
-        category=tx.category,
-        tx_date=tx.tx_date,
-        provider_ref=provider_ref,
+def detection_features_query(user_id: str, at: datetime, window: timedelta = timedelta(minutes=10)):
+    """
+    Select every detection feature for a user in one round trip:
+    average approved amount, number of transactions in the window before
+    `at`, and the modal (home) country. All three subqueries are served by
+    the (user_id, tx_ts) index.
+    """
+    history = (TransactionDB.user_id == user_id, TransactionDB.tx_ts < at)
+    approved = history + (TransactionDB.status == TxStatus.approved,)
+
+    avg_amount = select(func.avg(TransactionDB.amount)).where(*approved).scalar_subquery()
+    recent_count = (
+        select(func.count(TransactionDB.id))
+        .where(*history, TransactionDB.tx_ts >= at - window)
+        .scalar_subquery()
+    )
+    home_country = (
+        select(TransactionDB.country)
+        .where(*approved, TransactionDB.country.isnot(None))
+        .group_by(TransactionDB.country)
+        .order_by(func.count(TransactionDB.id).desc(), func.max(TransactionDB.tx_ts).desc())
+        .limit(1)
+        .scalar_subquery()
     )
-    db.add(ledger)
 
+    return select(avg_amount, recent_count, home_country)
+
+
+def detection_features_from_row(row) -> dict:
+    return {
+        "avg_amount": float(row[0]) if row[0] is not None else 0.0,
+        "recent_count": row[1] or 0,
+        "home_country": row[2],
+    }
+
+
+def fetch_detection_features(
+    db: Session, user_id: str, at: datetime, window: timedelta = timedelta(minutes=10)
+) -> dict:
+    """Fetch every detection feature for a user in one round trip."""
+    return detection_features_from_row(db.execute(detection_features_query(user_id, at, window)).one())
+
+
+def ledger_values(tx: TransactionDB, provider_ref: str | None) -> dict:
+    return {
+        "tx_id": tx.id,
+        "amount": tx.amount,
+        "vendor": tx.vendor,
+        "category": tx.category,
+        "tx_date": tx.tx_date,
+        "provider_ref": provider_ref,
+        "approved_at": datetime.utcnow(),
+    }
+
+
+def approval_update(tx_ids: list[int]):
+    """
+    Mark the given transactions approved and return them, skipping any that
+    already have a ledger row so a repeat approval leaves them untouched.
+    """
+    ledgered = select(TransactionLedger.id).where(TransactionLedger.tx_id == TransactionDB.id).exists()
+    return (
+        update(TransactionDB)
+        .where(TransactionDB.id.in_(tx_ids), ~ledgered)
+        .values(status=TxStatus.approved, updated_at=datetime.utcnow())
+        .returning(TransactionDB)
+    )
+
+
+def ledger_insert(dialect_name: str):
+    """
+    Ledger insert that skips rows already recorded and returns only the rows
+    it wrote; execute it with a list of `ledger_values`. No conflict target,
+    because the unique key is (tx_id) or, on partitioned Postgres, (tx_id, tx_date).
+    """
+    return insert_for(dialect_name)(TransactionLedger).on_conflict_do_nothing().returning(TransactionLedger)
+
+
+def existing_approvals_query(tx_ids: list[int]):
+    """Transactions with their ledger row (None when missing), for ids an approval did not write."""
+    return (
+        select(TransactionDB, TransactionLedger)
+        .outerjoin(TransactionLedger, TransactionLedger.tx_id == TransactionDB.id)
+        .where(TransactionDB.id.in_(tx_ids))
+    )
+
+
+def record_approval(tx: TransactionDB, ledger: TransactionLedger):
+    """Fold a newly written ledger row into the in-process detection state."""
+    # only a newly written ledger row moves the user's spending profile
+    if tx.user_id:
+        PROFILE_CACHE.record(tx.user_id, ledger.amount, tx.country, tx.tx_ts)
+        MERCHANT_SKETCHES.add(tx.user_id, ledger.vendor, ledger.id)
+
+
+def approve_transactions(
+    db: Session, tx_ids: list[int], provider_ref: str | None = None
+) -> dict[int, tuple[TransactionDB, TransactionLedger | None]]:
+    """
+    Approve many transactions in one database transaction, with a fixed
+    number of statements however many ids there are: UPDATE ... RETURNING
+    marks them approved, INSERT ... ON CONFLICT DO NOTHING RETURNING writes
+    their ledger rows, and one upsert adds those rows to the daily
+    aggregates. Ids that were already approved come back with their
+    existing ledger row; unknown ids are left out.
+    """
+    ids = list(dict.fromkeys(tx_ids))
+    if not ids:
+        return {}
+    dialect_name = db.get_bind().dialect.name
+
+    txs = {tx.id: tx for tx in db.scalars(approval_update(ids))}
+    written = []
+    if txs:
+        written = db.scalars(ledger_insert(dialect_name), [ledger_values(tx, provider_ref) for tx in txs.values()]).all()
+    upsert = daily_aggregate_upsert(dialect_name, written)
+    if upsert is not None:
+        db.execute(upsert)
+
+    ledgers = {ledger.tx_id: ledger for ledger in written}
+    # already approved, or approved concurrently between our update and insert
+    missing = [tx_id for tx_id in ids if tx_id not in ledgers]
+    if missing:
+        for tx, ledger in db.execute(existing_approvals_query(missing)):
+            txs[tx.id] = tx
+            ledgers[tx.id] = ledger
+
+    # keep the returned objects loaded instead of reloading each one after commit
+    expire_on_commit, db.expire_on_commit = db.expire_on_commit, False
     try:
         db.commit()
-    except IntegrityError:
-        db.rollback()
-        # already recorded — fetch existing
-        ledger = db.query(TransactionLedger).filter(TransactionLedger.tx_id == tx.id).first()
-        if not ledger:
-            raise
-    else:
-        db.refresh(tx)
-        db.refresh(ledger)
-
-    return tx, ledger
\ No newline at end of file
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+    for ledger in written:
+        record_approval(txs[ledger.tx_id], ledger)
+    return {tx_id: (txs[tx_id], ledgers.get(tx_id)) for tx_id in ids if tx_id in txs}
+
+
+def approve_transaction(db: Session, tx_id: int, provider_ref: str | None) -> tuple[TransactionDB, TransactionLedger | None]:
+    return approve_transactions(db, [tx_id], provider_ref).get(tx_id, (None, None))
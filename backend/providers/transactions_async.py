@@ -0,0 +1,116 @@
+"""
+Async counterparts of providers.transactions for use on the event loop.
+Statements are shared with the sync module; only the execution differs.
+"""
+
+from datetime import date, datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.ledger import TransactionLedger
+from models.Transcation import TransactionDB, TxStatus
+from schemas.transaction import TransactionIn
+from providers.aggregates import daily_aggregate_upsert, daily_aggregates_query
+from providers.transactions import (
+    approval_update, detection_features_from_row, detection_features_query, existing_approvals_query,
+    ledger_insert, ledger_values, list_transactions_query, new_transaction, record_approval, transactions_insert,
+)
+
+
+async def create_transaction(db: AsyncSession, payload: TransactionIn) -> TransactionDB:
+    """
+    Create a new transaction in the database.
+    Returns the created transaction (already committed).
+    """
+    tx = new_transaction(payload)
+    db.add(tx)
+    await db.commit()
+    await db.refresh(tx)
+    return tx
+
+
+async def create_transactions(db: AsyncSession, payloads: list[TransactionIn]) -> list:
+    """
+    Insert many transactions with a single multi-row INSERT ... RETURNING
+    in one database transaction. Returns the inserted rows in payload order.
+    """
+    if not payloads:
+        return []
+    stmt, rows = transactions_insert(payloads)
+    inserted = (await db.execute(stmt, rows)).all()
+    await db.commit()
+    return inserted
+
+
+async def get_transaction(db: AsyncSession, tx_id: int) -> TransactionDB | None:
+    return await db.get(TransactionDB, tx_id)
+
+
+async def list_transactions(
+    db: AsyncSession,
+    limit: int,
+    after: tuple[date, int] | None = None,
+    status: TxStatus | None = None,
+    vendor: str | None = None,
+    category: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> list[TransactionDB]:
+    """One page of transactions ordered by (tx_date, id) descending."""
+    stmt = list_transactions_query(
+        limit, after=after, status=status, vendor=vendor,
+        category=category, date_from=date_from, date_to=date_to,
+    )
+    return list(await db.scalars(stmt))
+
+
+async def fetch_detection_features(
+    db: AsyncSession, user_id: str, at: datetime, window: timedelta = timedelta(minutes=10)
+) -> dict:
+    """Fetch every detection feature for a user in one round trip."""
+    result = await db.execute(detection_features_query(user_id, at, window))
+    return detection_features_from_row(result.one())
+
+
+async def approve_transactions(
+    db: AsyncSession, tx_ids: list[int], provider_ref: str | None = None
+) -> dict[int, tuple[TransactionDB, TransactionLedger | None]]:
+    """Approve many transactions with a fixed number of statements; see providers.transactions."""
+    ids = list(dict.fromkeys(tx_ids))
+    if not ids:
+        return {}
+    dialect_name = db.get_bind().dialect.name
+
+    txs = {tx.id: tx for tx in await db.scalars(approval_update(ids))}
+    written = []
+    if txs:
+        result = await db.scalars(ledger_insert(dialect_name), [ledger_values(tx, provider_ref) for tx in txs.values()])
+        written = result.all()
+    upsert = daily_aggregate_upsert(dialect_name, written)
+    if upsert is not None:
+        await db.execute(upsert)
+
+    ledgers = {ledger.tx_id: ledger for ledger in written}
+    # already approved, or approved concurrently between our update and insert
+    missing = [tx_id for tx_id in ids if tx_id not in ledgers]
+    if missing:
+        for tx, ledger in await db.execute(existing_approvals_query(missing)):
+            txs[tx.id] = tx
+            ledgers[tx.id] = ledger
+    await db.commit()
+
+    for ledger in written:
+        record_approval(txs[ledger.tx_id], ledger)
+    return {tx_id: (txs[tx_id], ledgers.get(tx_id)) for tx_id in ids if tx_id in txs}
+
+
+async def approve_transaction(
+    db: AsyncSession, tx_id: int, provider_ref: str | None
+) -> tuple[TransactionDB, TransactionLedger | None]:
+    return (await approve_transactions(db, [tx_id], provider_ref)).get(tx_id, (None, None))
+
+
+async def list_daily_aggregates(
+    db: AsyncSession, date_from: date, date_to: date, by: str = "day",
+    category: str | None = None, vendor: str | None = None,
+) -> list:
+    result = await db.execute(daily_aggregates_query(date_from, date_to, by, category, vendor))
+    return result.mappings().all()
@@ -1,31 +1,129 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+import base64
+import json
+import os
+from typing import Any, Literal
+from datetime import date, datetime, timedelta, timezone
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from routers.llm_router import generate_security_question, verify_security_answer
 from models.transaction_model import Transaction
 from services.notification_service import send_notification
+from services.notification_store import NOTIFICATION_STORE
+from services.notification_broker import NOTIFICATION_BROKER, TooManyConnections
 from services.transaction_service import post_transaction
 from services.detection_services import is_suspicious
-from db.db import get_db, SessionLocal
-from schemas.transaction import ApproveIn, PostTransactionIn, PostTransactionOut, TransactionIn, TransactionOut
-from providers.transactions import approve_transaction, create_transaction, get_transaction
+from services.batch_scoring import score_batch
+from services.rule_engine import get_rule_stats
+from services.stream_consumer import STREAM, StreamFull
+from services.verdict_cache import VERDICT_CACHE
+from services.verification_service import verify_new_transaction
+from services.admission_control import admit
+from services.idempotency import IDEMPOTENCY_STORE, request_fingerprint
+from services.export_service import EXPORT_FORMATS, EXPORT_TABLES, encode_ndjson, export_stream
+from services.archive_service import ARCHIVE_TABLE_BY_EXPORT, archived_months, read_archive
+from services.blocking_io import LLM_EXECUTOR, BlockingCallTimeout, ExecutorSaturated
+from services.transaction_store import TRANSACTION_STORE_MAX_PAGE, TransactionStore
+from db.db import get_db
+from db.replica import get_read_db, mark_write, read_session_factory
+from schemas.transaction import (
+    ApproveBatchIn, ApproveBatchOut, ApproveIn, BatchItemError, DailyAggregateOut, PostTransactionIn,
+    PostTransactionOut, TransactionBatchItemOut, TransactionBatchOut, TransactionIn, TransactionOut, TransactionPage,
+)
+from schemas.notification import MarkReadIn
+from providers.transactions_async import (
+    approve_transaction, approve_transactions, create_transaction, create_transactions, get_transaction,
+    list_daily_aggregates, list_transactions,
+)
 from models.Transcation import TxStatus
 from logging_utils import get_logger
 
 #name/backend
 router = APIRouter()
+LIST_PAGE_MAX = 200
+AGGREGATES_MAX_DAYS = int(os.getenv("AGGREGATES_MAX_DAYS", "366"))
+CREATE_BATCH_MAX = int(os.getenv("CREATE_BATCH_MAX", "1000"))
+APPROVE_BATCH_MAX = int(os.getenv("APPROVE_BATCH_MAX", "5000"))
+SCORE_BATCH_MAX = int(os.getenv("SCORE_BATCH_MAX", "1000"))
+NOTIFICATION_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_HEARTBEAT_SECONDS", "15"))
+NOTIFICATION_RECONNECT_MS = int(os.getenv("NOTIFICATION_RECONNECT_MS", "3000"))
 LOGGER = get_logger("guardian")
-# Dummy in-memory database
-TRANSACTIONS_DB = []
+# Bounded in-memory transaction store
+TRANSACTION_STORE = TransactionStore()
 
-NOTIFICATIONS_DB = []
+
+async def _idempotent(scope: str, key: str | None, request_body, response: Response, compute):
+    """Run `compute` once per Idempotency-Key; retries get the stored response."""
+    if key is None:
+        return await compute()
+    body, replayed = await IDEMPOTENCY_STORE.run(scope, key, request_fingerprint(request_body), compute)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
 
 
 @router.post("/create_trx", response_model=TransactionOut, status_code=201)
-def create_tx(payload: TransactionIn, db: Session = Depends(get_db)):
-    tx = create_transaction(db, payload)
-    #TO verify the transaction
-    #verify_update_trx(tx.id, SessionLocal)
+async def create_tx(
+    payload: TransactionIn,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None),
+):
+    async def create():
+        tx = await create_transaction(db, payload)
+        # Only a fresh create is verified; an idempotent replay already was
+        background_tasks.add_task(verify_new_transaction, tx.id)
+        return _to_out(tx).model_dump(mode="json")
+
+    result = await _idempotent("create_trx", idempotency_key, payload.model_dump(mode="json"), response, create)
+    mark_write(response)
+    return result
+
+
+@router.post("/create_trx/batch", response_model=TransactionBatchOut, status_code=201)
+async def create_tx_batch(
+    response: Response,
+    items: list[dict[str, Any]] = Body(...),
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None),
+):
+    """
+    Create up to CREATE_BATCH_MAX transactions in one database round trip.
+    Every item is validated first; valid items are inserted together and
+    invalid ones are reported by index. Each created item carries its
+    index too. A batch in which no item is valid is rejected with 422.
+    """
+    if len(items) > CREATE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"batch exceeds {CREATE_BATCH_MAX} items")
+
+    async def create():
+        indexes, payloads, errors = [], [], []
+        for index, item in enumerate(items):
+            try:
+                payloads.append(TransactionIn.model_validate(item))
+                indexes.append(index)
+            except ValidationError as e:
+                errors.append(BatchItemError(index=index, errors=e.errors(include_url=False, include_context=False)))
+        if errors and not payloads:
+            raise HTTPException(status_code=422, detail=[error.model_dump(mode="json") for error in errors])
+
+        txs = await create_transactions(db, payloads)
+        created = [
+            TransactionBatchItemOut(index=index, **_to_out(tx).model_dump())
+            for index, tx in zip(indexes, txs)
+        ]
+        return TransactionBatchOut(items=created, errors=errors).model_dump(mode="json")
+
+    result = await _idempotent("create_trx_batch", idempotency_key, items, response, create)
+    mark_write(response)
+    return result
+
+
+def _to_out(tx) -> TransactionOut:
     # Manual mapping so the "date" field outputs as "tx_date"
     return TransactionOut(
         id=tx.id, amount=tx.amount, vendor=tx.vendor, category=tx.category,
@@ -33,62 +131,215 @@ def create_tx(payload: TransactionIn, db: Session = Depends(get_db)):
     )
 
 
+def _encode_cursor(tx) -> str:
+    return base64.urlsafe_b64encode(f"{tx.tx_date.isoformat()}|{tx.id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        tx_date, tx_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(tx_date), int(tx_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+@router.get("/list_trx", response_model=TransactionPage)
+async def list_tx(
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=LIST_PAGE_MAX),
+    status: TxStatus | None = None,
+    vendor: str | None = None,
+    category: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Newest-first transactions with keyset pagination; follow `next_cursor` for the next page."""
+    after = _decode_cursor(cursor) if cursor else None
+    rows = await list_transactions(
+        db, limit + 1, after=after, status=status, vendor=vendor,
+        category=category, date_from=date_from, date_to=date_to,
+    )
+    # one extra row tells us whether another page exists
+    page = rows[:limit]
+    next_cursor = _encode_cursor(page[-1]) if len(rows) > limit else None
+    return TransactionPage(items=[_to_out(tx) for tx in page], next_cursor=next_cursor)
+
+
+
+@router.get("/aggregates/daily", response_model=list[DailyAggregateOut], response_model_exclude_none=True)
+async def daily_aggregates(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    by: Literal["day", "category", "vendor"] = "day",
+    category: str | None = None,
+    vendor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Approved counts and amounts per day, optionally split by category or
+    vendor, read from the incrementally maintained daily_aggregates table.
+    Defaults to the last 30 days.
+    """
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=422, detail="date_from must not be after date_to")
+    if (date_to - date_from).days >= AGGREGATES_MAX_DAYS:
+        raise HTTPException(status_code=422, detail=f"at most {AGGREGATES_MAX_DAYS} days per request")
+    return await list_daily_aggregates(db, date_from, date_to, by, category, vendor)
+
 
 @router.get("/get_trx/{tx_id}", response_model=TransactionOut)
-def get_tx(tx_id: int, db: Session = Depends(get_db)):
-    tx = get_transaction(db, tx_id)
+async def get_tx(tx_id: int, db: AsyncSession = Depends(get_read_db)):
+    tx = await get_transaction(db, tx_id)
     if not tx:
         raise HTTPException(status_code=404, detail="transaction not found")
-    return TransactionOut(
-        id=tx.id, amount=tx.amount, vendor=tx.vendor, category=tx.category,
-        date=tx.tx_date, status=tx.status, created_at=tx.created_at, updated_at=tx.updated_at
-    )
+    return _to_out(tx)
+
+
+
+def _to_approved_out(tx, ledger) -> PostTransactionOut:
+    return PostTransactionOut(**_to_out(tx).model_dump(), ledger_id=ledger.id if ledger else None)
 
 
+@router.post("/approve_trx/batch", response_model=ApproveBatchOut)
+async def approve_tx_batch(payload: ApproveBatchIn, response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    Approve up to APPROVE_BATCH_MAX transactions in one database transaction.
+    Already-approved ids are returned with their existing ledger row, so a
+    settlement run can be retried safely.
+    """
+    if len(payload.tx_ids) > APPROVE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"batch exceeds {APPROVE_BATCH_MAX} items")
+    approved = await approve_transactions(db, payload.tx_ids, payload.provider_ref)
+    mark_write(response)
+    return ApproveBatchOut(
+        items=[_to_approved_out(tx, ledger) for tx, ledger in approved.values()],
+        not_found=[tx_id for tx_id in dict.fromkeys(payload.tx_ids) if tx_id not in approved],
+    )
+
 
 @router.post("/approve_trx/{tx_id}", response_model=PostTransactionOut)
-def approve_tx(tx_id: int, db: Session = Depends(get_db)):
-    tx = get_transaction(db, tx_id)
+async def approve_tx(tx_id: int, response: Response, payload: ApproveIn | None = None,
+                     db: AsyncSession = Depends(get_db)):
+    tx, ledger = await approve_transaction(db, tx_id, payload.provider_ref if payload else None)
     if not tx:
         raise HTTPException(status_code=404, detail="transaction not found")
-    
-    return TransactionOut(
-        id=tx.id,
-        amount=tx.amount,
-        vendor=tx.merchant,
-        category=tx.category,
-        date=tx.transaction_date,
-        status=tx.status,
-        created_at=tx.created_at,
-        updated_at=tx.updated_at,
+    mark_write(response)
+    return _to_approved_out(tx, ledger)
+
+@router.get("/export/{table}")
+def export_table(
+    table: Literal["transactions", "ledger"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    date_from: date | None = None,
+    date_to: date | None = None,
+    gzip: bool = False,
+):
+    """
+    Stream a full table export as NDJSON or CSV, ordered by (tx_date, id).
+    Rows are read through a server-side cursor, so memory stays flat
+    regardless of table size; `gzip=true` compresses on the fly.
+    """
+    filename = f"{table}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_stream(table, format, date_from, date_to, gzip=gzip),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
+
+@router.get("/archive/{table}")
+def list_archived_months(table: Literal["transactions", "ledger"]):
+    """Manifests (month, row count, checksum) of the months moved to the archive."""
+    return archived_months(ARCHIVE_TABLE_BY_EXPORT[table])
+
+
+@router.get("/archive/{table}/{month}")
+def read_archived_month(
+    table: Literal["transactions", "ledger"],
+    month: str = Path(pattern=r"^\d{4}-\d{2}$"),
+    user_id: str | None = None,
+    vendor: str | None = None,
+    status: TxStatus | None = None,
+):
+    """
+    Stream one archived month back as NDJSON, read from its compressed file
+    on demand; optional filters are applied while reading.
+    """
+    year, number = map(int, month.split("-"))
+    if not 1 <= number <= 12:
+        raise HTTPException(status_code=422, detail="month must be YYYY-MM")
+    rows = read_archive(
+        ARCHIVE_TABLE_BY_EXPORT[table], date(year, number, 1),
+        user_id=user_id, vendor=vendor, status=status.value if status else None,
+    )
+    if rows is None:
+        raise HTTPException(status_code=404, detail=f"{month} is not archived")
+    _, columns = EXPORT_TABLES[table]
+    return StreamingResponse(
+        encode_ndjson((tuple(row.get(c) for c in columns) for row in rows), columns),
+        media_type=EXPORT_FORMATS["ndjson"],
+    )
+
+
 @router.post("/api/verify-transaction-post-question")
-async def get_question(transaction: Transaction):
-    suspicious, reason = is_suspicious(transaction)
+async def get_question(
+    transaction: Transaction, request: Request, response: Response, idempotency_key: str | None = Header(None)
+):
+    # Client retries get the stored response; detection, the notification
+    # and question generation run at most once per transaction_id, and only
+    # that run is charged to the admission buckets
+    async def detect():
+        await admit(request)
+        return await _verify_post_question(transaction)
+
+    async def verify():
+        return await VERDICT_CACHE.get_or_compute(transaction.transaction_id, detect)
+
+    return await _idempotent(
+        "verify_post_question", idempotency_key, transaction.model_dump(mode="json"), response, verify
+    )
+
+
+def _detect(transaction: Transaction):
+    """Run detection with a session, so profile misses load the user's history."""
+    with read_session_factory()() as db:
+        return is_suspicious(transaction, db)
+
+
+async def _verify_post_question(transaction: Transaction):
+    suspicious, reason = await run_in_threadpool(_detect, transaction)
     if not suspicious:
         transaction.status = "approved"
         result = post_transaction(transaction)
-        TRANSACTIONS_DB.append(result)
+        TRANSACTION_STORE.put(result)
         LOGGER.info(f"Transaction approved: {transaction.transaction_id}")
         return {"transaction_id": transaction.transaction_id, "suspicious": False, "reason": "Normal"}
     if suspicious:
         transaction.status= "blocked"
-        TRANSACTIONS_DB.append(transaction.dict())
+        TRANSACTION_STORE.put(transaction.dict())
 
-        notif = send_notification(
-        transaction.user_id,
-        "I blocked the transaction because it seemed suspicious. Is it yours?"
+        # the notification store writes through to the database; keep that off the event loop
+        await run_in_threadpool(
+            send_notification,
+            transaction.user_id,
+            "I blocked the transaction because it seemed suspicious. Is it yours?",
         )
-        NOTIFICATIONS_DB.append(notif)
 
         LOGGER.warning(f"Transaction blocked: {transaction.transaction_id} ({reason})")
         try:
-            q_payload = generate_security_question()
+            q_payload = await LLM_EXECUTOR.run(generate_security_question)
             if isinstance(q_payload, JSONResponse):
                 # error path from generate_security_question
                 raise RuntimeError("Failed to generate security questions")
             security_questions = q_payload["security_questions"]
+        except ExecutorSaturated:
+            raise HTTPException(status_code=503, detail="Security question service is busy, retry later")
+        except BlockingCallTimeout:
+            LOGGER.error(f"Security question generation timed out for {transaction.transaction_id}")
+            raise HTTPException(status_code=504, detail="Security question generation timed out")
         except Exception as e:
             LOGGER.exception("Failed to generate security questions")
             raise HTTPException(
@@ -102,7 +353,66 @@ async def get_question(transaction: Transaction):
             "question": q_payload
         }
 
+@router.post("/api/score-batch")
+def score_transactions_batch(transactions: list[Transaction]):
+    """Score up to SCORE_BATCH_MAX transactions with the vectorized rule set (no side effects)."""
+    if len(transactions) > SCORE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"batch exceeds {SCORE_BATCH_MAX} items")
+    with read_session_factory()() as db:
+        results = score_batch(transactions, db=db)
+    return {
+        "results": results,
+        "flagged": sum(1 for r in results if r["suspicious"]),
+    }
+
+
+
 
+@router.post("/api/stream/transactions", status_code=202)
+async def enqueue_transaction(transaction: Transaction):
+    """Publish a transaction to the detection stream instead of scoring it inline."""
+    if STREAM is None:
+        raise HTTPException(status_code=404, detail="detection stream is not enabled")
+    try:
+        message_id = await STREAM.publish(transaction.model_dump(mode="json"))
+    except StreamFull:
+        raise HTTPException(status_code=503, detail="detection stream is full, retry later")
+    return {"transaction_id": transaction.transaction_id, "message_id": message_id}
+
+
+def approve_streamed_transaction(transaction: Transaction):
+    """Fast path for the stream consumer: record a transaction that passed detection."""
+    TRANSACTION_STORE.put(post_transaction(transaction))
+
+
+async def block_streamed_transaction(transaction: Transaction, reason: str):
+    """
+    Slow path for the stream consumer: notify the user and prepare security
+    questions, kept on the stored record for the client to fetch. The
+    transaction stays blocked without them if generation fails.
+    """
+    TRANSACTION_STORE.put(transaction.dict())
+    await run_in_threadpool(
+        send_notification,
+        transaction.user_id,
+        "I blocked the transaction because it seemed suspicious. Is it yours?",
+    )
+    LOGGER.warning(f"Transaction blocked: {transaction.transaction_id} ({reason})")
+    try:
+        q_payload = await LLM_EXECUTOR.run(generate_security_question)
+    except (ExecutorSaturated, BlockingCallTimeout) as e:
+        LOGGER.error(f"No security questions for {transaction.transaction_id}: {type(e).__name__}")
+        return
+    if isinstance(q_payload, JSONResponse):
+        LOGGER.error(f"No security questions for {transaction.transaction_id}: generation failed")
+        return
+    TRANSACTION_STORE.put({**transaction.dict(), "security_questions": q_payload["security_questions"]})
+
+
+@router.get("/api/detection/rules/stats")
+async def detection_rule_stats():
+    """Per-rule evaluation counts, hit counts and timing."""
+    return {"rules": get_rule_stats()}
 
 
 
@@ -111,12 +421,34 @@ async def get_question(transaction: Transaction):
 
 
 @router.post("/api/verify-transaction")
-async def verify_transaction(transaction: Transaction, answer:str):
-    ans = verify_security_answer(answer)
+async def verify_transaction(
+    transaction: Transaction,
+    answer: str,
+    request: Request,
+    response: Response,
+    idempotency_key: str | None = Header(None),
+):
+    request_body = {"transaction": transaction.model_dump(mode="json"), "answer": answer}
+    return await _idempotent(
+        "verify_transaction", idempotency_key, request_body, response,
+        lambda: _verify_answer(request, transaction, answer),
+    )
+
+
+async def _verify_answer(request: Request, transaction: Transaction, answer: str):
+    await admit(request)
+    try:
+        ans = await LLM_EXECUTOR.run(verify_security_answer, answer)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Verification service is busy, retry later")
+    except BlockingCallTimeout:
+        raise HTTPException(status_code=504, detail="Answer verification timed out")
     if ans:
         transaction.status = "approved"
         result = post_transaction(transaction)
-        TRANSACTIONS_DB.append(result)
+        TRANSACTION_STORE.put(result)
+        # the stored "blocked" verdict and its questions no longer apply
+        VERDICT_CACHE.invalidate(transaction.transaction_id)
         LOGGER.info(f"Transaction approved: {transaction.transaction_id}")
         return {"transaction_id": transaction.transaction_id, "suspicious": False, "reason": "Normal"}
     
@@ -133,7 +465,7 @@ async def verify_transaction(transaction: Transaction, answer:str):
     # # If not suspicious → approve and save
     # transaction.status = "approved"
     # result = post_transaction(transaction)
-    # TRANSACTIONS_DB.append(result)
+    # TRANSACTION_STORE.put(result)
     # LOGGER.info(f"Transaction approved: {transaction.transaction_id}")
     # return {"transaction_id": transaction.transaction_id, "suspicious": False, "reason": "Normal"}
 
@@ -141,13 +473,116 @@ async def verify_transaction(transaction: Transaction, answer:str):
 
 
 @router.get("/api/transactions")
-async def get_transactions():
-    """Get all transactions (simulated database)."""
-    return {"transactions": TRANSACTIONS_DB}
+async def get_transactions(
+    user_id: str | None = None,
+    status: str | None = None,
+    limit: int = Query(100, ge=1, le=TRANSACTION_STORE_MAX_PAGE),
+    offset: int = Query(0, ge=0),
+):
+    """Get recent transactions (newest first), optionally filtered by user and status."""
+    transactions, total = TRANSACTION_STORE.list(user_id=user_id, status=status, limit=limit, offset=offset)
+    return {"transactions": transactions, "total": total, "limit": limit, "offset": offset}
+
+
+def _notification_cursor(notification: dict) -> str:
+    return f"{notification['created_at'].isoformat()}|{notification['notification_id']}"
+
+
+def _decode_notification_cursor(cursor: str) -> tuple[datetime, str | None]:
+    """`<created_at>|<notification_id>`, or a bare timestamp (only later notifications)."""
+    created_at, _, notification_id = cursor.partition("|")
+    try:
+        since = datetime.fromisoformat(created_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since, notification_id or None
 
 
 @router.get("/api/notifications/{user_id}")
-async def get_notifications(user_id: str):
-    """Return all notifications for a user."""
-    user_notifs = [n for n in NOTIFICATIONS_DB if n["user_id"] == user_id]
-    return {"notifications": user_notifs}
\ No newline at end of file
+def get_notifications(user_id: str, since: str | None = None, unread_only: bool = False):
+    """
+    Return a user's notifications, oldest first.
+    Pass the returned `cursor` as `since` on the next poll to fetch only new ones.
+    """
+    after = _decode_notification_cursor(since) if since else (None, None)
+    notifications = NOTIFICATION_STORE.list_since(user_id, *after, unread_only=unread_only)
+    cursor = _notification_cursor(notifications[-1]) if notifications else since
+    return {
+        "notifications": notifications,
+        "unread_count": NOTIFICATION_STORE.unread_count(user_id),
+        "cursor": cursor,
+    }
+
+
+@router.post("/api/notifications/{user_id}/read")
+def mark_notifications_read(user_id: str, payload: MarkReadIn):
+    """Mark the given notifications (or all, if none given) as read."""
+    updated = NOTIFICATION_STORE.mark_read(user_id, payload.notification_ids)
+    return {"updated": updated, "unread_count": NOTIFICATION_STORE.unread_count(user_id)}
+
+
+def _sse_event(notification: dict) -> str:
+    # the cursor doubles as the event id, so a reconnect resumes from it
+    data = json.dumps(notification, default=str)
+    return f"id: {_notification_cursor(notification)}\nevent: notification\ndata: {data}\n\n"
+
+
+@router.get("/api/notifications/{user_id}/stream")
+async def stream_notifications(
+    user_id: str,
+    request: Request,
+    since: str | None = None,
+    last_event_id: str | None = Header(None),
+):
+    """
+    Server-Sent Events stream of a user's notifications.
+    On reconnect the browser sends Last-Event-ID and anything newer is
+    replayed from the store before live events resume; `since` does the
+    same for the first connection. A comment line is sent every
+    NOTIFICATION_HEARTBEAT_SECONDS to keep proxies from closing the stream.
+    """
+    resume_from = last_event_id or since
+    cursor = _decode_notification_cursor(resume_from) if resume_from else None
+    # subscribe before the response starts, so a full pod refuses with a 503
+    # instead of opening an empty stream; also before the replay, so nothing
+    # sent in between is lost
+    try:
+        subscription = NOTIFICATION_BROKER.subscribe(user_id)
+    except TooManyConnections:
+        raise HTTPException(
+            status_code=503, detail="too many notification streams, retry later", headers={"Retry-After": "5"}
+        )
+
+    async def events():
+        try:
+            yield f"retry: {NOTIFICATION_RECONNECT_MS}\n\n"
+            replayed = set()
+            if cursor is not None:
+                for notification in await run_in_threadpool(NOTIFICATION_STORE.list_since, user_id, *cursor):
+                    replayed.add(notification["notification_id"])
+                    yield _sse_event(notification)
+
+            # a subscriber that fell behind is closed once drained; the client
+            # reconnects with its Last-Event-ID and catches up from the store
+            while not subscription.overflowed or not subscription.queue.empty():
+                notification = await subscription.get(NOTIFICATION_HEARTBEAT_SECONDS)
+                if notification is None:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if notification["notification_id"] in replayed:
+                    continue  # already sent by the replay
+                yield _sse_event(notification)
+        finally:
+            NOTIFICATION_BROKER.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # unsubscribe is idempotent; this covers a stream whose generator never ran
+        background=BackgroundTask(NOTIFICATION_BROKER.unsubscribe, subscription),
+    )
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class MarkReadIn(BaseModel):
+    notification_ids: list[str] | None = Field(
+        default=None, description="Notifications to mark read; omit to mark all"
+    )
@@ -8,6 +8,11 @@ class TransactionIn(BaseModel):
     vendor: str = Field(min_length=1, max_length=120)
     category: str = Field(min_length=1, max_length=80)
     date: dt.date
+    # time of day the transaction happened; aware times are stored as UTC
+    time: dt.time | None = None
+    user_id: str | None = Field(default=None, max_length=64)
+    country: str | None = Field(default=None, max_length=64)
+    currency: str = Field(default="USD", min_length=3, max_length=3)
 
 class TransactionOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -22,6 +27,26 @@ class TransactionOut(BaseModel):
     updated_at: dt.datetime
 
 
+class BatchItemError(BaseModel):
+    index: int  # position in the submitted batch
+    errors: list[dict]
+
+
+class TransactionBatchItemOut(TransactionOut):
+    index: int  # position in the submitted batch
+
+
+class TransactionBatchOut(BaseModel):
+    items: list[TransactionBatchItemOut]
+    errors: list[BatchItemError] = []
+
+
+class TransactionPage(BaseModel):
+    items: list[TransactionOut]
+    # opaque keyset cursor; pass back as `cursor` to get the next page
+    next_cursor: str | None = None
+
+
 class PostTransactionIn(BaseModel):
     approved: bool
     provider_ref: str | None = None
@@ -30,4 +55,22 @@ class PostTransactionOut(TransactionOut):
     ledger_id: int | None = None
 
 class ApproveIn(BaseModel):
-    provider_ref: str | None = None
\ No newline at end of file
+    provider_ref: str | None = None
+
+
+class ApproveBatchIn(BaseModel):
+    tx_ids: list[int] = Field(min_length=1)
+    provider_ref: str | None = None
+
+
+class ApproveBatchOut(BaseModel):
+    items: list[PostTransactionOut]
+    not_found: list[int] = []
+
+
+class DailyAggregateOut(BaseModel):
+    day: dt.date
+    category: str | None = None  # set when grouped by category
+    vendor: str | None = None    # set when grouped by vendor
+    approved_count: int
+    approved_amount: Decimal
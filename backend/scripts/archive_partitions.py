@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Partition Maintenance & Archival Script
+Creates upcoming monthly partitions and moves months older than the
+retention window out to compressed files in ARCHIVE_DIR.
+
+Usage:
+    python scripts/archive_partitions.py --list
+    python scripts/archive_partitions.py --retention-months 13 --dry-run
+    python scripts/archive_partitions.py --retention-months 13
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db.db import engine, DATABASE_URL
+from db.partitions import PARTITIONED_TABLES, is_partitioned, partition_months, run_maintenance
+from services.archive_service import (
+    ARCHIVE_ALLOW_LOCAL_DISK, ARCHIVE_DIR, ARCHIVE_RETENTION_MONTHS, ARCHIVE_TABLES, archive_expired, archived_months, months_to_archive,
+)
+
+
+def show_status():
+    """Print attached partitions and archived months per table"""
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            if is_partitioned(conn, table):
+                months = partition_months(conn, table)
+                span = f"{months[0]:%Y-%m} .. {months[-1]:%Y-%m}" if months else "none"
+                print(f"  📦 {table}: {len(months)} monthly partitions ({span})")
+            else:
+                print(f"  📦 {table}: not partitioned")
+    for table in ARCHIVE_TABLES:
+        manifests = archived_months(table)
+        rows = sum(m["rows"] for m in manifests)
+        print(f"  🗄️  {table}: {len(manifests)} archived months, {rows:,} rows in {ARCHIVE_DIR}/{table}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming partitions and archive old months")
+    parser.add_argument("--retention-months", type=int, default=ARCHIVE_RETENTION_MONTHS,
+                        help="Archive months older than this many months (default: ARCHIVE_RETENTION_MONTHS)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the months that would be archived")
+    parser.add_argument("--list", action="store_true", help="Show partitions and archived months")
+    parser.add_argument("--allow-local-disk", action="store_true", default=ARCHIVE_ALLOW_LOCAL_DISK,
+                        help="Archive even when ARCHIVE_DIR is not on a mounted volume (development only)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Partition Maintenance")
+    print("=" * 60)
+    print(f"Database: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL}")
+    print()
+
+    if args.list:
+        show_status()
+        sys.exit(0)
+
+    if args.retention_months <= 0:
+        print("⚠️  No retention window set (--retention-months / ARCHIVE_RETENTION_MONTHS); nothing will be archived")
+
+    if args.dry_run:
+        months = months_to_archive(engine, args.retention_months) if args.retention_months > 0 else []
+        print(f"Would archive {len(months)} month(s): {', '.join(f'{m:%Y-%m}' for m in months) or '-'}")
+        sys.exit(0)
+
+    try:
+        manifests = []
+        run_maintenance(engine, archive=lambda: manifests.extend(
+            archive_expired(engine, args.retention_months, allow_local_disk=args.allow_local_disk)
+        ))
+    except Exception as e:
+        print(f"❌ Maintenance failed: {e}")
+        sys.exit(1)
+
+    for m in manifests:
+        print(f"  ✅ {m['table']} {m['month']}: {m['rows']:,} rows -> {m['file']}")
+    print()
+    print("=" * 60)
+    print(f"Archived {len(manifests)} table-month(s)")
+    print("=" * 60)
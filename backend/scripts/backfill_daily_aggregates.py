@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Daily Aggregates Backfill Script
+Rebuilds daily_aggregates (approved count and amount per day, category and
+vendor) from transaction_ledger, e.g. after a bulk load or to repair drift.
+
+Usage:
+    python scripts/backfill_daily_aggregates.py
+    python scripts/backfill_daily_aggregates.py --date-from 2024-01-01 --date-to 2024-03-31
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from datetime import date
+
+# Add parent directory to path to import backend modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db.db import SessionLocal, DATABASE_URL
+from providers.aggregates import backfill_daily_aggregates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild daily_aggregates from the ledger")
+    parser.add_argument("--date-from", type=date.fromisoformat, help="First day to rebuild (default: oldest ledger day)")
+    parser.add_argument("--date-to", type=date.fromisoformat, help="Last day to rebuild (default: newest ledger day)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Daily Aggregates Backfill")
+    print("=" * 60)
+    print(f"Database: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL}")
+    print(f"Range: {args.date_from or 'oldest'} .. {args.date_to or 'newest'}")
+    print()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        written = backfill_daily_aggregates(db, args.date_from, args.date_to)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"✅ Wrote {written:,} aggregate rows in {time.perf_counter() - started:.1f}s")
+    print("=" * 60)
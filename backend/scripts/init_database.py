@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """
 Database Initialization Script
-Creates all database tables from SQLAlchemy models
+Brings the database schema up to date by applying pending migrations
+from db/migrations/versions
 """
 
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -11,40 +13,40 @@ from pathlib import Path
 # Add parent directory to path to import backend modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from db.db import Base, engine, DATABASE_URL
-from models.Transcation import TransactionDB
-from models.ledger import TransactionLedger
+from db.db import engine, DATABASE_URL
+from db.migrations import discover, migrate, pending
 from sqlalchemy import inspect
 
 
-def create_tables():
-    """Create all database tables from SQLAlchemy models"""
+def create_tables(target=None):
+    """Apply pending migrations up to `target` (default: latest)"""
     print(f"Connecting to database: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL}")
-    
-    # Import all models to register them with Base
-    # SQLAlchemy needs all models imported before create_all()
-    print("Creating database tables...")
-    
+    print("Applying migrations...")
+
     try:
-        # Drop all tables (CAUTION: This deletes all data!)
-        # Uncomment if you need to reset the database
-        # print("⚠️  Dropping all existing tables...")
-        # Base.metadata.drop_all(engine)
-        
-        # Create all tables
-        Base.metadata.create_all(engine)
-        print("✅ Database tables created successfully!")
-        
+        applied = migrate(engine, target=target, log=lambda msg: print(f"  {msg}"))
+        if applied:
+            print(f"✅ Applied {len(applied)} migration(s)")
+        else:
+            print("✅ Schema already up to date")
+
         # Verify tables were created
         inspector = inspect(engine)
         tables = inspector.get_table_names()
-        print(f"\nCreated tables: {', '.join(tables)}")
-        
+        print(f"\nTables: {', '.join(tables)}")
+
     except Exception as e:
-        print(f"❌ Error creating tables: {e}")
+        print(f"❌ Error applying migrations: {e}")
         sys.exit(1)
 
 
+def show_status():
+    """List migrations and whether each one has been applied"""
+    waiting = {m.version for m in pending(engine)}
+    for m in discover():
+        print(f"  {'⏳ pending' if m.version in waiting else '✅ applied'}  {m.version:04d}_{m.name}")
+
+
 def verify_connection():
     """Verify database connection"""
     try:
@@ -61,6 +63,11 @@ def verify_connection():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--target", type=int, help="Stop after this migration version")
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("InvestIQ Database Initialization")
     print("=" * 60)
@@ -70,7 +77,10 @@ if __name__ == "__main__":
         sys.exit(1)
     
     print()
-    create_tables()
+    if args.status:
+        show_status()
+        sys.exit(0)
+    create_tables(args.target)
     print()
     print("=" * 60)
     print("Database initialization complete!")
@@ -39,6 +39,23 @@ def parse_date(date_str, formats=['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y', '
         return datetime.now().date()
 
 
+def parse_timestamp(date_str, formats=['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']):
+    """Parse timestamp string, keeping the time of day when present"""
+    if not date_str:
+        return None
+    
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str.strip(), fmt)
+        except ValueError:
+            continue
+    
+    try:
+        return datetime.fromisoformat(date_str.strip().replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
 def parse_amount(amount_str):
     """Parse amount string to Decimal"""
     if not amount_str:
@@ -62,6 +79,9 @@ def map_csv_to_transaction(row, csv_columns):
         'category': ['category', 'Category', 'CATEGORY', 'type', 'Type', 'TYPE'],
         'date': ['date', 'Date', 'DATE', 'transaction_date', 'Transaction Date', 'tx_date'],
         'status': ['status', 'Status', 'STATUS', 'transaction_status'],
+        'user_id': ['user_id', 'User ID', 'USER_ID', 'customer_id'],
+        'country': ['country', 'Country', 'COUNTRY'],
+        'currency': ['currency', 'Currency', 'CURRENCY'],
     }
     
     # Find matching column indices
@@ -76,6 +96,9 @@ def map_csv_to_transaction(row, csv_columns):
     category_idx = find_column('category')
     date_idx = find_column('date')
     status_idx = find_column('status')
+    user_idx = find_column('user_id')
+    country_idx = find_column('country')
+    currency_idx = find_column('currency')
     
     # Extract values (use index or try to guess)
     amount = parse_amount(row[amount_idx] if amount_idx is not None else row[0])
@@ -84,8 +107,13 @@ def map_csv_to_transaction(row, csv_columns):
     date_str = row[date_idx] if date_idx is not None else (row[3] if len(row) > 3 else None)
     status_str = row[status_idx].strip().lower() if status_idx is not None and len(row) > status_idx else 'pending'
     
+    user_id = row[user_idx].strip() if user_idx is not None and row[user_idx].strip() else None
+    country = row[country_idx].strip() if country_idx is not None and row[country_idx].strip() else None
+    currency = row[currency_idx].strip().upper() if currency_idx is not None and row[currency_idx].strip() else 'USD'
+    
     # Parse date
     tx_date = parse_date(date_str) if date_str else datetime.now().date()
+    tx_ts = parse_timestamp(date_str) or datetime.combine(tx_date, datetime.min.time())
     
     # Parse status
     status_map = {
@@ -97,10 +125,14 @@ def map_csv_to_transaction(row, csv_columns):
     status = status_map.get(status_str, TxStatus.pending)
     
     return TransactionDB(
+        user_id=user_id[:64] if user_id else None,
         amount=amount,
         vendor=vendor[:120],  # Truncate to max length
         category=category[:80],  # Truncate to max length
+        country=country[:64] if country else None,
+        currency=currency[:3],
         tx_date=tx_date,
+        tx_ts=tx_ts,
         status=status,
     )
 
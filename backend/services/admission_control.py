@@ -0,0 +1,237 @@
+"""
+Admission Control
+Per-user and global token buckets in front of expensive routes (the
+verification path calls the LLM). An ASGI middleware identifies the user
+of a limited route; the route charges the buckets with `admit` only once
+the request reaches detection, so validation errors, idempotent replays
+and cached verdicts cost nothing. An empty bucket answers 429 with
+Retry-After.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from metrics_utils import Counter
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory")  # "memory" or "redis"
+ADMISSION_MAX_BUCKETS = int(os.getenv("ADMISSION_MAX_BUCKETS", "200000"))
+ADMISSION_VERIFY_USER_RATE = float(os.getenv("ADMISSION_VERIFY_USER_RATE", "0.2"))  # tokens per second
+ADMISSION_VERIFY_USER_BURST = float(os.getenv("ADMISSION_VERIFY_USER_BURST", "5"))
+ADMISSION_VERIFY_GLOBAL_RATE = float(os.getenv("ADMISSION_VERIFY_GLOBAL_RATE", "20"))
+ADMISSION_VERIFY_GLOBAL_BURST = float(os.getenv("ADMISSION_VERIFY_GLOBAL_BURST", "50"))
+
+ADMISSION_DECISIONS = Counter(
+    "admission_requests_total", "Requests seen by admission control", ["limit", "result"]
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Requests rejected by admission control", ["limit", "bucket"]
+)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    """Token-bucket settings for a group of routes; `name` keys the buckets and metrics."""
+    name: str
+    user_rate: float
+    user_burst: float
+    global_rate: float
+    global_burst: float
+
+
+VERIFICATION_LIMIT = RouteLimit(
+    "verification",
+    ADMISSION_VERIFY_USER_RATE,
+    ADMISSION_VERIFY_USER_BURST,
+    ADMISSION_VERIFY_GLOBAL_RATE,
+    ADMISSION_VERIFY_GLOBAL_BURST,
+)
+
+# (method, path below the /api mount) -> limit; routes sharing a limit share buckets
+ADMISSION_LIMITS = {
+    ("POST", "/transactions/api/verify-transaction-post-question"): VERIFICATION_LIMIT,
+    ("POST", "/transactions/api/verify-transaction"): VERIFICATION_LIMIT,
+}
+
+
+class LocalTokenBuckets:
+    """In-process buckets, LRU-bounded; each replica enforces its own limits"""
+
+    def __init__(self, max_buckets: int = ADMISSION_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    async def acquire(self, key: str, rate: float, burst: float, now: float | None = None) -> float:
+        """Take one token. Returns 0 when admitted, else seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate if rate > 0 else math.inf
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# KEYS[1] bucket; ARGV rate, burst, now (seconds). Returns the wait in ms (0 = admitted).
+_REDIS_TOKEN_BUCKET = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return wait
+"""
+
+
+class RedisTokenBuckets:
+    """
+    Buckets shared by all replicas, updated atomically by a Lua script
+    (requires the redis package). If Redis is unreachable the local
+    buckets take over so admission degrades to per-replica limits.
+    """
+
+    def __init__(self, url: str, prefix: str = "admission:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+        self.prefix = prefix
+        self._fallback = LocalTokenBuckets()
+
+    async def acquire(self, key: str, rate: float, burst: float, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        try:
+            wait_ms = await self._script(keys=[self.prefix + key], args=[rate, burst, now])
+        except Exception as e:
+            LOGGER.warning(f"Redis admission control unavailable, using local buckets: {e}")
+            return await self._fallback.acquire(key, rate, burst)
+        return int(wait_ms) / 1000
+
+
+def build_buckets():
+    if ADMISSION_BACKEND == "redis":
+        return RedisTokenBuckets(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return LocalTokenBuckets()
+
+
+def _user_from_body(body: bytes) -> str | None:
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    user_id = payload.get("user_id") if isinstance(payload, dict) else None
+    return str(user_id) if user_id else None
+
+
+async def admit(request):
+    """
+    Charge the request's admission buckets, raising 429 when one is empty.
+    Does nothing for routes without a limit (or without the middleware).
+    """
+    charge = getattr(request.state, "admission", None)
+    if charge is not None:
+        await charge()
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware. For limited routes it reads the request body to
+    find the user (JSON `user_id`, else the X-User-Id header, else the
+    client address), replays the body to the application and leaves a
+    `request.state.admission` callable that checks the user's bucket and
+    then the route's global bucket when the route calls `admit`.
+    """
+
+    def __init__(self, app, limits: dict = ADMISSION_LIMITS, buckets=None):
+        self.app = app
+        self.limits = limits
+        self.buckets = buckets if buckets is not None else build_buckets()
+
+    def _route_path(self, scope) -> str:
+        path, root_path = scope["path"], scope.get("root_path", "")
+        return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http":
+            limit = self.limits.get((scope["method"], self._route_path(scope)))
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        # buffer the body so it can be inspected and then handed on unchanged
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return await self.app(scope, receive, send)  # client went away
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+
+        headers = dict(scope.get("headers") or [])
+        user_id = _user_from_body(body) or headers.get(b"x-user-id", b"").decode() or None
+        if user_id is None and scope.get("client"):
+            user_id = f"ip:{scope['client'][0]}"
+
+        async def charge():
+            wait = 0.0
+            bucket = None
+            if user_id is not None:
+                wait = await self.buckets.acquire(f"{limit.name}:user:{user_id}", limit.user_rate, limit.user_burst)
+                bucket = "user"
+            if not wait:
+                wait = await self.buckets.acquire(f"{limit.name}:global", limit.global_rate, limit.global_burst)
+                bucket = "global"
+
+            if wait:
+                ADMISSION_DECISIONS.inc(limit=limit.name, result="rejected")
+                ADMISSION_REJECTIONS.inc(limit=limit.name, bucket=bucket)
+                retry_after = str(max(1, math.ceil(wait))) if math.isfinite(wait) else "60"
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Too many requests ({bucket} limit), retry later",
+                    headers={"Retry-After": retry_after},
+                )
+            ADMISSION_DECISIONS.inc(limit=limit.name, result="admitted")
+
+        scope.setdefault("state", {})["admission"] = charge
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
@@ -0,0 +1,233 @@
+"""
+Archive Service
+Moves months older than the retention window out of transactions and
+transaction_ledger into gzipped NDJSON files
+(<ARCHIVE_DIR>/<table>/YYYY-MM.ndjson.gz plus a .json manifest). On
+Postgres the month's partition is detached and dropped; elsewhere the
+rows are deleted. Archived months stay readable through `read_archive`.
+ARCHIVE_DIR must be on a mounted volume shared by every pod (see
+infra/kubernetes/backend-deployment.yaml); rows are only removed from the
+database when it is, or when ARCHIVE_ALLOW_LOCAL_DISK=1 (development).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import column, delete, select, table as sa_table, text
+from sqlalchemy.engine import Engine
+from db.partitions import (
+    PARTITIONED_TABLES, add_months, is_partitioned, month_start, partition_months, partition_name,
+)
+from services.export_service import EXPORT_TABLES, encode_ndjson, gzip_chunks
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_RETENTION_MONTHS = int(os.getenv("ARCHIVE_RETENTION_MONTHS", "0"))  # 0 = never archive automatically
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+ARCHIVE_ALLOW_LOCAL_DISK = os.getenv("ARCHIVE_ALLOW_LOCAL_DISK", "0") == "1"
+_ARCHIVE_LOCK_ID = 72_201_612  # one archiver at a time across pods
+
+# database table -> export table (columns); children first so the ledger's
+# references are gone before a transactions partition is detached
+ARCHIVE_TABLES = {"transaction_ledger": "ledger", "transactions": "transactions"}
+ARCHIVE_TABLE_BY_EXPORT = {export: table for table, export in ARCHIVE_TABLES.items()}
+
+
+def archive_path(table: str, month: date, archive_dir: str = ARCHIVE_DIR) -> Path:
+    return Path(archive_dir) / table / f"{month:%Y-%m}.ndjson.gz"
+
+
+def on_mounted_volume(archive_dir: str = ARCHIVE_DIR) -> bool:
+    """
+    Whether `archive_dir` lives on a volume mounted into the container rather
+    than on the container's own filesystem, which is lost with the pod.
+    """
+    path = Path(archive_dir).resolve()
+    return any(os.path.ismount(p) for p in (path, *path.parents) if p != Path(p.anchor))
+
+
+def check_archive_storage(archive_dir: str = ARCHIVE_DIR, allow_local_disk: bool = ARCHIVE_ALLOW_LOCAL_DISK):
+    """Refuse to archive (and so delete rows) unless the files will outlive the pod."""
+    if not allow_local_disk and not on_mounted_volume(archive_dir):
+        raise RuntimeError(
+            f"ARCHIVE_DIR {archive_dir} is not on a mounted volume; archived months would be lost "
+            "with the pod (set ARCHIVE_ALLOW_LOCAL_DISK=1 to archive to local disk anyway)"
+        )
+
+
+def _manifest_path(path: Path) -> Path:
+    return path.with_name(path.name.replace(".ndjson.gz", ".json"))
+
+
+def _source(table: str, name: str):
+    """Lightweight table clause over the export columns of `table`, read from `name`."""
+    model, columns = EXPORT_TABLES[ARCHIVE_TABLES[table]]
+    return sa_table(name, *(column(c, model.__table__.c[c].type) for c in columns)), columns
+
+
+def _write_archive(path: Path, rows, columns) -> dict:
+    """Write rows as gzipped NDJSON via a temp file; returns the manifest."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    count = 0
+    digest = hashlib.sha256()
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with open(tmp_path, "wb") as f:
+        for chunk in gzip_chunks(encode_ndjson(counted(), columns)):
+            digest.update(chunk)
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return {
+        "file": path.name,
+        "rows": count,
+        "sha256": digest.hexdigest(),
+        "columns": list(columns),
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+
+
+def archive_month(engine: Engine, table: str, month: date, archive_dir: str = ARCHIVE_DIR,
+                  allow_local_disk: bool = ARCHIVE_ALLOW_LOCAL_DISK) -> dict | None:
+    """
+    Archive one month of `table` and remove it from the database. The file
+    is written and synced before the partition is dropped, all inside one
+    transaction that blocks writes to both tables. Returns the manifest, or
+    None when there is nothing to archive.
+    """
+    check_archive_storage(archive_dir, allow_local_disk)
+    month = month_start(month)
+    path = archive_path(table, month, archive_dir)
+    if path.exists():
+        raise RuntimeError(f"{path} already exists; refusing to overwrite an archive")
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            partitioned = is_partitioned(conn, table)
+            if partitioned and month not in partition_months(conn, table):
+                trans.rollback()
+                return None
+            name = partition_name(table, month) if partitioned else table
+            source, columns = _source(table, name)
+            in_month = (source.c.tx_date >= month, source.c.tx_date < add_months(month, 1))
+            if conn.dialect.name == "postgresql":
+                # block writes while the month is exported, locking the parent
+                # tables (not the partition) first and in the writers' order:
+                # the DETACH/DROP below then only upgrades locks already held
+                for parent in PARTITIONED_TABLES:
+                    conn.execute(text(f"LOCK TABLE {parent} IN SHARE MODE"))
+            if not partitioned and not conn.scalar(select(source.c.id).where(*in_month).limit(1)):
+                trans.rollback()
+                return None
+
+            rows = conn.execute(
+                select(*source.c).where(*in_month).order_by(source.c.tx_date, source.c.id)
+                .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+            )
+            manifest = _write_archive(path, (tuple(row) for row in rows), columns)
+            manifest.update(table=table, month=f"{month:%Y-%m}")
+            _manifest_path(path).write_text(json.dumps(manifest, indent=2))
+
+            if partitioned:
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+            else:
+                conn.execute(delete(source).where(*in_month))
+            trans.commit()
+        except BaseException:
+            if trans.is_active:
+                trans.rollback()
+            # the rows are still in the database: the archive must not survive
+            for leftover in (path, _manifest_path(path), path.with_name(path.name + ".tmp")):
+                leftover.unlink(missing_ok=True)
+            raise
+
+    LOGGER.info(f"Archived {manifest['rows']} rows of {table} for {manifest['month']} to {path}")
+    return manifest
+
+
+def months_to_archive(engine: Engine, retention_months: int, today: date | None = None) -> list[date]:
+    """Months older than the retention window that are still in the database."""
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    months = set()
+    with engine.connect() as conn:
+        for table in ARCHIVE_TABLES:
+            if is_partitioned(conn, table):
+                months.update(m for m in partition_months(conn, table) if m < cutoff)
+            else:
+                source, _ = _source(table, table)
+                days = conn.scalars(select(source.c.tx_date).where(source.c.tx_date < cutoff).distinct())
+                months.update(month_start(day) for day in days)
+    return sorted(months)
+
+
+def archive_expired(engine: Engine, retention_months: int = ARCHIVE_RETENTION_MONTHS,
+                    today: date | None = None, archive_dir: str = ARCHIVE_DIR,
+                    allow_local_disk: bool = ARCHIVE_ALLOW_LOCAL_DISK) -> list[dict]:
+    """Archive every month older than `retention_months`. Returns the manifests written."""
+    if retention_months <= 0:
+        return []
+    check_archive_storage(archive_dir, allow_local_disk)
+    with engine.connect() as lock_conn:
+        if lock_conn.dialect.name == "postgresql":
+            if not lock_conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": _ARCHIVE_LOCK_ID}):
+                LOGGER.info("Archival already running elsewhere; skipping")
+                return []
+        try:
+            manifests = []
+            for month in months_to_archive(engine, retention_months, today):
+                for table in ARCHIVE_TABLES:
+                    if archive_path(table, month, archive_dir).exists():
+                        # rows written into the month after it was archived
+                        LOGGER.warning(f"{table} {month:%Y-%m} is already archived but has rows again; skipping")
+                        continue
+                    manifest = archive_month(engine, table, month, archive_dir, allow_local_disk)
+                    if manifest is not None:
+                        manifests.append(manifest)
+            return manifests
+        finally:
+            if lock_conn.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ARCHIVE_LOCK_ID})
+
+
+def archived_months(table: str, archive_dir: str = ARCHIVE_DIR) -> list[dict]:
+    """Manifests of the archived months of `table`, oldest first."""
+    folder = Path(archive_dir) / table
+    if not folder.is_dir():
+        return []
+    return [json.loads(p.read_text()) for p in sorted(folder.glob("*.json"))]
+
+
+def read_archive(table: str, month: date, archive_dir: str = ARCHIVE_DIR, **filters):
+    """
+    Yield the archived rows of one month as dicts, optionally keeping only
+    rows whose fields equal `filters` (e.g. user_id="u1"). Returns None when
+    the month has not been archived.
+    """
+    path = archive_path(table, month_start(month), archive_dir)
+    if not path.exists():
+        return None
+    wanted = {k: str(v) for k, v in filters.items() if v is not None}
+
+    def rows():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if all(str(row.get(k)) == v for k, v in wanted.items()):
+                    yield row
+
+    return rows()
@@ -0,0 +1,39 @@
+"""
+Batch Scoring
+Evaluation of the registered detection rules over many transactions at once
+"""
+
+from services.burst_counter import BURST_COUNTER, BurstCounter
+from services.detection_services import DETECTION_PLAN
+from services.merchant_sketch import MERCHANT_SKETCHES, MerchantSketchStore
+from services.profile_cache import PROFILE_CACHE, ProfileCache
+from services.rule_engine import DetectionContext
+from sqlalchemy.orm import Session
+
+
+def score_batch(
+    transactions,
+    profiles: ProfileCache = PROFILE_CACHE,
+    db: Session | None = None,
+    merchants: MerchantSketchStore = MERCHANT_SKETCHES,
+    bursts: BurstCounter = BURST_COUNTER,
+) -> list[dict]:
+    """
+    Score a batch of transactions with the rule plan from detection_services
+    (see EvaluationPlan.evaluate_batch); a transaction gets the same verdict
+    and reasons as from is_suspicious. Profiles missing from the cache are
+    loaded through `db` together, in two grouped queries. Burst counts are
+    read, not recorded.
+    Returns one {"transaction_id", "suspicious", "reason"} dict per input, in order.
+    """
+    if not transactions:
+        return []
+    context = DetectionContext(db=db, profiles=profiles, bursts=bursts, merchants=merchants)
+    results = []
+    for t, (_, reasons) in zip(transactions, DETECTION_PLAN.evaluate_batch(transactions, context)):
+        results.append({
+            "transaction_id": t.transaction_id,
+            "suspicious": bool(reasons),
+            "reason": "; ".join(reasons) if reasons else "Transaction appears normal",
+        })
+    return results
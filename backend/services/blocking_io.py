@@ -0,0 +1,128 @@
+"""
+Blocking I/O Executors
+Dedicated, bounded thread pools for blocking calls (LLM, SMTP) so a slow
+dependency cannot stall the event loop or starve the default threadpool.
+Each dependency has its own concurrency limit, wait queue and timeout.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics_utils import Counter, Gauge, Histogram
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+SMTP_MAX_CONCURRENCY = int(os.getenv("SMTP_MAX_CONCURRENCY", "4"))
+SMTP_MAX_QUEUE = int(os.getenv("SMTP_MAX_QUEUE", "100"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "15"))
+
+QUEUE_DEPTH = Gauge("blocking_io_queue_depth", "Blocking calls waiting for a worker", ["dependency"])
+IN_FLIGHT = Gauge("blocking_io_in_flight", "Blocking calls currently running", ["dependency"])
+CALLS = Counter(
+    "blocking_io_calls_total", "Blocking calls by outcome (ok, error, timeout, rejected)", ["dependency", "outcome"]
+)
+DURATION = Histogram(
+    "blocking_io_duration_seconds", "Time spent running a blocking call", ["dependency"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0),
+)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a dependency's workers and wait queue are all taken"""
+
+
+class BlockingCallTimeout(TimeoutError):
+    """Raised when a blocking call does not finish within its timeout"""
+
+
+class BlockingExecutor:
+    """
+    A fixed pool of `max_workers` threads with at most `max_queue` calls
+    waiting behind them; anything beyond that is rejected immediately
+    instead of queueing without bound. A timed-out call that has not started
+    is dropped from the queue; one that has started keeps its thread until
+    it returns, so the underlying client should have its own socket timeout.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-io")
+        self._queued = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def _publish(self):
+        QUEUE_DEPTH.set(self._queued, dependency=self.name)
+        IN_FLIGHT.set(self._running, dependency=self.name)
+
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._publish()
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            CALLS.inc(dependency=self.name, outcome="error")
+            raise
+        else:
+            CALLS.inc(dependency=self.name, outcome="ok")
+            return result
+        finally:
+            DURATION.observe(time.perf_counter() - started, dependency=self.name)
+            with self._lock:
+                self._running -= 1
+                self._publish()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue a call without waiting for it. Raises ExecutorSaturated when full."""
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                CALLS.inc(dependency=self.name, outcome="rejected")
+                raise ExecutorSaturated(f"{self.name} executor is saturated")
+            self._queued += 1
+            self._publish()
+        return self._pool.submit(self._call, fn, args, kwargs)
+
+    def _drop(self, future: Future):
+        # a call cancelled before it started never runs _call
+        if future.cancel():
+            with self._lock:
+                self._queued -= 1
+                self._publish()
+
+    async def run(self, fn, *args, timeout: float | None = None, **kwargs):
+        """Run a blocking call on this executor and await its result."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self._drop(future)
+            CALLS.inc(dependency=self.name, outcome="timeout")
+            raise BlockingCallTimeout(f"{self.name} call timed out after {timeout or self.timeout}s") from None
+        except asyncio.CancelledError:
+            self._drop(future)
+            raise
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+LLM_EXECUTOR = BlockingExecutor("llm", LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_TIMEOUT_SECONDS)
+SMTP_EXECUTOR = BlockingExecutor("smtp", SMTP_MAX_CONCURRENCY, SMTP_MAX_QUEUE, SMTP_TIMEOUT_SECONDS)
+
+
+def shutdown_executors():
+    for executor in (LLM_EXECUTOR, SMTP_EXECUTOR):
+        executor.shutdown()
@@ -0,0 +1,87 @@
+"""
+Burst Counter
+Sliding-window counts of recent transactions per user, kept in process
+"""
+
+import os
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+# Window name -> length; detection rule 4 uses the 10 minute window
+BURST_WINDOWS = {
+    "1m": timedelta(minutes=1),
+    "10m": timedelta(minutes=10),
+    "1h": timedelta(hours=1),
+}
+BURST_MAX_USERS = int(os.getenv("BURST_MAX_USERS", "100000"))
+# events kept per user (oldest dropped first); caps the count of the largest window
+BURST_MAX_EVENTS_PER_USER = int(os.getenv("BURST_MAX_EVENTS_PER_USER", "1024"))
+
+
+class BurstCounter:
+    """
+    Per-user sliding-window event counter.
+    Each user has one deque of event timestamps in time order, covering the
+    largest window behind their newest event; every window is counted from it
+    with two binary searches. Late (out-of-order) events are inserted in
+    place. Users are evicted least-recently-recorded first once max_users is
+    exceeded, which also bounds the memory held for users who went idle.
+    """
+
+    def __init__(
+        self,
+        windows: dict[str, timedelta] = BURST_WINDOWS,
+        max_users: int = BURST_MAX_USERS,
+        max_events_per_user: int = BURST_MAX_EVENTS_PER_USER,
+    ):
+        self.windows = dict(windows)
+        self.horizon = max(self.windows.values())
+        self.max_users = max_users
+        self.max_events_per_user = max_events_per_user
+        self._users: OrderedDict[str, deque] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users)
+
+    def count(self, user_id: str, window: str, now: datetime) -> int:
+        """Number of events for the user in [now - window, now)."""
+        with self._lock:
+            events = self._users.get(user_id)
+            if events is None:
+                return 0
+            return bisect_left(events, now) - bisect_left(events, now - self.windows[window])
+
+    def record(self, user_id: str, at: datetime):
+        """Record an event for the user at the given time."""
+        with self._lock:
+            events = self._users.get(user_id)
+            if events is None:
+                events = self._users[user_id] = deque(maxlen=self.max_events_per_user)
+            else:
+                self._users.move_to_end(user_id)
+
+            if not events or at >= events[-1]:
+                events.append(at)
+            elif len(events) < self.max_events_per_user:
+                insort(events, at)
+            elif at > events[0]:
+                events.popleft()
+                insort(events, at)
+            # else: older than every event kept in a full deque
+
+            cutoff = events[-1] - self.horizon
+            while events[0] < cutoff:
+                events.popleft()
+
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+BURST_COUNTER = BurstCounter()
@@ -1,67 +1,196 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
 from models.transaction_model import Transaction
+from services.burst_counter import BURST_COUNTER, BurstCounter
+from services.merchant_sketch import MERCHANT_SKETCHES, MerchantSketchStore
+from services.profile_cache import PROFILE_CACHE, ProfileCache, UserProfile
+from services.rule_engine import DetectionContext, batch_feature, compile_plan, feature, rule, vectorized
 
-suspicious_reasons = []
+HIGH_AMOUNT_LIMIT = 5000
+AVG_AMOUNT_MULTIPLIER = 3
+UNUSUAL_HOUR_START = 5   # before 05:00
+UNUSUAL_HOUR_END = 23    # after 23:00
+BURST_THRESHOLD = 5
+NOVEL_MERCHANT_AMOUNT_MULTIPLIER = 2  # first payment to a merchant above this many times the average
+HIGH_RISK_CATEGORIES = ["crypto", "gambling", "giftcards", "electronics"]
+
+
+# --- Features (each fetched at most once per evaluation) ---
+
+# Transactions without a user have no history: their history features are
+# empty and they are not recorded in the burst counter, rather than all
+# sharing one anonymous user's profile and burst window
+_NO_HISTORY = UserProfile()
 
-def is_suspicious(transaction, db: Session):
-    """
-    Simple rule-based anomaly detection.
-    Returns (is_suspicious: bool, reason: str)
-    """
 
-    user_transactions = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == transaction.user_id)
-        .order_by(Transaction.tx_date.desc())
-        .all()
-    )
-
-    if user_transactions:
-        avg_amount = sum(tx.amount for tx in user_transactions) / len(user_transactions)
-        home_country = user_transactions[0].country
-    else:
-        avg_amount = 0
-        home_country = None
-
-    # 1. High-value or abnormal amount
-    if transaction.amount > 5000:
-        suspicious_reasons.append(f"High transaction amount ({transaction.amount}) exceeds safe limit.")
-    elif avg_amount > 0 and transaction.amount > 3 * avg_amount:
-        suspicious_reasons.append(
-            f"Amount ({transaction.amount}) much higher than user’s usual spending (avg {avg_amount:.2f})."
+def _profile(transaction, ctx):
+    # Cached running profile instead of scanning the user's full history;
+    # shared by the profile-derived features below
+    if "profile" not in ctx.features:
+        ctx.features["profile"] = (
+            ctx.profiles.get(transaction.user_id, ctx.db) if transaction.user_id else _NO_HISTORY
         )
+    return ctx.features["profile"]
+
+
+def _batch_profiles(transactions, ctx):
+    # One lookup per distinct user; cold users are loaded together
+    if "profiles" not in ctx.features:
+        ctx.features["profiles"] = ctx.profiles.get_many([t.user_id for t in transactions if t.user_id], ctx.db)
+    by_user = ctx.features["profiles"]
+    return [by_user[t.user_id] if t.user_id else _NO_HISTORY for t in transactions]
+
+
+@feature("amount")
+def _amount(transaction, ctx):
+    return transaction.amount
+
+
+@batch_feature("amount")
+def _amounts(transactions, ctx):
+    return [float(t.amount) for t in transactions]
+
+
+@feature("avg_amount")
+def _avg_amount(transaction, ctx):
+    return _profile(transaction, ctx).mean
+
+
+@batch_feature("avg_amount")
+def _avg_amounts(transactions, ctx):
+    return [p.mean for p in _batch_profiles(transactions, ctx)]
+
+
+@feature("home_country")
+def _home_country(transaction, ctx):
+    return _profile(transaction, ctx).home_country
+
+
+@batch_feature("home_country")
+def _home_countries(transactions, ctx):
+    return [p.home_country for p in _batch_profiles(transactions, ctx)]
+
+
+@feature("hour")
+def _hour(transaction, ctx):
+    return getattr(transaction.transaction_date, "hour", datetime.now().hour)
+
+
+@feature("recent_count")
+def _recent_count(transaction, ctx):
+    if not transaction.user_id:
+        return 0
+    return ctx.bursts.count(transaction.user_id, "10m", transaction.transaction_date)
+
+
+@feature("merchant_novel")
+def _merchant_novel(transaction, ctx):
+    # First time this user pays this merchant (Bloom filter: never a false "novel")
+    return bool(transaction.user_id) and ctx.merchants.is_novel(transaction.user_id, transaction.merchant)
 
-    # 2. Unusual transaction timing
-    hour = getattr(transaction.tx_date, "hour", datetime.now().hour)
-    if hour < 5 or hour > 23:
-        suspicious_reasons.append(f"Transaction made at unusual hour ({hour}:00).")
 
-    # 3. Location anomaly
+# --- Rules (evaluated in registration order) ---
+
+# Rules with a `vectorized` prefilter are checked only on the rows it
+# selects when scoring batches (services/batch_scoring.py)
+
+# 1. High-value or abnormal amount
+@rule("high_amount", features=("amount", "avg_amount"))
+def _high_amount(transaction, f):
+    if transaction.amount > HIGH_AMOUNT_LIMIT:
+        return f"High transaction amount ({transaction.amount}) exceeds safe limit."
+    avg_amount = f["avg_amount"]
+    if avg_amount > 0 and transaction.amount > AVG_AMOUNT_MULTIPLIER * avg_amount:
+        return f"Amount ({transaction.amount}) much higher than user’s usual spending (avg {avg_amount:.2f})."
+
+
+@vectorized("high_amount")
+def _high_amount_rows(c):
+    amount, avg = c["amount"], c["avg_amount"]
+    return (amount > HIGH_AMOUNT_LIMIT) | ((avg > 0) & (amount > AVG_AMOUNT_MULTIPLIER * avg))
+
+
+# 2. Unusual transaction timing
+@rule("unusual_hour", features=("hour",))
+def _unusual_hour(transaction, f):
+    hour = f["hour"]
+    if hour < UNUSUAL_HOUR_START or hour > UNUSUAL_HOUR_END:
+        return f"Transaction made at unusual hour ({hour}:00)."
+
+
+@vectorized("unusual_hour")
+def _unusual_hour_rows(c):
+    return (c["hour"] < UNUSUAL_HOUR_START) | (c["hour"] > UNUSUAL_HOUR_END)
+
+
+# 3. Location anomaly
+@rule("country_mismatch", features=("home_country",))
+def _country_mismatch(transaction, f):
+    home_country = f["home_country"]
     if home_country and transaction.country and home_country != transaction.country:
-        suspicious_reasons.append(
-            f"Transaction from different country ({transaction.country}) vs user's home ({home_country})."
-        )
+        return f"Transaction from different country ({transaction.country}) vs user's home ({home_country})."
+
+
+# 4. Frequency spike (too many recent transactions)
+@rule("burst", features=("recent_count",))
+def _burst(transaction, f):
+    if f["recent_count"] >= BURST_THRESHOLD:
+        return f"Unusual burst: {f['recent_count']} transactions in 10 minutes."
 
 
-    # 4. Frequency spike (too many recent transactions)
-    ten_minutes_ago = transaction.tx_date - timedelta(minutes=10)
-    recent_txns = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == transaction.user_id)
-        .filter(Transaction.tx_date >= ten_minutes_ago)
-        .filter(Transaction.tx_date < transaction.tx_date)
-        .all()
-    )
-    if len(recent_txns) >= 5:
-        suspicious_reasons.append(f"Unusual burst: {len(recent_txns)} transactions in 10 minutes.")
+@vectorized("burst")
+def _burst_rows(c):
+    return c["recent_count"] >= BURST_THRESHOLD
 
 
-    high_risk_categories = ["crypto", "gambling", "giftcards", "electronics"]
-    if getattr(transaction, "category", "").lower() in high_risk_categories:
-        suspicious_reasons.append(f"High-risk merchant category: {transaction.category}.")
+# 5. High-risk merchant category
+@rule("high_risk_category")
+def _high_risk_category(transaction, f):
+    if (getattr(transaction, "category", None) or "").lower() in HIGH_RISK_CATEGORIES:
+        return f"High-risk merchant category: {transaction.category}."
+
+
+# 6. Unusually large first payment to a merchant
+@rule("novel_merchant", features=("amount", "avg_amount", "merchant_novel"))
+def _novel_merchant(transaction, f):
+    avg_amount = f["avg_amount"]
+    if f["merchant_novel"] and avg_amount > 0 and transaction.amount > NOVEL_MERCHANT_AMOUNT_MULTIPLIER * avg_amount:
+        return f"First payment to {transaction.merchant} is {transaction.amount} (avg {avg_amount:.2f})."
+
+
+@vectorized("novel_merchant")
+def _novel_merchant_rows(c):
+    avg = c["avg_amount"]
+    return c["merchant_novel"] & (avg > 0) & (c["amount"] > NOVEL_MERCHANT_AMOUNT_MULTIPLIER * avg)
+
+
+DETECTION_PLAN = compile_plan()
+
+
+def is_suspicious(
+    transaction,
+    db: Session | None = None,
+    profiles: ProfileCache = PROFILE_CACHE,
+    bursts: BurstCounter = BURST_COUNTER,
+    features: dict | None = None,
+    merchants: MerchantSketchStore = MERCHANT_SKETCHES,
+):
+    """
+    Simple rule-based anomaly detection.
+    `features` may carry values already fetched elsewhere (e.g. from
+    providers.transactions.fetch_detection_features); those are not refetched.
+    Returns (is_suspicious: bool, reason: str)
+    """
+    context = DetectionContext(db=db, profiles=profiles, bursts=bursts, merchants=merchants)
+    if features:
+        context.features.update(features)
+    _, suspicious_reasons = DETECTION_PLAN.evaluate(transaction, context)
+
+    # Every scored transaction counts towards the burst window, even if
+    # the plan short-circuited before the burst rule ran
+    if transaction.user_id:
+        bursts.record(transaction.user_id, transaction.transaction_date)
 
-        
     # Final decision
     if suspicious_reasons:
         return True, "; ".join(suspicious_reasons)
@@ -9,6 +9,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
 from models.Transcation import TransactionDB
+from services.blocking_io import SMTP_TIMEOUT_SECONDS
 from logging_utils import get_logger
 
 LOGGER = get_logger("guardian")
@@ -118,7 +119,7 @@ def send_verification_email(
         msg.attach(MIMEText(html_body, "html"))
         
         # Send email
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
+        with smtplib.SMTP(smtp_host, smtp_port, timeout=SMTP_TIMEOUT_SECONDS) as server:
             server.starttls()
             server.login(smtp_username, smtp_password)
             server.send_message(msg)
@@ -193,7 +194,7 @@ def send_approval_email(
         
         msg.attach(MIMEText(html_body, "html"))
         
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
+        with smtplib.SMTP(smtp_host, smtp_port, timeout=SMTP_TIMEOUT_SECONDS) as server:
             server.starttls()
             server.login(smtp_username, smtp_password)
             server.send_message(msg)
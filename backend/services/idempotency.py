@@ -0,0 +1,212 @@
+"""
+Idempotency
+Idempotency-Key support for write endpoints: the first request with a key
+runs and its response is stored; retries with the same key get the stored
+response back without running (or writing) anything again
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from db.db import AsyncSessionLocal
+from metrics_utils import Counter
+from models.idempotency import IdempotencyKeyDB
+from services.ttl_cache import TTLCache
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_CACHE_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_CACHE_MAX_ENTRIES", "100000"))
+# how long an in-progress claim blocks retries; must outlast the slowest
+# request (question generation waits up to LLM_TIMEOUT_SECONDS)
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+IDEMPOTENCY_LOOKUPS = Counter(
+    "idempotency_lookups_total", "Idempotency-Key lookups (hit, miss, in_progress, mismatch)", ["scope", "result"]
+)
+
+
+def request_fingerprint(payload) -> str:
+    """Stable hash of a request body, used to reject a key reused for a different request."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Completed responses are kept in a TTL cache in front of the
+    idempotency_keys table. A request first claims its key by inserting a
+    row with no response; the unique (scope, key) constraint makes the claim
+    atomic across workers and pods. Failed requests release the claim so
+    the client can retry them. A claim is a lease: if its request dies
+    without completing or releasing it (crash, lost database connection),
+    a retry takes it over once `lease_seconds` have passed. The claim's
+    locked_until value identifies its holder, so a request that lost its
+    lease cannot complete or release the new holder's claim.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+        max_entries: int = IDEMPOTENCY_CACHE_MAX_ENTRIES,
+        lease_seconds: float = IDEMPOTENCY_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._responses = TTLCache(max_entries, ttl_seconds)
+
+    def _check(self, scope: str, request_hash: str, stored_hash: str):
+        if stored_hash != request_hash:
+            IDEMPOTENCY_LOOKUPS.inc(scope=scope, result="mismatch")
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+    def _key(self, scope: str, key: str):
+        return IdempotencyKeyDB.scope == scope, IdempotencyKeyDB.key == key
+
+    async def _claim(self, scope: str, key: str, request_hash: str) -> tuple[datetime | None, IdempotencyKeyDB | None]:
+        """
+        Insert the in-progress row, or take over one whose lease ran out.
+        Returns (lease, None) when claimed, otherwise (None, existing_row).
+        """
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.lease_seconds)
+        async with self.session_factory() as db:
+            existing = await db.scalar(select(IdempotencyKeyDB).where(*self._key(scope, key)))
+            if existing is not None and existing.expires_at > now:
+                if existing.response is not None or existing.request_hash != request_hash:
+                    return None, existing
+                taken = await db.execute(
+                    update(IdempotencyKeyDB)
+                    .where(
+                        IdempotencyKeyDB.id == existing.id,
+                        IdempotencyKeyDB.response.is_(None),
+                        or_(IdempotencyKeyDB.locked_until.is_(None), IdempotencyKeyDB.locked_until <= now),
+                    )
+                    .values(locked_until=lease)
+                )
+                if taken.rowcount != 1:
+                    return None, existing
+                await db.commit()
+                LOGGER.warning(f"Took over an abandoned {scope} claim for Idempotency-Key {key}")
+                return lease, None
+            if existing is not None:
+                # an expired key may be reused; delete it before inserting the new claim
+                await db.execute(delete(IdempotencyKeyDB).where(IdempotencyKeyDB.id == existing.id))
+            db.add(IdempotencyKeyDB(
+                scope=scope,
+                key=key,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds),
+                locked_until=lease,
+            ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                existing = await db.scalar(select(IdempotencyKeyDB).where(*self._key(scope, key)))
+                return None, existing
+        return lease, None
+
+    async def _complete(self, scope: str, key: str, lease: datetime, response: dict):
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(IdempotencyKeyDB)
+                .where(*self._key(scope, key), IdempotencyKeyDB.locked_until == lease)
+                .values(response=json.dumps(response, default=str), locked_until=None)
+            )
+            await db.commit()
+        if result.rowcount != 1:
+            LOGGER.warning(f"{scope} claim for Idempotency-Key {key} was taken over before it completed")
+
+    async def _release(self, scope: str, key: str, lease: datetime):
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(IdempotencyKeyDB).where(
+                    *self._key(scope, key),
+                    IdempotencyKeyDB.response.is_(None),
+                    IdempotencyKeyDB.locked_until == lease,
+                )
+            )
+            await db.commit()
+
+    async def run(
+        self, scope: str, key: str, request_hash: str, compute: Callable[[], Awaitable[dict]]
+    ) -> tuple[dict, bool]:
+        """
+        Return (response, replayed). `compute` runs only for the first request
+        with this key; it must return a JSON-serializable response.
+        """
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        cached = self._responses.get((scope, key))
+        if cached is not None:
+            self._check(scope, request_hash, cached[0])
+            IDEMPOTENCY_LOOKUPS.inc(scope=scope, result="hit")
+            return cached[1], True
+
+        lease, existing = await self._claim(scope, key, request_hash)
+        if lease is None:
+            if existing is None:
+                # the competing claim was released between our insert and re-read
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+            self._check(scope, request_hash, existing.request_hash)
+            if existing.response is None:
+                IDEMPOTENCY_LOOKUPS.inc(scope=scope, result="in_progress")
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+            response = json.loads(existing.response)
+            self._responses.set((scope, key), (existing.request_hash, response))
+            IDEMPOTENCY_LOOKUPS.inc(scope=scope, result="hit")
+            return response, True
+
+        IDEMPOTENCY_LOOKUPS.inc(scope=scope, result="miss")
+        try:
+            response = await compute()
+        except BaseException:
+            # shield so a cancelled request still releases its key
+            await asyncio.shield(self._release(scope, key, lease))
+            raise
+        self._responses.set((scope, key), (request_hash, response))
+        try:
+            await asyncio.shield(self._complete(scope, key, lease, response))
+        except Exception:
+            # the work is done: answer, and keep the claim rather than release
+            # it, so retries get 409 until the lease runs out instead of
+            # running the request again straight away
+            LOGGER.exception(f"Could not store the {scope} response for Idempotency-Key {key}")
+        return response, False
+
+    async def purge_expired(self) -> int:
+        """Delete expired keys. Returns how many rows were removed."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(IdempotencyKeyDB).where(IdempotencyKeyDB.expires_at <= datetime.utcnow())
+            )
+            await db.commit()
+        return result.rowcount
+
+
+async def purge_expired_keys(store: IdempotencyStore, interval_seconds: float = 3600):
+    """Background loop that keeps the idempotency_keys table bounded."""
+    while True:
+        try:
+            removed = await store.purge_expired()
+            if removed:
+                LOGGER.info(f"Purged {removed} expired idempotency keys")
+        except Exception as e:
+            LOGGER.warning(f"Idempotency key purge failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+IDEMPOTENCY_STORE = IdempotencyStore()
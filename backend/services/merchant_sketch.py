@@ -0,0 +1,163 @@
+"""
+Merchant Sketch
+Per-user Bloom filters answering "has this user paid this merchant before?"
+in a fixed number of bytes per user, persisted to disk between restarts
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.ledger import TransactionLedger
+from models.Transcation import TransactionDB
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+MERCHANT_SKETCH_BITS = int(os.getenv("MERCHANT_SKETCH_BITS", "1024"))  # 128 bytes per user
+MERCHANT_SKETCH_HASHES = int(os.getenv("MERCHANT_SKETCH_HASHES", "4"))
+MERCHANT_SKETCH_PATH = os.getenv("MERCHANT_SKETCH_PATH", "./merchant_sketches.bin")
+# users kept in memory (and on disk); at the default size this caps the store near 25 MB
+MERCHANT_SKETCH_MAX_USERS = int(os.getenv("MERCHANT_SKETCH_MAX_USERS", "200000"))
+
+_MAGIC = b"MSK1"
+_HEADER = struct.Struct("<4sIIqQ")  # magic, bits, hashes, ledger watermark, user count
+
+
+def _normalize(merchant: str) -> bytes:
+    return merchant.strip().lower().encode("utf-8")
+
+
+class MerchantSketchStore:
+    """
+    One fixed-size Bloom filter per user. `is_novel` never reports a seen
+    merchant as new; it may (rarely) report a new merchant as seen. With
+    1024 bits and 4 hashes the false-positive rate stays under 1% up to
+    roughly 100 distinct merchants per user.
+    Users are evicted least-recently-added first once max_users is exceeded;
+    an evicted user's merchants read as novel again until they are re-added.
+    """
+
+    def __init__(
+        self,
+        bits: int = MERCHANT_SKETCH_BITS,
+        hashes: int = MERCHANT_SKETCH_HASHES,
+        max_users: int = MERCHANT_SKETCH_MAX_USERS,
+    ):
+        self.bits = bits
+        self.hashes = hashes
+        self.nbytes = (bits + 7) // 8
+        self.max_users = max_users
+        self.ledger_watermark = 0  # highest ledger id folded in
+        self._filters: OrderedDict[str, bytearray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._filters)
+
+    def _positions(self, merchant: str):
+        digest = hashlib.blake2b(_normalize(merchant), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1  # odd step so positions cycle through all bits
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, user_id: str, merchant: str, ledger_id: int | None = None):
+        positions = self._positions(merchant)
+        with self._lock:
+            sketch = self._filters.get(user_id)
+            if sketch is None:
+                sketch = self._filters[user_id] = bytearray(self.nbytes)
+            else:
+                self._filters.move_to_end(user_id)
+            for pos in positions:
+                sketch[pos >> 3] |= 1 << (pos & 7)
+            if ledger_id is not None and ledger_id > self.ledger_watermark:
+                self.ledger_watermark = ledger_id
+            while len(self._filters) > self.max_users:
+                self._filters.popitem(last=False)
+
+    def has_seen(self, user_id: str, merchant: str) -> bool:
+        sketch = self._filters.get(user_id)
+        if sketch is None:
+            return False
+        return all(sketch[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(merchant))
+
+    def is_novel(self, user_id: str, merchant: str) -> bool:
+        """True when the user has (definitely) never paid this merchant."""
+        return not self.has_seen(user_id, merchant)
+
+    def load_from_ledger(self, db: Session, batch_size: int = 5000) -> int:
+        """
+        Fold ledger rows newer than the watermark into the sketches.
+        After a `load` from disk this only scans rows written since the last save.
+        """
+        stmt = (
+            select(TransactionLedger.id, TransactionDB.user_id, TransactionLedger.vendor)
+            .join(TransactionDB, TransactionDB.id == TransactionLedger.tx_id)
+            .where(TransactionLedger.id > self.ledger_watermark, TransactionDB.user_id.isnot(None))
+            .order_by(TransactionLedger.id)
+            .execution_options(yield_per=batch_size)
+        )
+        count = 0
+        for ledger_id, user_id, vendor in db.execute(stmt):
+            self.add(user_id, vendor, ledger_id)
+            count += 1
+        return count
+
+    def save(self, path: str = MERCHANT_SKETCH_PATH):
+        """Write all sketches to disk atomically."""
+        with self._lock:
+            filters = list(self._filters.items())
+            watermark = self.ledger_watermark
+        # a temp name of its own, so concurrent saves (e.g. two workers) never share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f"{os.path.basename(path)}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, watermark, len(filters)))
+                for user_id, sketch in filters:
+                    key = user_id.encode("utf-8")
+                    f.write(struct.pack("<H", len(key)))
+                    f.write(key)
+                    f.write(sketch)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, path: str = MERCHANT_SKETCH_PATH) -> bool:
+        """
+        Load sketches saved by `save`. Returns False if the file is missing or
+        incompatible; raises ValueError (or struct.error) if it is truncated.
+        """
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as f:
+            magic, bits, hashes, watermark, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or bits != self.bits or hashes != self.hashes:
+                LOGGER.warning(f"Ignoring incompatible merchant sketch file {path}")
+                return False
+            filters = OrderedDict()
+            for _ in range(count):
+                (key_len,) = struct.unpack("<H", f.read(2))
+                user_id = f.read(key_len).decode("utf-8")
+                sketch = f.read(self.nbytes)
+                if len(sketch) != self.nbytes:
+                    raise ValueError(f"merchant sketch file {path} is truncated")
+                filters[user_id] = bytearray(sketch)
+        # saved least-recently-added first, so the oldest users are the ones dropped
+        while len(filters) > self.max_users:
+            filters.popitem(last=False)
+        with self._lock:
+            self._filters = filters
+            self.ledger_watermark = watermark
+        return True
+
+
+MERCHANT_SKETCHES = MerchantSketchStore()
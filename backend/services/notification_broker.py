@@ -0,0 +1,188 @@
+"""
+Notification Broker
+Per-user pub/sub fan-out that pushes new notifications to connected
+stream clients (Server-Sent Events) instead of having them poll. With
+NOTIFICATION_FANOUT_BACKEND=redis notifications are relayed through a
+Redis channel, so a client sees them whichever pod it is connected to.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
+
+from metrics_utils import Counter, Gauge
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+NOTIFICATION_STREAM_MAX_CONNECTIONS = int(os.getenv("NOTIFICATION_STREAM_MAX_CONNECTIONS", "5000"))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+NOTIFICATION_FANOUT_BACKEND = os.getenv("NOTIFICATION_FANOUT_BACKEND", "memory")  # "memory" or "redis"
+NOTIFICATION_CHANNEL = os.getenv("NOTIFICATION_CHANNEL", "guardian:notifications")
+
+STREAM_CONNECTIONS = Gauge("notification_stream_connections", "Open notification stream connections on this pod")
+STREAM_REJECTED = Counter(
+    "notification_stream_rejected_total", "Notification stream connections refused at the per-pod cap"
+)
+NOTIFICATIONS_PUSHED = Counter("notifications_pushed_total", "Notifications delivered to stream subscribers")
+SLOW_SUBSCRIBERS = Counter(
+    "notification_stream_overflows_total", "Subscribers disconnected because they fell too far behind"
+)
+
+
+class TooManyConnections(Exception):
+    """Raised when this pod already holds the maximum number of stream connections"""
+
+
+class Subscription:
+    """One connected client. `overflowed` is set when it was cut off for falling behind."""
+
+    __slots__ = ("user_id", "queue", "loop", "overflowed")
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.loop = loop
+        self.overflowed = False
+
+    def _deliver(self, notification: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(notification)
+            NOTIFICATIONS_PUSHED.inc()
+        except asyncio.QueueFull:
+            # the client reconnects with its last event id and replays from the store
+            self.overflowed = True
+            SLOW_SUBSCRIBERS.inc()
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next notification, or None if nothing arrived within `timeout`."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisFanout:
+    """
+    Relays notifications between pods over one Redis pub/sub channel
+    (requires the redis package). Every pod receives every notification and
+    delivers it to its own subscribers; notifications published while a
+    pod's listener is reconnecting reach its clients through the store
+    replay on their next reconnect.
+    """
+
+    def __init__(self, url: str, channel: str = NOTIFICATION_CHANNEL):
+        import redis  # optional dependency
+        import redis.asyncio as redis_async
+
+        self._publisher = redis.from_url(url)
+        self._subscriber = redis_async.from_url(url)
+        self.channel = channel
+
+    def publish(self, notification: dict):
+        self._publisher.publish(self.channel, json.dumps(notification, default=str))
+
+    async def listen(self, deliver):
+        """Pass every notification published by any pod to `deliver`, until cancelled."""
+        while True:
+            try:
+                async with self._subscriber.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        notification = json.loads(message["data"])
+                        notification["created_at"] = datetime.fromisoformat(notification["created_at"])
+                        deliver(notification)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOGGER.warning(f"Notification fan-out listener failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+
+class NotificationBroker:
+    """
+    Subscribers live on the event loop; `publish` may be called from any
+    thread (send_notification runs in the threadpool), so delivery is
+    scheduled onto each subscriber's loop. Without a `fanout` a client only
+    sees notifications sent by the pod it is connected to; with one they
+    go out through it and every pod delivers them locally via `listen`.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = NOTIFICATION_STREAM_MAX_CONNECTIONS,
+        queue_size: int = NOTIFICATION_STREAM_QUEUE_SIZE,
+        fanout: RedisFanout | None = None,
+    ):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.fanout = fanout
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if self._count >= self.max_connections:
+                STREAM_REJECTED.inc()
+                raise TooManyConnections(f"notification stream limit ({self.max_connections}) reached")
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            STREAM_CONNECTIONS.set(self._count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+            self._count -= 1
+            STREAM_CONNECTIONS.set(self._count)
+
+    def publish(self, notification: dict):
+        """Push a notification to every subscriber of its user, on every pod when a fan-out is set."""
+        if self.fanout is not None:
+            try:
+                self.fanout.publish(notification)
+                return
+            except Exception as e:
+                LOGGER.warning(f"Notification fan-out unavailable, delivering on this pod only: {e}")
+        self.deliver(notification)
+
+    async def listen(self):
+        """Deliver notifications published by any pod; run as a background task when a fan-out is set."""
+        if self.fanout is not None:
+            await self.fanout.listen(self.deliver)
+
+    def deliver(self, notification: dict):
+        """Push a notification to every subscriber of its user on this pod."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(notification["user_id"], ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, notification)
+            except RuntimeError:
+                # loop already closed; the connection is gone
+                self.unsubscribe(subscription)
+
+
+def build_fanout() -> RedisFanout | None:
+    if NOTIFICATION_FANOUT_BACKEND == "redis":
+        return RedisFanout(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return None
+
+
+NOTIFICATION_BROKER = NotificationBroker(fanout=build_fanout())
@@ -1,12 +1,22 @@
 from models.notification_model import Notification
+from services.notification_store import NOTIFICATION_STORE
+from services.notification_broker import NOTIFICATION_BROKER
+from metrics_utils import Counter
 import uuid
 from datetime import datetime
 
+NOTIFICATIONS_SENT = Counter("notifications_sent_total", "Notifications sent to users")
+
 def send_notification(user_id: str, message: str):
     notification = Notification(
         notification_id=str(uuid.uuid4()),
         user_id=user_id,
         message=message,
-        created_at=datetime.now()
+        created_at=datetime.utcnow()  # stored and compared as naive UTC
     )
-    return notification.dict()
+    record = notification.dict()
+    NOTIFICATION_STORE.add(record)
+    # push to any open notification streams for this user
+    NOTIFICATION_BROKER.publish(record)
+    NOTIFICATIONS_SENT.inc()
+    return record
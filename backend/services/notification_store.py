@@ -0,0 +1,257 @@
+"""
+Notification Store
+Per-user notification index with retention caps and unread counters,
+backed by the notifications table
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from sqlalchemy import and_, delete, or_, select, update
+from db.db import SessionLocal
+from models.notifications import NotificationDB
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+NOTIFICATION_RETENTION_PER_USER = int(os.getenv("NOTIFICATION_RETENTION_PER_USER", "100"))
+NOTIFICATION_CACHE_MAX_USERS = int(os.getenv("NOTIFICATION_CACHE_MAX_USERS", "50000"))
+# other pods write to the same users; cached entries are reloaded after this long
+NOTIFICATION_CACHE_TTL_SECONDS = float(os.getenv("NOTIFICATION_CACHE_TTL_SECONDS", "5"))
+
+
+class _UserNotifications:
+    __slots__ = ("items", "unread", "loaded_at")
+
+    def __init__(self, retention: int):
+        self.items: deque[dict] = deque(maxlen=retention)  # oldest -> newest
+        self.unread = 0
+        self.loaded_at = time.monotonic()
+
+
+def _to_dict(row: NotificationDB) -> dict:
+    return {
+        "notification_id": row.id,
+        "user_id": row.user_id,
+        "message": row.message,
+        "read": row.read,
+        "created_at": row.created_at,
+    }
+
+
+def _newest_first():
+    return NotificationDB.created_at.desc(), NotificationDB.id.desc()
+
+
+class NotificationStore:
+    """
+    The database is the source of truth and is written before the cache.
+    Each cached user holds the newest `retention` notifications in
+    (created_at, id) order plus an unread counter, and is reloaded after
+    `ttl_seconds` since other pods write to the same users. Reads after a
+    cursor or of unread notifications only go straight to the database
+    (served by ix_notifications_user_created). Without a session factory
+    the store is purely in-process.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        retention: int = NOTIFICATION_RETENTION_PER_USER,
+        max_users: int = NOTIFICATION_CACHE_MAX_USERS,
+        ttl_seconds: float = NOTIFICATION_CACHE_TTL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.retention = retention
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._users: OrderedDict[str, _UserNotifications] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, user_id: str) -> _UserNotifications:
+        """Cold-load a user's newest notifications from the database."""
+        entry = _UserNotifications(self.retention)
+        if self.session_factory is None:
+            return entry
+        try:
+            with self.session_factory() as db:
+                rows = db.scalars(
+                    select(NotificationDB)
+                    .where(NotificationDB.user_id == user_id)
+                    .order_by(*_newest_first())
+                    .limit(self.retention)
+                ).all()
+        except Exception as e:
+            LOGGER.warning(f"Could not load notifications for {user_id}: {e}")
+            return entry
+        for row in reversed(rows):
+            entry.items.append(_to_dict(row))
+            if not row.read:
+                entry.unread += 1
+        return entry
+
+    def _cached(self, user_id: str) -> _UserNotifications | None:
+        """The user's cached entry if still fresh; call with the lock held."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        if self.session_factory is not None and time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return entry
+
+    def _entry(self, user_id: str) -> _UserNotifications:
+        with self._lock:
+            entry = self._cached(user_id)
+            if entry is not None:
+                return entry
+        entry = self._load(user_id)
+        with self._lock:
+            existing = self._cached(user_id)
+            if existing is not None:
+                return existing
+            self._users[user_id] = entry
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return entry
+
+    def add(self, notification: dict) -> bool:
+        """
+        Persist a notification, then append it to the user's cached index.
+        Returns False (and leaves the cache alone) when the write failed.
+        """
+        user_id = notification["user_id"]
+        if self.session_factory is not None:
+            try:
+                with self.session_factory() as db:
+                    db.add(NotificationDB(
+                        id=notification["notification_id"],
+                        user_id=user_id,
+                        message=notification["message"],
+                        read=notification.get("read", False),
+                        created_at=notification["created_at"],
+                    ))
+                    db.flush()
+                    # enforce the retention cap in the table as well
+                    kept = (
+                        select(NotificationDB.id)
+                        .where(NotificationDB.user_id == user_id)
+                        .order_by(*_newest_first())
+                        .limit(self.retention)
+                    )
+                    db.execute(
+                        delete(NotificationDB).where(
+                            NotificationDB.user_id == user_id, NotificationDB.id.not_in(kept.scalar_subquery())
+                        )
+                    )
+                    db.commit()
+            except Exception as e:
+                LOGGER.warning(f"Could not persist notification {notification['notification_id']}: {e}")
+                return False
+
+        if self.session_factory is None:
+            self._entry(user_id)
+        with self._lock:
+            entry = self._cached(user_id)
+            if entry is None:
+                return True  # loaded from the database on the next read
+            evicted = entry.items[0] if len(entry.items) == entry.items.maxlen else None
+            entry.items.append(notification)
+            entry.unread += 0 if notification.get("read") else 1
+            if evicted is not None and not evicted.get("read"):
+                entry.unread -= 1
+        return True
+
+    def list_since(
+        self,
+        user_id: str,
+        since: datetime | None = None,
+        after_id: str | None = None,
+        unread_only: bool = False,
+    ) -> list[dict]:
+        """
+        Notifications after the cursor (oldest first). The cursor is
+        (`since`, `after_id`): notifications created later than `since`, or at
+        `since` with a larger id; without `after_id` only later ones.
+        """
+        if (since is not None or unread_only) and self.session_factory is not None:
+            return self._query(user_id, since, after_id, unread_only)
+
+        entry = self._entry(user_id)
+        with self._lock:
+            items = list(entry.items)
+        if since is not None:
+            cursor = (since, after_id)
+            # items are in (created_at, id) order: skip from the newest end
+            start = len(items)
+            while start > 0 and after_cursor(items[start - 1], cursor):
+                start -= 1
+            items = items[start:]
+        if unread_only:
+            items = [n for n in items if not n.get("read")]
+        return items
+
+    def _query(self, user_id: str, since: datetime | None, after_id: str | None, unread_only: bool) -> list[dict]:
+        stmt = select(NotificationDB).where(NotificationDB.user_id == user_id)
+        if since is not None:
+            later = NotificationDB.created_at > since
+            if after_id is not None:
+                later = or_(later, and_(NotificationDB.created_at == since, NotificationDB.id > after_id))
+            stmt = stmt.where(later)
+        if unread_only:
+            stmt = stmt.where(NotificationDB.read.is_(False))
+        with self.session_factory() as db:
+            rows = db.scalars(stmt.order_by(*_newest_first()).limit(self.retention)).all()
+        return [_to_dict(row) for row in reversed(rows)]
+
+    def unread_count(self, user_id: str) -> int:
+        return self._entry(user_id).unread
+
+    def mark_read(self, user_id: str, notification_ids: list[str] | None = None) -> int:
+        """Mark the given (or all) notifications read. Returns how many changed."""
+        if self.session_factory is not None:
+            stmt = (
+                update(NotificationDB)
+                .where(NotificationDB.user_id == user_id, NotificationDB.read.is_(False))
+                .values(read=True)
+            )
+            if notification_ids is not None:
+                stmt = stmt.where(NotificationDB.id.in_(notification_ids))
+            try:
+                with self.session_factory() as db:
+                    updated = db.execute(stmt).rowcount
+                    db.commit()
+            except Exception as e:
+                LOGGER.warning(f"Could not mark notifications read for {user_id}: {e}")
+                return 0
+            # the cached counter may already be stale; reload on the next read
+            with self._lock:
+                self._users.pop(user_id, None)
+            return updated
+
+        entry = self._entry(user_id)
+        wanted = set(notification_ids) if notification_ids is not None else None
+        changed = 0
+        with self._lock:
+            for n in entry.items:
+                if not n.get("read") and (wanted is None or n["notification_id"] in wanted):
+                    n["read"] = True
+                    changed += 1
+            entry.unread -= changed
+        return changed
+
+
+def after_cursor(notification: dict, cursor: tuple[datetime, str | None]) -> bool:
+    """Whether `notification` comes after a (created_at, notification_id) cursor."""
+    since, after_id = cursor
+    created_at = notification["created_at"]
+    if after_id is None:
+        return created_at > since
+    return (created_at, notification["notification_id"]) > (since, after_id)
+
+
+NOTIFICATION_STORE = NotificationStore()
@@ -0,0 +1,228 @@
+"""
+Profile Cache
+Per-user spending profiles used by detection, maintained incrementally
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models.Transcation import TransactionDB, TxStatus
+
+PROFILE_CACHE_MAX_USERS = int(os.getenv("PROFILE_CACHE_MAX_USERS", "100000"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "3600"))
+
+
+class UserProfile:
+    """Running spending statistics for a single user (Welford's algorithm)"""
+
+    __slots__ = ("count", "total", "mean", "m2", "country_counts", "first_seen", "last_seen")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.country_counts: dict[str, int] = {}
+        self.first_seen: datetime | None = None
+        self.last_seen: datetime | None = None
+
+    def update(self, amount: float, country: str | None = None, seen_at: datetime | None = None):
+        """Fold one transaction into the running statistics."""
+        amount = float(amount)
+        self.count += 1
+        self.total += amount
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+
+        if country:
+            self.country_counts[country] = self.country_counts.get(country, 0) + 1
+
+        if seen_at is not None:
+            if self.first_seen is None or seen_at < self.first_seen:
+                self.first_seen = seen_at
+            if self.last_seen is None or seen_at > self.last_seen:
+                self.last_seen = seen_at
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def home_country(self) -> str | None:
+        """Most frequently seen country for the user."""
+        if not self.country_counts:
+            return None
+        return max(self.country_counts, key=self.country_counts.get)
+
+
+def load_profile(db: Session, user_id: str) -> UserProfile:
+    """
+    Rebuild a user's profile from approved transactions in the database.
+    Uses aggregate queries so the rebuild does not materialize the history.
+    """
+    return load_profiles(db, [user_id])[user_id]
+
+
+def load_profiles(db: Session, user_ids) -> dict[str, UserProfile]:
+    """
+    Rebuild several users' profiles with two grouped aggregate queries, one
+    for the amount statistics and one for the country counts, however many
+    users are asked for. Users without approved transactions get an empty profile.
+    """
+    profiles = {user_id: UserProfile() for user_id in user_ids}
+    if not profiles:
+        return profiles
+    approved = (
+        TransactionDB.user_id.in_(list(profiles)),
+        TransactionDB.status == TxStatus.approved,
+    )
+
+    totals = db.query(
+        TransactionDB.user_id,
+        func.count(TransactionDB.id),
+        func.sum(TransactionDB.amount),
+        func.sum(TransactionDB.amount * TransactionDB.amount),
+        func.min(TransactionDB.tx_ts),
+        func.max(TransactionDB.tx_ts),
+    ).filter(*approved).group_by(TransactionDB.user_id)
+
+    for user_id, count, total, total_sq, first_seen, last_seen in totals:
+        profile = profiles[user_id]
+        profile.count = count
+        profile.total = float(total)
+        profile.mean = profile.total / count
+        profile.m2 = max(float(total_sq) - count * profile.mean * profile.mean, 0.0)
+        profile.first_seen = first_seen
+        profile.last_seen = last_seen
+
+    country_rows = (
+        db.query(TransactionDB.user_id, TransactionDB.country, func.count(TransactionDB.id))
+        .filter(*approved)
+        .filter(TransactionDB.country.isnot(None))
+        .group_by(TransactionDB.user_id, TransactionDB.country)
+    )
+    for user_id, country, n in country_rows:
+        profiles[user_id].country_counts[country] = n
+    return profiles
+
+
+class ProfileCache:
+    """Thread-safe LRU cache of user profiles with TTL expiry"""
+
+    def __init__(self, max_users: int = PROFILE_CACHE_MAX_USERS, ttl_seconds: float = PROFILE_CACHE_TTL_SECONDS):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[UserProfile, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, user_id: str) -> UserProfile | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        profile, loaded_at = entry
+        if time.monotonic() - loaded_at > self.ttl_seconds:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return profile
+
+    def _store(self, user_id: str, profile: UserProfile):
+        self._entries[user_id] = (profile, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def get(self, user_id: str, db: Session | None = None) -> UserProfile:
+        """
+        Return the cached profile for a user.
+        On a miss the profile is rebuilt from the database and cached; without
+        a session an empty profile is returned and nothing is cached, so the
+        user's next lookup with a session still sees their history.
+        """
+        with self._lock:
+            profile = self._lookup(user_id)
+        if profile is not None:
+            return profile
+        if db is None:
+            return UserProfile()
+
+        profile = load_profile(db, user_id)
+        with self._lock:
+            # another request may have loaded it while we were querying
+            existing = self._lookup(user_id)
+            if existing is not None:
+                return existing
+            self._store(user_id, profile)
+        return profile
+
+    def get_many(self, user_ids, db: Session | None = None) -> dict[str, UserProfile]:
+        """
+        Profiles for several users, as `get` would return them; all misses
+        are rebuilt together with `load_profiles`.
+        """
+        found, missing = {}, []
+        with self._lock:
+            for user_id in dict.fromkeys(user_ids):
+                profile = self._lookup(user_id)
+                if profile is not None:
+                    found[user_id] = profile
+                else:
+                    missing.append(user_id)
+        if not missing:
+            return found
+        if db is None:
+            found.update((user_id, UserProfile()) for user_id in missing)
+            return found
+
+        loaded = load_profiles(db, missing)
+        with self._lock:
+            for user_id, profile in loaded.items():
+                existing = self._lookup(user_id)
+                if existing is not None:
+                    profile = existing
+                else:
+                    self._store(user_id, profile)
+                found[user_id] = profile
+        return found
+
+    def setdefault(self, user_id: str) -> UserProfile:
+        """
+        Return the cached profile for a user, caching an empty one on a miss.
+        Only for callers that see a user's whole history themselves (replays).
+        """
+        with self._lock:
+            profile = self._lookup(user_id)
+            if profile is None:
+                profile = UserProfile()
+                self._store(user_id, profile)
+            return profile
+
+    def record(self, user_id: str, amount: float, country: str | None = None, seen_at: datetime | None = None):
+        """
+        Fold a newly approved transaction into a cached profile.
+        Uncached users are skipped; their next lookup rebuilds from the database.
+        """
+        with self._lock:
+            profile = self._lookup(user_id)
+            if profile is not None:
+                profile.update(amount, country, seen_at)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+PROFILE_CACHE = ProfileCache()
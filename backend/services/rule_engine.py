@@ -0,0 +1,219 @@
+"""
+Rule Engine
+Registry of detection features and rules, compiled into a single evaluation plan
+"""
+
+import os
+import time
+from typing import Any, Callable
+
+import numpy as np
+from metrics_utils import Counter, Histogram
+
+RULE_EVALUATIONS = Counter(
+    "detection_rule_evaluations_total", "Number of times a detection rule was evaluated", ["rule"]
+)
+RULE_HITS = Counter("detection_rule_hits_total", "Number of times a detection rule fired", ["rule"])
+RULE_DURATION = Histogram(
+    "detection_rule_duration_seconds",
+    "Time spent evaluating a detection rule, including features it fetched",
+    ["rule"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+
+# Unset means every rule is evaluated (all reasons are reported)
+_threshold = os.getenv("DETECTION_RISK_THRESHOLD")
+DETECTION_RISK_THRESHOLD = float(_threshold) if _threshold else None
+
+FEATURES: dict[str, Callable[[Any, "DetectionContext"], Any]] = {}
+# optional batch forms of features: fn(transactions, context) -> one value per transaction
+BATCH_FEATURES: dict[str, Callable[[list, "DetectionContext"], list]] = {}
+RULES: list["Rule"] = []
+
+
+class DetectionContext:
+    """Per-evaluation state shared by feature providers"""
+
+    def __init__(self, **resources):
+        # e.g. db session, profile cache, burst counter
+        self.resources = resources
+        self.features: dict[str, Any] = {}
+
+    def __getattr__(self, name):
+        try:
+            return self.resources[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class Rule:
+    """A detection rule: returns a reason string when it fires, else None"""
+
+    def __init__(self, name: str, features: tuple[str, ...], check: Callable, weight: float = 1.0):
+        self.name = name
+        self.features = features
+        self.check = check
+        self.weight = weight
+        self.prefilter: Callable | None = None  # see `vectorized`
+
+
+def feature(name: str):
+    """Register a feature provider: fn(transaction, context) -> value."""
+    def decorator(fn):
+        FEATURES[name] = fn
+        return fn
+    return decorator
+
+
+def batch_feature(name: str):
+    """Register the batch form of a feature: fn(transactions, context) -> list of values."""
+    def decorator(fn):
+        BATCH_FEATURES[name] = fn
+        return fn
+    return decorator
+
+
+def rule(name: str, features: tuple[str, ...] = (), weight: float = 1.0):
+    """Register a rule: fn(transaction, features) -> reason | None."""
+    def decorator(fn):
+        RULES.append(Rule(name, tuple(features), fn, weight))
+        return fn
+    return decorator
+
+
+def vectorized(rule_name: str):
+    """
+    Attach a vectorized prefilter to a registered rule: fn(columns) -> boolean
+    array, where columns maps each of the rule's features to a numpy array
+    over the batch. It must be True wherever the rule could fire; the rule's
+    own check then decides (and words the reason) for those rows only.
+    """
+    def decorator(fn):
+        for r in RULES:
+            if r.name == rule_name:
+                r.prefilter = fn
+                return fn
+        raise ValueError(f"No rule named {rule_name}")
+    return decorator
+
+
+class EvaluationPlan:
+    """
+    Rules in registration order, each paired with the features it is the
+    first to need. Every feature is fetched at most once per evaluation, and
+    features of rules skipped by the short-circuit are never fetched.
+    """
+
+    def __init__(self, steps, risk_threshold: float | None):
+        self.steps = steps
+        self.risk_threshold = risk_threshold
+
+    def evaluate(self, transaction, context: DetectionContext) -> tuple[float, list[str]]:
+        """Returns (risk_score, reasons)."""
+        values = context.features
+        score = 0.0
+        reasons = []
+
+        for rule, fetch in self.steps:
+            if self.risk_threshold is not None and score >= self.risk_threshold:
+                break
+
+            started = time.perf_counter()
+            for name in fetch:
+                if name not in values:
+                    values[name] = FEATURES[name](transaction, context)
+            reason = rule.check(transaction, values)
+            RULE_DURATION.observe(time.perf_counter() - started, rule=rule.name)
+            RULE_EVALUATIONS.inc(rule=rule.name)
+
+            if reason:
+                RULE_HITS.inc(rule=rule.name)
+                score += rule.weight
+                reasons.append(reason)
+
+        return score, reasons
+
+    def evaluate_batch(self, transactions: list, context: DetectionContext) -> list[tuple[float, list[str]]]:
+        """
+        `evaluate` over many transactions at once, with the same results.
+        Features come from their batch form when registered (else one call per
+        row); rules with a prefilter only run their check on the rows it
+        selects, others on every row. Rows that reached the risk threshold
+        skip the remaining rules. Returns (risk_score, reasons) per transaction.
+        """
+        n = len(transactions)
+        rows: dict[str, list] = {}
+        columns: dict[str, np.ndarray] = {}
+        row_contexts: list[DetectionContext] = []
+        scores = np.zeros(n)
+        reasons: list[list[str]] = [[] for _ in range(n)]
+
+        def fetch(name: str):
+            if name in rows:
+                return
+            if name in BATCH_FEATURES:
+                values = list(BATCH_FEATURES[name](transactions, context))
+            else:
+                if not row_contexts:
+                    row_contexts.extend(DetectionContext(**context.resources) for _ in range(n))
+                values = [FEATURES[name](t, row_contexts[i]) for i, t in enumerate(transactions)]
+            rows[name] = values
+            columns[name] = np.array(values, dtype=object if any(v is None for v in values) else None)
+
+        for rule, _ in self.steps:
+            if self.risk_threshold is None:
+                active = np.arange(n)
+            else:
+                active = np.flatnonzero(scores < self.risk_threshold)
+            if not active.size:
+                break
+
+            for name in rule.features:
+                fetch(name)
+            if rule.prefilter is not None:
+                mask = np.asarray(rule.prefilter({name: columns[name] for name in rule.features}), dtype=bool)
+                candidates = active[mask[active]]
+            else:
+                candidates = active
+
+            hits = 0
+            for i in candidates.tolist():
+                reason = rule.check(transactions[i], {name: rows[name][i] for name in rule.features})
+                if reason:
+                    hits += 1
+                    scores[i] += rule.weight
+                    reasons[i].append(reason)
+            RULE_EVALUATIONS.inc(int(active.size), rule=rule.name)
+            if hits:
+                RULE_HITS.inc(hits, rule=rule.name)
+
+        return list(zip(scores.tolist(), reasons))
+
+
+def compile_plan(rules: list[Rule] | None = None, risk_threshold: float | None = DETECTION_RISK_THRESHOLD) -> EvaluationPlan:
+    """Validate feature dependencies and build an evaluation plan."""
+    rules = RULES if rules is None else rules
+    seen: set[str] = set()
+    steps = []
+    for r in rules:
+        missing = [name for name in r.features if name not in FEATURES]
+        if missing:
+            raise ValueError(f"Rule {r.name} depends on unregistered features: {', '.join(missing)}")
+        fetch = tuple(name for name in r.features if name not in seen)
+        seen.update(fetch)
+        steps.append((r, fetch))
+    return EvaluationPlan(steps, risk_threshold)
+
+
+def get_rule_stats() -> dict[str, dict]:
+    """Per-rule evaluation counts, hit counts and cumulative time."""
+    stats = {}
+    for r in RULES:
+        count, total = RULE_DURATION.get(rule=r.name)
+        stats[r.name] = {
+            "evaluations": RULE_EVALUATIONS.get(rule=r.name),
+            "hits": RULE_HITS.get(rule=r.name),
+            "total_seconds": total,
+            "avg_seconds": total / count if count else 0.0,
+        }
+    return stats
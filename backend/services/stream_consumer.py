@@ -0,0 +1,362 @@
+"""
+Stream Consumer
+Detection as a streaming pipeline: transactions are read from a queue,
+scored in micro-batches, and verdicts are written back. Suspicious
+transactions are handed to a bounded slow-path stage (notification / LLM);
+when that stage falls behind, the consumer stops reading new input.
+"""
+
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from db.replica import read_session_factory
+from metrics_utils import Counter, Gauge
+from models.transaction_model import Transaction
+from services.batch_scoring import score_batch
+from services.burst_counter import BURST_COUNTER
+from services.transaction_service import post_transaction
+from logging_utils import get_logger
+
+LOGGER = get_logger("guardian")
+
+STREAM_BACKEND = os.getenv("DETECTION_STREAM_BACKEND", "memory")  # "memory" or "redis"
+STREAM_INGEST_NAME = os.getenv("DETECTION_STREAM_INGEST", "transactions:ingest")
+STREAM_VERDICT_NAME = os.getenv("DETECTION_STREAM_VERDICTS", "transactions:verdicts")
+STREAM_DEAD_LETTER_NAME = os.getenv("DETECTION_STREAM_DEAD_LETTER", "transactions:deadletter")
+STREAM_GROUP = os.getenv("DETECTION_STREAM_GROUP", "detection")
+STREAM_MAX_PENDING = int(os.getenv("DETECTION_STREAM_MAX_PENDING", "10000"))
+STREAM_BATCH_SIZE = int(os.getenv("DETECTION_STREAM_BATCH_SIZE", "500"))
+STREAM_BATCH_WAIT_MS = int(os.getenv("DETECTION_STREAM_BATCH_WAIT_MS", "50"))
+# entries another consumer has held this long unacknowledged (its pod died
+# mid-batch) are claimed and processed again, up to STREAM_MAX_DELIVERIES times;
+# suspicious entries stay pending until the slow path is done with them, so
+# keep this above the time one can wait in the slow-path queue
+STREAM_CLAIM_IDLE_MS = int(os.getenv("DETECTION_STREAM_CLAIM_IDLE_MS", "60000"))
+STREAM_RECLAIM_INTERVAL_SECONDS = float(os.getenv("DETECTION_STREAM_RECLAIM_INTERVAL_SECONDS", "30"))
+STREAM_MAX_DELIVERIES = int(os.getenv("DETECTION_STREAM_MAX_DELIVERIES", "5"))
+SLOW_PATH_QUEUE_SIZE = int(os.getenv("DETECTION_SLOW_PATH_QUEUE_SIZE", "200"))
+SLOW_PATH_WORKERS = int(os.getenv("DETECTION_SLOW_PATH_WORKERS", "4"))
+
+TRANSACTIONS_PROCESSED = Counter("transactions_processed_total", "Transactions scored by the detection pipeline")
+FRAUD_BLOCKED = Counter("fraud_transactions_blocked_total", "Transactions blocked as suspicious")
+SLOW_PATH_DEPTH = Gauge("detection_slow_path_queue_depth", "Suspicious transactions waiting for the slow path")
+BACKPRESSURE_PAUSES = Counter(
+    "detection_backpressure_pauses_total", "Times ingest reading paused because the slow path was full"
+)
+DEAD_LETTERED = Counter(
+    "detection_stream_dead_lettered_total", "Ingest messages moved to the dead-letter stream", ["reason"]
+)
+
+
+class StreamFull(Exception):
+    """Raised when the in-process stream cannot accept more messages"""
+
+
+class InProcessStream:
+    """Local stand-in for Redis Streams, backed by a bounded asyncio queue"""
+
+    def __init__(self, max_pending: int = STREAM_MAX_PENDING):
+        self._ingest: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.verdicts: deque = deque(maxlen=max_pending)
+        self.dead_letters: deque = deque(maxlen=max_pending)
+        self._next_id = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, payload: dict) -> str:
+        self._next_id += 1
+        message_id = str(self._next_id)
+        try:
+            self._ingest.put_nowait((message_id, payload))
+        except asyncio.QueueFull:
+            raise StreamFull("ingest stream is full") from None
+        return message_id
+
+    async def read(self, count: int, wait_ms: int) -> list[tuple[str, dict]]:
+        """Wait for one message, then drain up to `count` more within `wait_ms`."""
+        batch = [await self._ingest.get()]
+        deadline = asyncio.get_running_loop().time() + wait_ms / 1000
+        while len(batch) < count:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._ingest.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def ack(self, message_ids: list[str]):
+        pass
+
+    async def write_verdicts(self, verdicts: list[dict]):
+        self.verdicts.extend(verdicts)
+
+    async def dead_letter(self, entries: list[tuple[str, object, str]]):
+        self.dead_letters.extend(entries)
+
+    def pending(self) -> int:
+        return self._ingest.qsize()
+
+
+class RedisStream:
+    """
+    Redis Streams transport using a consumer group (requires the redis package).
+    Entries stay pending until acknowledged; every STREAM_RECLAIM_INTERVAL_SECONDS
+    (and on the first read) entries left pending by any consumer for
+    STREAM_CLAIM_IDLE_MS are claimed and read again, and ones already
+    delivered STREAM_MAX_DELIVERIES times go to the dead-letter stream.
+    """
+
+    def __init__(self, url: str, consumer_name: str, max_pending: int = STREAM_MAX_PENDING):
+        import redis.asyncio as redis  # optional dependency
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.consumer_name = consumer_name
+        self.max_pending = max_pending
+        self._reclaim_at = 0.0
+
+    async def start(self):
+        try:
+            await self._redis.xgroup_create(STREAM_INGEST_NAME, STREAM_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def close(self):
+        await self._redis.aclose()
+
+    async def publish(self, payload: dict) -> str:
+        if await self._redis.xlen(STREAM_INGEST_NAME) >= self.max_pending:
+            raise StreamFull("ingest stream is full")
+        return await self._redis.xadd(STREAM_INGEST_NAME, {"data": json.dumps(payload, default=str)})
+
+    async def read(self, count: int, wait_ms: int) -> list[tuple[str, dict]]:
+        now = asyncio.get_running_loop().time()
+        if now >= self._reclaim_at:
+            self._reclaim_at = now + STREAM_RECLAIM_INTERVAL_SECONDS
+            batch = await self._reclaim(count)
+            if batch:
+                return batch
+        response = await self._redis.xreadgroup(
+            STREAM_GROUP, self.consumer_name, {STREAM_INGEST_NAME: ">"}, count=count, block=wait_ms
+        )
+        batch = []
+        for _, messages in response or []:
+            for message_id, fields in messages:
+                batch.append((message_id, _decode(fields)))
+        return batch
+
+    async def _reclaim(self, count: int) -> list[tuple[str, dict]]:
+        """Claim entries left pending too long, e.g. by a consumer whose pod died mid-batch."""
+        stale = await self._redis.xpending_range(
+            STREAM_INGEST_NAME, STREAM_GROUP, min="-", max="+", count=count, idle=STREAM_CLAIM_IDLE_MS
+        )
+        if not stale:
+            return []
+        deliveries = {entry["message_id"]: entry["times_delivered"] for entry in stale}
+        claimed = await self._redis.xclaim(
+            STREAM_INGEST_NAME, STREAM_GROUP, self.consumer_name, STREAM_CLAIM_IDLE_MS, list(deliveries)
+        )
+        batch, exhausted, gone = [], [], []
+        for message_id, fields in claimed:
+            if not fields:
+                gone.append(message_id)  # entry trimmed away while pending
+            elif deliveries[message_id] >= STREAM_MAX_DELIVERIES:
+                exhausted.append((message_id, _decode(fields), f"failed {deliveries[message_id]} deliveries"))
+            else:
+                batch.append((message_id, _decode(fields)))
+        if exhausted:
+            await self.dead_letter(exhausted)
+            DEAD_LETTERED.inc(len(exhausted), reason="deliveries")
+        await self.ack(gone + [message_id for message_id, _, _ in exhausted])
+        if batch:
+            LOGGER.warning(f"Reclaimed {len(batch)} pending ingest messages")
+        return batch
+
+    async def ack(self, message_ids: list[str]):
+        if message_ids:
+            await self._redis.xack(STREAM_INGEST_NAME, STREAM_GROUP, *message_ids)
+            await self._redis.xdel(STREAM_INGEST_NAME, *message_ids)
+
+    async def write_verdicts(self, verdicts: list[dict]):
+        pipe = self._redis.pipeline(transaction=False)
+        for verdict in verdicts:
+            pipe.xadd(STREAM_VERDICT_NAME, {"data": json.dumps(verdict)}, maxlen=self.max_pending, approximate=True)
+        await pipe.execute()
+
+    async def dead_letter(self, entries: list[tuple[str, object, str]]):
+        pipe = self._redis.pipeline(transaction=False)
+        for message_id, payload, error in entries:
+            fields = {"id": message_id, "data": json.dumps(payload, default=str), "error": error}
+            pipe.xadd(STREAM_DEAD_LETTER_NAME, fields, maxlen=self.max_pending, approximate=True)
+        await pipe.execute()
+
+    def pending(self) -> int:
+        return -1  # not tracked locally; use XLEN / XPENDING
+
+
+def _decode(fields: dict):
+    """The JSON payload of a stream entry; anything undecodable is passed on as-is to be dead-lettered."""
+    try:
+        return json.loads(fields["data"])
+    except (KeyError, TypeError, ValueError):
+        return fields
+
+
+def build_stream():
+    if STREAM_BACKEND == "redis":
+        return RedisStream(os.getenv("REDIS_URL", "redis://localhost:6379/0"), os.getenv("HOSTNAME", "guardian"))
+    return InProcessStream()
+
+
+def _score(transactions: list[Transaction]) -> list[dict]:
+    """
+    Record the batch in the shared burst counter, as is_suspicious does for
+    single transactions, then score it with a session so profile misses
+    load the users' history.
+    """
+    for transaction in transactions:
+        if transaction.user_id:
+            BURST_COUNTER.record(transaction.user_id, transaction.transaction_date)
+    with read_session_factory()() as db:
+        return score_batch(transactions, db=db)
+
+
+SlowPathHandler = Callable[[Transaction, str], Awaitable[None]]
+FastPathHandler = Callable[[Transaction], None]
+
+
+class DetectionConsumer:
+    """Reads the ingest stream, scores micro-batches and feeds the slow path"""
+
+    def __init__(
+        self,
+        stream,
+        slow_path: SlowPathHandler,
+        fast_path: FastPathHandler = post_transaction,
+        batch_size: int = STREAM_BATCH_SIZE,
+        batch_wait_ms: int = STREAM_BATCH_WAIT_MS,
+        slow_path_queue_size: int = SLOW_PATH_QUEUE_SIZE,
+        slow_path_workers: int = SLOW_PATH_WORKERS,
+    ):
+        self.stream = stream
+        self.slow_path = slow_path
+        self.fast_path = fast_path
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self.slow_path_workers = slow_path_workers
+        self._suspicious: asyncio.Queue = asyncio.Queue(maxsize=slow_path_queue_size)
+        # resume reading once the slow path has drained to half capacity
+        self._low_watermark = slow_path_queue_size // 2
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        await self.stream.start()
+        self._tasks.append(asyncio.create_task(self._consume()))
+        for _ in range(self.slow_path_workers):
+            self._tasks.append(asyncio.create_task(self._slow_path_worker()))
+        LOGGER.info(f"Detection stream consumer started ({type(self.stream).__name__})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.stream.close()
+
+    async def _wait_for_slow_path(self):
+        if not self._suspicious.full():
+            return
+        BACKPRESSURE_PAUSES.inc()
+        LOGGER.warning("Slow path is full; pausing stream consumption")
+        while self._suspicious.qsize() > self._low_watermark:
+            await asyncio.sleep(self.batch_wait_ms / 1000)
+
+    async def _consume(self):
+        while True:
+            try:
+                await self._wait_for_slow_path()
+                messages = await self.stream.read(self.batch_size, self.batch_wait_ms)
+                if messages:
+                    await self.process_batch(messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOGGER.exception("Detection stream batch failed")
+                await asyncio.sleep(1)
+
+    async def process_batch(self, messages: list[tuple[str, dict]]):
+        """
+        Score and route one batch, then acknowledge it. Messages that are not
+        valid transactions, or whose fast path fails, are moved to the
+        dead-letter stream on their own instead of failing the batch.
+        Suspicious messages are acknowledged by the slow-path worker once it
+        has handled them, so work lost with the pod is redelivered. If
+        scoring itself fails nothing is acknowledged, and Redis redelivers
+        the batch once it has been pending for STREAM_CLAIM_IDLE_MS.
+        """
+        valid, rejected = [], []
+        for message_id, payload in messages:
+            try:
+                valid.append((message_id, Transaction(**payload)))
+            except (TypeError, ValidationError) as e:
+                rejected.append((message_id, payload, f"invalid transaction: {e}"))
+        if rejected:
+            LOGGER.warning(f"Dead-lettering {len(rejected)} invalid ingest messages")
+            await self.stream.dead_letter(rejected)
+            DEAD_LETTERED.inc(len(rejected), reason="invalid")
+
+        transactions = [transaction for _, transaction in valid]
+        results = await run_in_threadpool(_score, transactions) if transactions else []
+
+        failed, handed_off = [], set()
+        for (message_id, transaction), result in zip(valid, results):
+            if result["suspicious"]:
+                transaction.status = "blocked"
+                # blocks when the slow path is full, which stops further reads
+                await self._suspicious.put((message_id, transaction, result["reason"]))
+                handed_off.add(message_id)
+                continue
+            transaction.status = "approved"
+            try:
+                self.fast_path(transaction)
+            except Exception as e:
+                LOGGER.exception(f"Fast path failed for transaction {transaction.transaction_id}")
+                failed.append((message_id, transaction.model_dump(mode="json"), f"fast path failed: {e}"))
+        if failed:
+            await self.stream.dead_letter(failed)
+            DEAD_LETTERED.inc(len(failed), reason="fast_path")
+
+        await self.stream.write_verdicts(results)
+        await self.stream.ack([message_id for message_id, _ in messages if message_id not in handed_off])
+
+        flagged = sum(1 for r in results if r["suspicious"])
+        TRANSACTIONS_PROCESSED.inc(len(results))
+        FRAUD_BLOCKED.inc(flagged)
+        SLOW_PATH_DEPTH.set(self._suspicious.qsize())
+
+    async def _slow_path_worker(self):
+        while True:
+            message_id, transaction, reason = await self._suspicious.get()
+            try:
+                await self.slow_path(transaction, reason)
+                await self.stream.ack([message_id])
+            except Exception:
+                # left pending: Redis redelivers it after STREAM_CLAIM_IDLE_MS
+                LOGGER.exception(f"Slow path failed for transaction {transaction.transaction_id}")
+            finally:
+                self._suspicious.task_done()
+                SLOW_PATH_DEPTH.set(self._suspicious.qsize())
+
+
+STREAM = build_stream() if os.getenv("DETECTION_STREAM_ENABLED", "0") == "1" else None
@@ -4,6 +4,9 @@ from datetime import datetime
 def post_transaction(transaction: Transaction):
     """
     Simulate saving a transaction (to DB or external API).
+    Nothing is written to the ledger here, so the detection caches (profiles,
+    merchant sketches) are left alone; they only learn persisted approvals
+    (providers.transactions.record_approval).
     """
     transaction.status = "approved"
     transaction.suspicious_flag = False
@@ -0,0 +1,113 @@
+"""
+Transaction Store
+Bounded in-process store for transactions seen by the API, indexed by
+transaction_id, user and status
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+TRANSACTION_STORE_CAPACITY = int(os.getenv("TRANSACTION_STORE_CAPACITY", "50000"))
+TRANSACTION_STORE_MAX_PAGE = 500
+
+
+class TransactionStore:
+    """
+    Records are plain dicts (Transaction.dict()). Every index is kept in
+    last-write order (secondary indexes are insertion-ordered dicts used as
+    ordered sets), so pages come back newest first and the least recently
+    written entries are evicted once capacity is reached.
+    """
+
+    def __init__(self, capacity: int = TRANSACTION_STORE_CAPACITY):
+        self.capacity = capacity
+        self._by_id: OrderedDict[str, dict] = OrderedDict()
+        self._by_user: dict[str, dict[str, None]] = {}
+        self._by_status: dict[str, dict[str, None]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    @staticmethod
+    def _index_add(index: dict, key, tx_id: str):
+        index.setdefault(key, {})[tx_id] = None
+
+    @staticmethod
+    def _index_remove(index: dict, key, tx_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.pop(tx_id, None)
+            if not ids:
+                del index[key]
+
+    def _unindex(self, record: dict):
+        tx_id = record["transaction_id"]
+        self._index_remove(self._by_user, record.get("user_id"), tx_id)
+        self._index_remove(self._by_status, record.get("status"), tx_id)
+
+    def put(self, record: dict):
+        """Insert or replace a transaction record."""
+        tx_id = record["transaction_id"]
+        with self._lock:
+            previous = self._by_id.get(tx_id)
+            if previous is not None:
+                self._unindex(previous)
+            self._by_id[tx_id] = record
+            self._by_id.move_to_end(tx_id)
+            self._index_add(self._by_user, record.get("user_id"), tx_id)
+            self._index_add(self._by_status, record.get("status"), tx_id)
+
+            while len(self._by_id) > self.capacity:
+                _, evicted = self._by_id.popitem(last=False)
+                self._unindex(evicted)
+
+    def get(self, transaction_id: str) -> dict | None:
+        return self._by_id.get(transaction_id)
+
+    def list(
+        self,
+        user_id: str | None = None,
+        status: str | None = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> tuple[list[dict], int]:
+        """
+        Newest-first page of records matching the filters.
+        Returns (records, total_matching).
+        """
+        limit = max(0, min(limit, TRANSACTION_STORE_MAX_PAGE))
+        with self._lock:
+            if user_id is not None and status is not None:
+                user_ids = self._by_user.get(user_id, {})
+                status_ids = self._by_status.get(status, {})
+                # walk the smaller index, probe the larger
+                small, large = sorted((user_ids, status_ids), key=len)
+                ids = [tx_id for tx_id in small if tx_id in large]
+            elif user_id is not None:
+                ids = list(self._by_user.get(user_id, {}))
+            elif status is not None:
+                ids = list(self._by_status.get(status, {}))
+            else:
+                ids = None
+
+            if ids is None:
+                total = len(self._by_id)
+                page = []
+                for i, record in enumerate(reversed(self._by_id.values())):
+                    if i >= offset + limit:
+                        break
+                    if i >= offset:
+                        page.append(record)
+                return page, total
+
+            total = len(ids)
+            ids.reverse()
+            return [self._by_id[tx_id] for tx_id in ids[offset:offset + limit]], total
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_user.clear()
+            self._by_status.clear()
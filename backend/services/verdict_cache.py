@@ -0,0 +1,64 @@
+"""
+Verdict Cache
+Idempotency for the verification endpoints: the full response for a
+transaction_id is stored with a TTL, and concurrent retries wait for the
+in-flight attempt instead of repeating detection, notification and LLM calls
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+from metrics_utils import Counter
+from services.ttl_cache import TTLCache
+
+VERDICT_CACHE_TTL_SECONDS = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "900"))
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "100000"))
+
+VERDICT_CACHE_LOOKUPS = Counter("verdict_cache_lookups_total", "Verdict cache lookups", ["result"])
+
+
+class VerdictCache:
+    def __init__(self, max_entries: int = VERDICT_CACHE_MAX_ENTRIES, ttl_seconds: float = VERDICT_CACHE_TTL_SECONDS):
+        self._responses = TTLCache(max_entries, ttl_seconds)
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    def get(self, transaction_id: str) -> dict | None:
+        return self._responses.get(transaction_id)
+
+    async def get_or_compute(self, transaction_id: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        Return the stored response for the transaction, or run `compute` once.
+        Failures are not cached, so a retry after an error runs again.
+        """
+        cached = self._responses.get(transaction_id)
+        if cached is not None:
+            VERDICT_CACHE_LOOKUPS.inc(result="hit")
+            return cached
+
+        pending = self._in_flight.get(transaction_id)
+        if pending is not None:
+            VERDICT_CACHE_LOOKUPS.inc(result="in_flight")
+            return await asyncio.shield(pending)
+
+        VERDICT_CACHE_LOOKUPS.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[transaction_id] = future
+        try:
+            response = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            self._responses.set(transaction_id, response)
+            future.set_result(response)
+            return response
+        finally:
+            del self._in_flight[transaction_id]
+
+    def invalidate(self, transaction_id: str):
+        self._responses.pop(transaction_id)
+
+
+VERDICT_CACHE = VerdictCache()
@@ -4,12 +4,15 @@ Handles transaction verification flow including security questions
 """
 
 from sqlalchemy.orm import Session
+from db.db import SessionLocal
+from db.replica import read_session_factory
 from models.Transcation import TransactionDB, TxStatus
 from models.ledger import TransactionLedger
-from providers.transactions import get_transaction, approve_transaction
+from providers.transactions import get_transaction, approve_transaction, fetch_detection_features
 from services.notification_service import send_notification
 from services.detection_services import is_suspicious
 from services.email_service import send_verification_email
+from services.blocking_io import SMTP_EXECUTOR, ExecutorSaturated
 from models.transaction_model import Transaction
 from datetime import datetime
 from logging_utils import get_logger
@@ -29,24 +32,54 @@ def verify_transaction(db: Session, tx_id: int, db_transaction: TransactionDB) -
     Verify a transaction for suspicious activity.
     Returns (is_suspicious: bool, reason: str)
     """
-    # Convert TransactionDB to Transaction model for detection service
+    tx_ts = db_transaction.tx_ts or datetime.combine(db_transaction.tx_date, datetime.min.time())
+
+    # Convert TransactionDB to Transaction model for detection service.
+    # An empty user_id marks an anonymous transaction: detection skips its
+    # history features and burst recording
     transaction_model = Transaction(
         transaction_id=str(db_transaction.id),
-        user_id="",  # TODO: Add user_id to TransactionDB model
+        user_id=db_transaction.user_id or "",
         amount=float(db_transaction.amount),
-        currency="USD",  # TODO: Add currency field
+        currency=db_transaction.currency,
         merchant=db_transaction.vendor,
-        transaction_date=datetime.combine(db_transaction.tx_date, datetime.min.time()),
+        category=db_transaction.category,
+        country=db_transaction.country,
+        transaction_date=tx_ts,
         status=db_transaction.status.value,
         suspicious_flag=False
     )
-    
+
+    # All history-based features in a single query, served by the replica
+    # when one is available (a few seconds of lag does not change them)
+    features = None
+    if db_transaction.user_id:
+        with read_session_factory()() as read_db:
+            features = fetch_detection_features(read_db, db_transaction.user_id, tx_ts)
+
     # Check for suspicious activity
-    suspicious, reason = is_suspicious(transaction_model)
+    suspicious, reason = is_suspicious(transaction_model, db, features=features)
     
     return suspicious, reason
 
 
+def verify_new_transaction(tx_id: int) -> None:
+    """
+    Background check run after create_trx: lock the transaction for
+    verification when detection flags it.
+    """
+    try:
+        with SessionLocal() as db:
+            tx = get_transaction(db, tx_id)
+            if tx is None:
+                return
+            suspicious, reason = verify_transaction(db, tx_id, tx)
+            if suspicious:
+                lock_transaction_for_verification(db, tx_id, reason)
+    except Exception:
+        LOGGER.exception(f"Background verification of transaction {tx_id} failed")
+
+
 def lock_transaction_for_verification(db: Session, tx_id: int, reason: str) -> TransactionDB:
     """
     Lock a transaction pending user verification.
@@ -69,12 +102,17 @@ def lock_transaction_for_verification(db: Session, tx_id: int, reason: str) -> T
     # Send email notification
     user_email = get_user_email(db, tx)  # TODO: Implement user email lookup
     if user_email:
-        send_verification_email(
-            user_email=user_email,
-            transaction=tx,
-            reason=reason,
-            verification_url=f"/api/transactions/verify/{tx_id}"
-        )
+        # SMTP can take seconds; hand it to the bounded SMTP pool and carry on
+        try:
+            SMTP_EXECUTOR.submit(
+                send_verification_email,
+                user_email=user_email,
+                transaction=tx,
+                reason=reason,
+                verification_url=f"/api/transactions/verify/{tx_id}"
+            )
+        except ExecutorSaturated:
+            LOGGER.warning(f"SMTP executor saturated; verification email for transaction {tx_id} not sent")
     
     # Create in-app notification
     user_id = get_user_id(db, tx)  # TODO: Implement user ID lookup
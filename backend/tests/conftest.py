@@ -0,0 +1,23 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+# tests import backend modules the same way the app does (from db.db import ...)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture(scope="session")
+def postgres_engine():
+    """A migrated TEST_POSTGRES_URL database; tests using it are skipped without one."""
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    from db.migrations import migrate
+
+    engine = create_engine(url)
+    migrate(engine, log=lambda msg: None)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,38 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from services.admission_control import AdmissionControlMiddleware, LocalTokenBuckets, RouteLimit, admit
+
+
+class _Body(BaseModel):
+    user_id: str
+    cached: bool = False
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/verify")
+    async def verify(body: _Body, request: Request):
+        if not body.cached:  # e.g. a verdict cache hit returns before detection
+            await admit(request)
+        return {"user_id": body.user_id}
+
+    limit = RouteLimit("verification", user_rate=0.0001, user_burst=2, global_rate=100, global_burst=100)
+    app.add_middleware(
+        AdmissionControlMiddleware, limits={("POST", "/verify"): limit}, buckets=LocalTokenBuckets()
+    )
+    return TestClient(app)
+
+
+def test_only_requests_reaching_detection_are_charged():
+    client = _client()
+    assert [client.post("/verify", json={}).status_code for _ in range(3)] == [422] * 3
+    assert [client.post("/verify", json={"user_id": "u1", "cached": True}).status_code for _ in range(3)] == [200] * 3
+
+    assert [client.post("/verify", json={"user_id": "u1"}).status_code for _ in range(2)] == [200, 200]
+    rejected = client.post("/verify", json={"user_id": "u1"})
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert client.post("/verify", json={"user_id": "u2"}).json() == {"user_id": "u2"}
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from models.aggregates import DailyAggregateDB
+from models.ledger import TransactionLedger
+from models.Transcation import TransactionDB, TxStatus
+from providers.transactions import approve_transactions
+
+VENDOR = "approval-test"
+
+
+def _sqlite_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    for model in (TransactionDB, TransactionLedger, DailyAggregateDB):
+        model.__table__.create(engine)
+    return engine
+
+
+def _add_pending(engine, count: int) -> list[int]:
+    with Session(engine) as db:
+        txs = [
+            TransactionDB(amount=Decimal("10.00"), vendor=VENDOR, category="food",
+                          tx_date=date(2026, 1, 9), status=TxStatus.pending)
+            for _ in range(count)
+        ]
+        db.add_all(txs)
+        db.commit()
+        return [tx.id for tx in txs]
+
+
+def _aggregate(engine):
+    with Session(engine) as db:
+        row = db.execute(
+            select(DailyAggregateDB.approved_count, DailyAggregateDB.approved_amount)
+            .where(DailyAggregateDB.vendor == VENDOR)
+        ).one()
+    return row.approved_count, row.approved_amount
+
+
+def _cleanup(engine):
+    with Session(engine) as db:
+        db.execute(delete(TransactionDB).where(TransactionDB.vendor == VENDOR))
+        db.execute(delete(TransactionLedger).where(TransactionLedger.vendor == VENDOR))
+        db.execute(delete(DailyAggregateDB).where(DailyAggregateDB.vendor == VENDOR))
+        db.commit()
+
+
+def _assert_reapproval_is_idempotent(engine):
+    first, second, third = _add_pending(engine, 3)
+    unknown = third + 1000
+    try:
+        with Session(engine) as db:
+            approved = approve_transactions(db, [first, second, unknown, first])
+            ledger_ids = {tx_id: ledger.id for tx_id, (_, ledger) in approved.items()}
+        assert list(approved) == [first, second]
+        assert _aggregate(engine) == (2, Decimal("20.00"))
+
+        with Session(engine) as db:
+            again = approve_transactions(db, [second, third, first, unknown])
+        assert list(again) == [second, third, first]
+        assert {tx_id: again[tx_id][1].id for tx_id in (first, second)} == ledger_ids
+        assert all(tx.status == TxStatus.approved for tx, _ in again.values())
+        # only the newly approved transaction is added to the daily totals
+        assert _aggregate(engine) == (3, Decimal("30.00"))
+    finally:
+        _cleanup(engine)
+
+
+def test_reapproval_returns_existing_ledger_rows(tmp_path):
+    _assert_reapproval_is_idempotent(_sqlite_engine(tmp_path / "approvals.db"))
+
+
+def test_reapproval_returns_existing_ledger_rows_on_postgres(postgres_engine):
+    _assert_reapproval_is_idempotent(postgres_engine)
+
+
+def test_expire_on_commit_is_restored_when_the_commit_fails(tmp_path, monkeypatch):
+    engine = _sqlite_engine(tmp_path / "approvals.db")
+    (tx_id,) = _add_pending(engine, 1)
+    with Session(engine) as db:
+        def fail():
+            raise RuntimeError("connection lost")
+
+        monkeypatch.setattr(db, "commit", fail)
+        with pytest.raises(RuntimeError):
+            approve_transactions(db, [tx_id])
+        assert db.expire_on_commit is True
+
+
+def test_batch_endpoint_reports_unknown_ids(tmp_path):
+    router = pytest.importorskip("routers.transaction_router", exc_type=ImportError)
+    from fastapi import Response
+    from schemas.transaction import ApproveBatchIn
+
+    path = tmp_path / "approvals.db"
+    first, second = _add_pending(_sqlite_engine(path), 2)
+
+    async def approve(tx_ids):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                return await router.approve_tx_batch(ApproveBatchIn(tx_ids=tx_ids), Response(), db)
+        finally:
+            await engine.dispose()
+
+    result = asyncio.run(approve([first, 999, second, 999]))
+    assert [item.id for item in result.items] == [first, second]
+    assert result.not_found == [999]
+    retried = asyncio.run(approve([second, first]))
+    assert [item.ledger_id for item in retried.items] == [item.ledger_id for item in reversed(result.items)]
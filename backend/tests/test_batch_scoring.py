@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from models.transaction_model import Transaction
+from services.batch_scoring import score_batch
+from services.burst_counter import BurstCounter
+from services.detection_services import is_suspicious
+from services.merchant_sketch import MerchantSketchStore
+from services.profile_cache import ProfileCache
+from services.rule_engine import DetectionContext, compile_plan
+
+T0 = datetime(2026, 1, 9, 12, 0)
+
+
+def _transaction(i, user_id="u1", amount=50.0, merchant="Grocer", category="food", country="US", at=None):
+    return Transaction(
+        transaction_id=f"t{i}", user_id=user_id, amount=amount, currency="USD", merchant=merchant,
+        category=category, country=country, transaction_date=at or T0 + timedelta(hours=i),
+    )
+
+
+def _mixed_batch():
+    batch = [
+        _transaction(0),
+        _transaction(1, amount=9000.0),                   # over the limit
+        _transaction(2, amount=350.0),                    # well above the user's average
+        _transaction(3, merchant="Jeweller", amount=120.0),  # large first payment to a merchant
+        _transaction(4, country="FR"),                    # away from home
+        _transaction(5, category="Crypto"),               # high-risk category
+        _transaction(6, at=T0.replace(hour=3)),           # unusual hour, combined below
+        _transaction(7, amount=9000.0, category="gambling", country="FR"),
+        _transaction(8, user_id="u3"),                    # unknown user, empty profile
+    ]
+    # a burst of six payments within ten minutes for another user
+    batch += [_transaction(9 + i, user_id="u2", at=T0 + timedelta(minutes=i)) for i in range(6)]
+    return batch
+
+
+def _state():
+    profiles, merchants = ProfileCache(), MerchantSketchStore()
+    for user_id in ("u1", "u2"):
+        for _ in range(5):
+            profiles.setdefault(user_id).update(50.0, "US")
+        merchants.add(user_id, "Grocer")
+    return profiles, merchants
+
+
+def test_batch_and_single_scoring_agree():
+    batch = _mixed_batch()
+
+    profiles, merchants = _state()
+    bursts = BurstCounter()
+    single = [is_suspicious(t, profiles=profiles, bursts=bursts, merchants=merchants) for t in batch]
+
+    profiles, merchants = _state()
+    bursts = BurstCounter()
+    for t in batch:
+        bursts.record(t.user_id, t.transaction_date)
+    batched = score_batch(batch, profiles=profiles, merchants=merchants, bursts=bursts)
+
+    assert [(r["suspicious"], r["reason"]) for r in batched] == single
+    assert [r["suspicious"] for r in batched] == [False, True, True, True, True, True, True, True, False,
+                                                  False, False, False, False, False, True]
+    assert "Unusual burst" in batched[-1]["reason"]
+
+
+def test_batch_stops_at_the_risk_threshold_like_single_evaluation():
+    plan = compile_plan(risk_threshold=1)
+    batch = _mixed_batch()
+    profiles, merchants = _state()
+
+    def context():
+        return DetectionContext(db=None, profiles=profiles, bursts=BurstCounter(), merchants=merchants)
+
+    single = [plan.evaluate(t, context()) for t in batch]
+    assert plan.evaluate_batch(batch, context()) == single
+    assert single[7] == (1.0, ["High transaction amount (9000.0) exceeds safe limit."])
+
+
+def test_anonymous_transactions_do_not_share_history():
+    batch = [_transaction(i, user_id="", at=T0 + timedelta(minutes=i)) for i in range(6)]
+    batch.append(_transaction(6, user_id="", amount=400.0, merchant="Jeweller", at=T0 + timedelta(minutes=6)))
+
+    profiles, merchants = _state()
+    bursts = BurstCounter()
+    single = [is_suspicious(t, profiles=profiles, bursts=bursts, merchants=merchants) for t in batch]
+    batched = score_batch(batch, profiles=profiles, merchants=merchants, bursts=bursts)
+
+    assert [suspicious for suspicious, _ in single] == [False] * 7
+    assert [r["suspicious"] for r in batched] == [False] * 7
+    assert bursts.count("", "10m", T0 + timedelta(minutes=7)) == 0
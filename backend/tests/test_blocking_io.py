@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.blocking_io import CALLS, IN_FLIGHT, QUEUE_DEPTH, BlockingCallTimeout, BlockingExecutor, ExecutorSaturated
+
+
+def test_calls_beyond_workers_and_queue_are_rejected():
+    executor = BlockingExecutor("test-saturation", max_workers=1, max_queue=1, timeout=1)
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait)
+        queued = executor.submit(lambda: "queued")
+        with pytest.raises(ExecutorSaturated):
+            executor.submit(lambda: "rejected")
+        assert QUEUE_DEPTH.get(dependency="test-saturation") + IN_FLIGHT.get(dependency="test-saturation") == 2
+    finally:
+        release.set()
+    assert running.result(1) is True and queued.result(1) == "queued"
+
+    assert CALLS.get(dependency="test-saturation", outcome="rejected") == 1
+    assert CALLS.get(dependency="test-saturation", outcome="ok") == 2
+    assert (QUEUE_DEPTH.get(dependency="test-saturation"), IN_FLIGHT.get(dependency="test-saturation")) == (0, 0)
+    executor.shutdown()
+
+
+def test_timed_out_calls_raise_and_leave_the_queue():
+    executor = BlockingExecutor("test-timeout", max_workers=1, max_queue=1, timeout=0.05)
+    release = threading.Event()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(executor.run(release.wait, timeout=1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(BlockingCallTimeout):
+            await executor.run(lambda: "never starts")
+        # the queued call was dropped, so its slot is free again
+        assert QUEUE_DEPTH.get(dependency="test-timeout") == 0
+        release.set()
+        return await blocker
+
+    assert asyncio.run(scenario()) is True
+    assert CALLS.get(dependency="test-timeout", outcome="timeout") == 1
+    assert CALLS.get(dependency="test-timeout", outcome="ok") == 1
+    executor.shutdown()
+
+
+def test_failed_calls_are_counted_as_errors():
+    executor = BlockingExecutor("test-error", max_workers=1, max_queue=0, timeout=1)
+
+    def fail():
+        raise RuntimeError("smtp down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.run(fail))
+    assert CALLS.get(dependency="test-error", outcome="error") == 1
+    executor.shutdown()
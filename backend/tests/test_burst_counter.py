@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from services.burst_counter import BurstCounter
+
+T0 = datetime(2026, 1, 9, 12, 0)
+
+
+def _minutes(n: float) -> datetime:
+    return T0 + timedelta(minutes=n)
+
+
+def test_windows_count_from_one_history():
+    bursts = BurstCounter()
+    for minute in (0, 30, 55, 58, 59.5):
+        bursts.record("u1", _minutes(minute))
+    now = _minutes(60)
+    assert [bursts.count("u1", window, now) for window in ("1m", "10m", "1h")] == [1, 3, 5]
+    assert bursts.count("u2", "1h", now) == 0
+
+
+def test_out_of_order_events_are_counted():
+    bursts = BurstCounter()
+    for minute in (50, 20, 58, 55):
+        bursts.record("u1", _minutes(minute))
+    assert bursts.count("u1", "10m", _minutes(60)) == 3
+    assert bursts.count("u1", "1h", _minutes(60)) == 4
+    # events at or after `now` are not recent
+    assert bursts.count("u1", "10m", _minutes(55)) == 1
+
+
+def test_largest_window_is_not_capped_by_a_smaller_limit():
+    bursts = BurstCounter(max_events_per_user=1024)
+    for second in range(0, 3600, 6):  # 600 events in the hour
+        bursts.record("u1", T0 + timedelta(seconds=second))
+    now = T0 + timedelta(hours=1)
+    assert bursts.count("u1", "1h", now) == 600
+    assert bursts.count("u1", "10m", now) == 100
+
+
+def test_events_older_than_the_largest_window_are_dropped():
+    bursts = BurstCounter(max_users=1)
+    bursts.record("u1", _minutes(0))
+    bursts.record("u1", _minutes(61))
+    assert len(bursts._users["u1"]) == 1
+    bursts.record("u2", _minutes(61))
+    assert len(bursts) == 1 and bursts.count("u1", "1h", _minutes(62)) == 0
@@ -0,0 +1,75 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from models.Transcation import TransactionDB, TxStatus
+from services import export_service
+from services.export_service import EXPORT_TABLES, encode_csv, encode_ndjson, export_stream, gzip_chunks, iter_rows
+
+START = date(2026, 1, 1)
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    TransactionDB.__table__.create(engine)
+    with Session(engine) as db:
+        for i in range(300):
+            day = START + timedelta(days=i % 30)
+            db.add(TransactionDB(
+                user_id=f"u{i % 7}", amount=Decimal(f"{i}.25"), vendor=f'shop, "{i}"', category="food",
+                tx_date=day, tx_ts=datetime.combine(day, datetime.min.time()), status=TxStatus.approved,
+            ))
+        db.commit()
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(export_service, "read_session_factory", lambda: factory)
+    # small chunks so every export spans several of them
+    monkeypatch.setattr(export_service, "EXPORT_CHUNK_BYTES", 1024)
+    return factory
+
+
+def _plain_rows(rows):
+    return [[export_service._plain(value) for value in row] for row in rows]
+
+
+def test_ndjson_and_csv_chunks_round_trip(session_factory):
+    _, columns = EXPORT_TABLES["transactions"]
+    rows = list(iter_rows("transactions", session_factory=session_factory))
+
+    ndjson = list(encode_ndjson(rows, columns))
+    assert len(ndjson) > 1
+    parsed = [json.loads(line) for line in b"".join(ndjson).decode().splitlines()]
+    assert [[record[name] for name in columns] for record in parsed] == _plain_rows(rows)
+
+    chunks = list(encode_csv(rows, columns))
+    assert len(chunks) > 1
+    header, *records = csv.reader(io.StringIO(b"".join(chunks).decode()))
+    assert tuple(header) == columns
+    expected = [["" if value is None else str(value) for value in row] for row in _plain_rows(rows)]
+    assert records == expected
+
+
+def test_gzip_stream_decompresses_to_the_plain_export(session_factory):
+    plain = b"".join(export_stream("transactions", "csv"))
+    compressed = list(export_stream("transactions", "csv", gzip=True))
+
+    assert len(plain) > export_service.EXPORT_CHUNK_BYTES
+    assert gzip.decompress(b"".join(compressed)) == plain
+
+
+def test_date_range_is_inclusive_and_ordered(session_factory):
+    date_from, date_to = START + timedelta(days=10), START + timedelta(days=12)
+    rows = list(iter_rows("transactions", date_from, date_to, session_factory=session_factory))
+    columns = EXPORT_TABLES["transactions"][1]
+    tx_date, tx_id = columns.index("tx_date"), columns.index("id")
+
+    assert len(rows) == 30  # ten rows on each of the three days
+    assert {row[tx_date] for row in rows} == {date_from, date_from + timedelta(days=1), date_to}
+    assert [(row[tx_date], row[tx_id]) for row in rows] == sorted((row[tx_date], row[tx_id]) for row in rows)
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models.idempotency import IdempotencyKeyDB
+from services.idempotency import IdempotencyStore
+
+
+def _run(tmp_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'idempotency.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(IdempotencyKeyDB.__table__.create)
+        try:
+            await scenario(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_abandoned_claim_is_taken_over_after_its_lease(tmp_path):
+    async def scenario(session_factory):
+        crashed = IdempotencyStore(session_factory)
+        lease, _ = await crashed._claim("create_trx", "k1", "h")  # claimed, then the pod died
+
+        retry = IdempotencyStore(session_factory)
+        with pytest.raises(HTTPException) as in_progress:
+            await retry.run("create_trx", "k1", "h", lambda: asyncio.sleep(0, {"id": 1}))
+        assert in_progress.value.status_code == 409
+
+        async with session_factory() as db:
+            await db.execute(update(IdempotencyKeyDB).values(locked_until=datetime.utcnow() - timedelta(seconds=1)))
+            await db.commit()
+        assert await retry.run("create_trx", "k1", "h", lambda: asyncio.sleep(0, {"id": 1})) == ({"id": 1}, False)
+        # the crashed request's lease is gone: it can no longer release the new holder's result
+        await crashed._release("create_trx", "k1", lease)
+        assert await IdempotencyStore(session_factory).run("create_trx", "k1", "h", None) == ({"id": 1}, True)
+
+    _run(tmp_path, scenario)
+
+
+def test_failed_completion_keeps_the_claim(tmp_path):
+    async def scenario(session_factory):
+        store = IdempotencyStore(session_factory)
+
+        async def broken_complete(*args):
+            raise RuntimeError("database went away")
+
+        store._complete = broken_complete
+        assert await store.run("create_trx", "k1", "h", lambda: asyncio.sleep(0, {"id": 1})) == ({"id": 1}, False)
+
+        with pytest.raises(HTTPException) as in_progress:
+            await IdempotencyStore(session_factory).run("create_trx", "k1", "h", lambda: asyncio.sleep(0, {"id": 2}))
+        assert in_progress.value.status_code == 409
+
+    _run(tmp_path, scenario)
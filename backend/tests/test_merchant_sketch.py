@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from models.transaction_model import Transaction
+from services.batch_scoring import score_batch
+from services.burst_counter import BurstCounter
+from services.detection_services import is_suspicious
+from services.merchant_sketch import MerchantSketchStore
+from services.profile_cache import ProfileCache
+
+
+def _transaction(merchant: str, amount: float) -> Transaction:
+    return Transaction(
+        transaction_id=f"{merchant}-{amount}", user_id="u1", amount=amount, currency="USD",
+        merchant=merchant, category="food", transaction_date=datetime(2026, 1, 9, 12, 0),
+    )
+
+
+def test_large_first_payment_to_a_merchant_is_flagged_by_both_scoring_paths():
+    profiles, merchants = ProfileCache(), MerchantSketchStore()
+    for _ in range(5):
+        profiles.setdefault("u1").update(100.0, None)
+    merchants.add("u1", "Grocer")
+    transactions = [_transaction("Grocer", 250.0), _transaction("Jeweller", 250.0), _transaction("Bakery", 150.0)]
+
+    single = [is_suspicious(t, profiles=profiles, bursts=BurstCounter(), merchants=merchants)[0] for t in transactions]
+    batch = score_batch(transactions, profiles=profiles, merchants=merchants)
+
+    assert single == [False, True, False]
+    assert [r["suspicious"] for r in batch] == single
+    assert batch[1]["reason"].startswith("First payment to Jeweller")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "sketches.bin")
+    merchants = MerchantSketchStore()
+    merchants.add("u1", "Grocer", ledger_id=7)
+    merchants.save(path)
+
+    restored = MerchantSketchStore()
+    assert restored.load(path)
+    assert restored.has_seen("u1", "grocer ") and restored.ledger_watermark == 7
+    assert [p.name for p in tmp_path.iterdir()] == ["sketches.bin"]
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = tmp_path / "sketches.bin"
+    merchants = MerchantSketchStore()
+    merchants.add("u1", "Grocer")
+    merchants.save(str(path))
+    path.write_bytes(path.read_bytes()[:-10])
+
+    restored = MerchantSketchStore()
+    with pytest.raises(ValueError):
+        restored.load(str(path))
+    assert len(restored) == 0
+
+
+def test_least_recently_added_users_are_evicted(tmp_path):
+    merchants = MerchantSketchStore(max_users=2)
+    merchants.add("u1", "Grocer")
+    merchants.add("u2", "Grocer")
+    merchants.add("u1", "Bakery")
+    merchants.add("u3", "Grocer")
+
+    assert len(merchants) == 2
+    assert merchants.is_novel("u2", "Grocer")
+    assert merchants.has_seen("u1", "Grocer") and merchants.has_seen("u3", "Grocer")
+
+    path = str(tmp_path / "sketches.bin")
+    merchants.save(path)
+    restored = MerchantSketchStore(max_users=1)
+    assert restored.load(path)
+    assert len(restored) == 1 and restored.has_seen("u3", "Grocer")
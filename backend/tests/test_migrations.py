@@ -0,0 +1,34 @@
+"""
+Migrations must apply to an empty database from a fresh interpreter, the
+way scripts/init_database.py runs them, without relying on models that
+happen to be imported already by other tests.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect
+
+BACKEND = Path(__file__).parent.parent
+
+MIGRATE = """
+import sys
+from sqlalchemy import create_engine
+from db.migrations import migrate, pending
+engine = create_engine(sys.argv[1])
+migrate(engine, log=lambda msg: None)
+assert pending(engine) == [], pending(engine)
+"""
+
+
+def test_migrate_empty_sqlite_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    result = subprocess.run(
+        [sys.executable, "-c", MIGRATE, url], cwd=BACKEND, capture_output=True, text=True,
+        env={"PYTHONPATH": str(BACKEND), "DATABASE_URL": url, "PATH": ""},
+    )
+    assert result.returncode == 0, result.stderr
+
+    tables = set(inspect(create_engine(url)).get_table_names())
+    assert {"transactions", "transaction_ledger", "daily_aggregates", "schema_migrations"} <= tables
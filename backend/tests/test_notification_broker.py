@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from services.notification_broker import NotificationBroker, TooManyConnections
+
+
+class _SharedChannel:
+    """Stands in for the Redis channel: every listening broker receives every publish."""
+
+    def __init__(self):
+        self.listeners = []
+
+    def publish(self, notification: dict):
+        for deliver in self.listeners:
+            deliver(notification)
+
+    async def listen(self, deliver):
+        self.listeners.append(deliver)
+        await asyncio.Event().wait()
+
+
+def test_notifications_reach_subscribers_on_other_pods():
+    async def scenario():
+        channel = _SharedChannel()
+        pod_a, pod_b = NotificationBroker(fanout=channel), NotificationBroker(fanout=channel)
+        listeners = [asyncio.create_task(pod.listen()) for pod in (pod_a, pod_b)]
+        await asyncio.sleep(0)
+
+        subscription = pod_b.subscribe("u1")
+        pod_a.publish({"notification_id": "n1", "user_id": "u1", "created_at": datetime(2026, 1, 1)})
+        received = await subscription.get(1)
+        for task in listeners:
+            task.cancel()
+        return received
+
+    assert asyncio.run(scenario())["notification_id"] == "n1"
+
+
+def test_subscribe_refuses_past_the_connection_cap():
+    async def scenario():
+        broker = NotificationBroker(max_connections=1)
+        broker.subscribe("u1")
+        with pytest.raises(TooManyConnections):
+            broker.subscribe("u2")
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.notifications import NotificationDB
+from services.notification_store import NotificationStore
+
+CREATED_AT = datetime(2026, 1, 1, 12)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'notifications.db'}")
+    NotificationDB.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _notification(notification_id: str, user_id: str = "u1") -> dict:
+    return {"notification_id": notification_id, "user_id": user_id, "message": "m", "read": False,
+            "created_at": CREATED_AT}
+
+
+def test_cursor_keeps_notifications_sharing_a_timestamp(session_factory):
+    store = NotificationStore(session_factory)
+    for notification_id in ("a", "b", "c"):
+        store.add(_notification(notification_id))
+
+    after_a = store.list_since("u1", CREATED_AT, "a")
+    assert [n["notification_id"] for n in after_a] == ["b", "c"]
+    assert store.list_since("u1", CREATED_AT) == []
+
+
+def test_reads_see_writes_from_other_pods(session_factory):
+    here, other = NotificationStore(session_factory), NotificationStore(session_factory)
+    here.add(_notification("a"))
+    assert here.unread_count("u1") == 1  # now cached on this pod
+
+    other.add(_notification("b"))
+    assert [n["notification_id"] for n in here.list_since("u1", CREATED_AT, "a")] == ["b"]
+    assert [n["notification_id"] for n in here.list_since("u1", unread_only=True)] == ["a", "b"]
+
+    other.mark_read("u1")
+    assert here.list_since("u1", unread_only=True) == []
+
+
+def test_failed_write_leaves_the_cache_alone(session_factory):
+    store = NotificationStore(session_factory)
+    store.add(_notification("a"))
+    assert store.unread_count("u1") == 1
+
+    assert store.add(_notification("a")) is False  # duplicate primary key
+    assert store.unread_count("u1") == 1
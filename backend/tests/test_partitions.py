@@ -0,0 +1,67 @@
+"""
+Partition maintenance on Postgres; skipped unless TEST_POSTGRES_URL points
+to a disposable database. Each test rolls back its own changes.
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from db.partitions import (
+    PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES, add_months, create_month_partitions, ensure_partitions,
+    month_start, partition_months, partition_name,
+)
+from services.archive_service import ARCHIVE_TABLES, archive_month, read_archive
+
+
+def test_new_month_takes_its_rows_from_the_default_partition(postgres_engine):
+    # dated past the months created ahead, so both rows land in *_default
+    month = add_months(month_start(date.today()), PARTITION_MONTHS_AHEAD + 2)
+    ts = datetime(month.year, month.month, 1, 12)
+    with postgres_engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            tx_id = conn.scalar(text(
+                "INSERT INTO transactions (user_id, amount, currency, vendor, category, tx_date, tx_ts, "
+                "status, created_at, updated_at) "
+                "VALUES ('u1', 10, 'USD', 'v', 'c', :day, :ts, 'approved', :ts, :ts) RETURNING id"
+            ), {"day": month, "ts": ts})
+            conn.execute(text(
+                "INSERT INTO transaction_ledger (tx_id, amount, vendor, category, tx_date, approved_at) "
+                "VALUES (:tx_id, 10, 'v', 'c', :day, :ts)"
+            ), {"tx_id": tx_id, "day": month, "ts": ts})
+
+            created = ensure_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD + 2)
+
+            for table in PARTITIONED_TABLES:
+                assert partition_name(table, month) in created
+                home = conn.scalar(
+                    text(f"SELECT tableoid::regclass::text FROM {table} WHERE tx_date = :day"), {"day": month}
+                )
+                assert home == partition_name(table, month)
+        finally:
+            trans.rollback()
+
+
+def test_archive_month_drops_the_partitions(postgres_engine, tmp_path):
+    month = date(2001, 1, 1)
+    ts = datetime(2001, 1, 15, 12)
+    with postgres_engine.begin() as conn:
+        create_month_partitions(conn, month, PARTITIONED_TABLES)
+        tx_id = conn.scalar(text(
+            "INSERT INTO transactions (user_id, amount, currency, vendor, category, tx_date, tx_ts, "
+            "status, created_at, updated_at) "
+            "VALUES ('u1', 10, 'USD', 'v', 'c', :day, :ts, 'approved', :ts, :ts) RETURNING id"
+        ), {"day": ts.date(), "ts": ts})
+        conn.execute(text(
+            "INSERT INTO transaction_ledger (tx_id, amount, vendor, category, tx_date, approved_at) "
+            "VALUES (:tx_id, 10, 'v', 'c', :day, :ts)"
+        ), {"tx_id": tx_id, "day": ts.date(), "ts": ts})
+
+    for table in ARCHIVE_TABLES:
+        manifest = archive_month(postgres_engine, table, month, str(tmp_path), allow_local_disk=True)
+        assert manifest["rows"] == 1
+        assert [row["tx_date"] for row in read_archive(table, month, str(tmp_path))] == [ts.date().isoformat()]
+    with postgres_engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            assert month not in partition_months(conn, table)
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from models.Transcation import TransactionDB, TxStatus
+from services.profile_cache import ProfileCache
+
+
+def test_get_without_session_does_not_cache():
+    profiles = ProfileCache()
+    profile = profiles.get("u1")
+    assert profile.count == 0
+    assert len(profiles) == 0
+
+    # a later approval is not folded into a profile that was never loaded
+    profiles.record("u1", 10.0)
+    assert len(profiles) == 0
+
+
+def test_setdefault_caches_an_empty_profile():
+    profiles = ProfileCache()
+    profiles.setdefault("u1").update(10.0, "US")
+    assert profiles.get("u1").count == 1
+    assert profiles.get("u1").home_country == "US"
+
+
+def test_get_many_loads_every_missing_user_in_two_queries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profiles.db'}")
+    TransactionDB.__table__.create(engine)
+    rows = [("u1", "10.00", "US"), ("u1", "30.00", "US"), ("u1", "20.00", "FR"), ("u2", "5.00", None)]
+    with Session(engine) as db:
+        db.add_all(
+            TransactionDB(user_id=user_id, amount=Decimal(amount), vendor="v", category="c", country=country,
+                          tx_date=date(2026, 1, 9), tx_ts=datetime(2026, 1, 9, 12), status=TxStatus.approved)
+            for user_id, amount, country in rows
+        )
+        db.add(TransactionDB(user_id="u2", amount=Decimal("900.00"), vendor="v", category="c",
+                             tx_date=date(2026, 1, 9), status=TxStatus.pending))
+        db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    profiles = ProfileCache()
+    with Session(engine) as db:
+        loaded = profiles.get_many(["u1", "u2", "u3", "u1"], db)
+
+    assert len(statements) == 2
+    assert (loaded["u1"].count, loaded["u1"].mean, loaded["u1"].home_country) == (3, 20.0, "US")
+    assert (loaded["u2"].count, loaded["u2"].mean, loaded["u2"].home_country) == (1, 5.0, None)
+    assert loaded["u3"].count == 0
+    assert len(profiles) == 3 and profiles.get("u1") is loaded["u1"]
+
+
+def test_unpersisted_approvals_do_not_reach_the_detection_caches():
+    from models.transaction_model import Transaction
+    from services.merchant_sketch import MERCHANT_SKETCHES
+    from services.profile_cache import PROFILE_CACHE
+    from services.transaction_service import post_transaction
+
+    PROFILE_CACHE.setdefault("u-unpersisted")
+    try:
+        post_transaction(Transaction(
+            transaction_id="t1", user_id="u-unpersisted", amount=10.0, currency="USD",
+            merchant="Grocer", transaction_date=datetime(2026, 1, 9, 12),
+        ))
+        assert PROFILE_CACHE.get("u-unpersisted").count == 0
+        assert MERCHANT_SKETCHES.is_novel("u-unpersisted", "Grocer")
+    finally:
+        PROFILE_CACHE.invalidate("u-unpersisted")
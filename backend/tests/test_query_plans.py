@@ -0,0 +1,134 @@
+"""
+Query-plan regression tests: apply the migrations to an empty database and
+check that every hot query is answered from an index rather than a full
+table scan (or an extra sort). Runs on SQLite by default; set
+TEST_POSTGRES_URL to a disposable database to check the Postgres plans too.
+"""
+
+import json
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select
+
+from db.db import Base
+from db.migrations import discover, migrate, pending
+from models.idempotency import IdempotencyKeyDB
+from models.ledger import TransactionLedger
+from models.notifications import NotificationDB
+from models.Transcation import TransactionDB, TxStatus
+from providers.aggregates import daily_aggregates_query
+from providers.transactions import (
+    approval_update, detection_features_query, existing_approvals_query, list_transactions_query,
+)
+from services.export_service import export_query
+
+AT = datetime(2024, 6, 1, 12, 0)
+DAY = date(2024, 6, 1)
+approved = (TransactionDB.user_id == "u1", TransactionDB.status == TxStatus.approved)
+
+# name -> (statement, whether the index must also provide the ORDER BY)
+HOT_QUERIES = {
+    "list_first_page": (list_transactions_query(50), True),
+    "list_next_page": (list_transactions_query(50, after=(DAY, 1000)), True),
+    "list_by_status": (list_transactions_query(50, status=TxStatus.pending), True),
+    "list_by_status_next_page": (list_transactions_query(50, after=(DAY, 1000), status=TxStatus.pending), True),
+    "list_by_vendor": (list_transactions_query(50, vendor="acme"), True),
+    "list_date_range": (list_transactions_query(50, date_from=DAY - timedelta(days=30), date_to=DAY), True),
+    "detection_features": (detection_features_query("u1", AT), False),
+    "profile_totals": (
+        select(func.count(TransactionDB.id), func.sum(TransactionDB.amount), func.max(TransactionDB.tx_ts))
+        .where(*approved),
+        False,
+    ),
+    "profile_countries": (
+        select(TransactionDB.country, func.count(TransactionDB.id))
+        .where(*approved, TransactionDB.country.isnot(None))
+        .group_by(TransactionDB.country),
+        False,
+    ),
+    "recent_transactions": (
+        select(TransactionDB.vendor, TransactionDB.amount, TransactionDB.category, TransactionDB.tx_date)
+        .where(TransactionDB.tx_date >= DAY - timedelta(days=2))
+        .order_by(TransactionDB.tx_date.desc())
+        .limit(3),
+        True,
+    ),
+    "export_transactions": (export_query("transactions", DAY - timedelta(days=30), DAY), True),
+    "export_ledger": (export_query("ledger", DAY - timedelta(days=30), DAY), True),
+    "approve_batch": (approval_update([1, 2, 3]), False),
+    "existing_approvals": (existing_approvals_query([1, 2, 3]), False),
+    "ledger_by_tx": (select(TransactionLedger).where(TransactionLedger.tx_id == 1), False),
+    "notifications_for_user": (
+        select(NotificationDB).where(NotificationDB.user_id == "u1").order_by(NotificationDB.created_at.desc()).limit(50),
+        True,
+    ),
+    "idempotency_key": (
+        select(IdempotencyKeyDB).where(IdempotencyKeyDB.scope == "create_trx", IdempotencyKeyDB.key == "k"),
+        False,
+    ),
+    "daily_aggregates": (daily_aggregates_query(DAY - timedelta(days=29), DAY), True),
+    "daily_aggregates_by_category": (daily_aggregates_query(DAY - timedelta(days=29), DAY, "category"), True),
+    "idempotency_purge": (select(IdempotencyKeyDB.id).where(IdempotencyKeyDB.expires_at <= AT), False),
+}
+
+_BARE_SCAN = re.compile(r"^SCAN (\w+)$")  # "SCAN t USING [COVERING] INDEX ..." is fine
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    migrate(engine, log=lambda msg: None)
+    yield engine
+    engine.dispose()
+
+
+def _sql(engine, stmt) -> str:
+    return str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def test_migrations_are_idempotent(sqlite_engine):
+    assert pending(sqlite_engine) == []
+    assert migrate(sqlite_engine, log=lambda msg: None) == []
+    assert [m.version for m in discover()] == sorted({m.version for m in discover()})
+
+
+def test_migrations_match_models(sqlite_engine):
+    """Every table, column and named index declared on the models exists after migrating."""
+    inspector = inspect(sqlite_engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        assert set(table.columns.keys()) <= columns, f"{table.name} is missing columns"
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        expected = {i.name for i in table.indexes}
+        assert expected <= indexes, f"{table.name} is missing indexes {expected - indexes}"
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_sqlite_plan_uses_index(sqlite_engine, name):
+    stmt, ordered = HOT_QUERIES[name]
+    with sqlite_engine.connect() as conn:
+        plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + _sql(sqlite_engine, stmt))]
+    scans = [step for step in plan if _BARE_SCAN.match(step)]
+    assert not scans, f"{name} scans a whole table: {plan}"
+    if ordered:
+        assert not any("TEMP B-TREE FOR ORDER BY" in step for step in plan), f"{name} sorts in memory: {plan}"
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_postgres_plan_uses_index(postgres_engine, name):
+    stmt, _ = HOT_QUERIES[name]
+    with postgres_engine.connect() as conn:
+        # empty tables would otherwise make a sequential scan the cheapest plan
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        raw = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + _sql(postgres_engine, stmt)).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    seq_scans = [n["Relation Name"] for n in _plan_nodes(plan[0]["Plan"]) if n["Node Type"] == "Seq Scan"]
+    assert not seq_scans, f"{name} sequentially scans {seq_scans}"
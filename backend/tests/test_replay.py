@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+from models.transaction_model import Transaction
+from scripts.replay_transactions import replay
+
+T0 = datetime(2026, 1, 9, 8, 0)
+
+
+def _transaction(i: int, merchant: str, amount: float) -> Transaction:
+    return Transaction(
+        transaction_id=f"t{i}", user_id="u1", amount=amount, currency="USD", merchant=merchant,
+        category="food", transaction_date=T0 + timedelta(hours=i),
+    )
+
+
+def test_replay_flags_only_the_first_payment_to_a_new_merchant():
+    history = [_transaction(i, "Grocer", 100.0) for i in range(5)]
+    # a large first payment to Bakery is flagged; once a Bakery payment is
+    # approved the next large one is not novel any more
+    later = [_transaction(5, "Bakery", 250.0), _transaction(6, "Bakery", 90.0), _transaction(7, "Bakery", 250.0)]
+
+    result = replay(history + later, max_users=10, progress_every=0)
+
+    assert result["flagged"] == 1
+    assert result["rule_hits"]["novel_merchant"] == 1
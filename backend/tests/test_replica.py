@@ -0,0 +1,70 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from db import replica
+from db.replica import LAST_WRITE_COOKIE, READ_ROUTING, ReplicaHealth, mark_write
+
+
+class _FakeEngine:
+    """Async engine stand-in reporting a fixed Postgres lag, or failing to connect."""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, lag_seconds: float | None):
+        self.lag_seconds = lag_seconds
+
+    @asynccontextmanager
+    async def connect(self):
+        if self.lag_seconds is None:
+            raise ConnectionError("replica down")
+
+        async def scalar(query):
+            return self.lag_seconds
+
+        yield SimpleNamespace(scalar=scalar)
+
+
+def _request(cookie: str | None = None) -> Request:
+    headers = [(b"cookie", f"{LAST_WRITE_COOKIE}={cookie}".encode())] if cookie is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def health(monkeypatch):
+    health = ReplicaHealth(configured=True)
+    monkeypatch.setattr(replica, "REPLICA_HEALTH", health)
+    monkeypatch.setattr(replica, "ReadSessionLocal", "replica-sessions")
+    monkeypatch.setattr(replica, "SessionLocal", "primary-sessions")
+    return health
+
+
+def test_read_your_writes_cookie_pins_reads_to_the_primary(health):
+    response = Response()
+    mark_write(response)
+    written_at = response.headers["set-cookie"].split(";")[0].split("=", 1)[1]
+    before = READ_ROUTING.get(target="primary", reason="read_your_writes")
+
+    assert replica._route(_request(written_at)) == "primary"
+    assert READ_ROUTING.get(target="primary", reason="read_your_writes") == before + 1
+    assert replica._route(_request(f"{time.time() - replica.DB_READ_YOUR_WRITES_SECONDS - 1:.3f}")) == "replica"
+    assert replica._route(_request("garbage")) == "replica"
+    assert replica._route(_request()) == "replica"
+
+
+@pytest.mark.parametrize("lag_seconds", [replica.DB_REPLICA_MAX_LAG_SECONDS + 1, None], ids=["lagging", "down"])
+def test_unusable_replica_falls_back_to_the_primary(health, lag_seconds):
+    assert replica.read_session_factory() == "replica-sessions"
+
+    asyncio.run(health.check(engine=_FakeEngine(lag_seconds)))
+    assert not health.usable()
+    assert replica._route(_request()) == "primary"
+    assert replica.read_session_factory() == "primary-sessions"
+
+    asyncio.run(health.check(engine=_FakeEngine(0.0)))
+    assert replica.read_session_factory() == "replica-sessions"
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from models.transaction_model import Transaction
+from services import rule_engine
+from services.burst_counter import BurstCounter
+import services.detection_services  # noqa: F401  registers the detection rules
+from services.merchant_sketch import MerchantSketchStore
+from services.profile_cache import ProfileCache
+from services.rule_engine import DetectionContext, Rule, compile_plan, get_rule_stats
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Test features `a` and `b` that record every fetch."""
+    calls = []
+    for name in ("a", "b"):
+        monkeypatch.setitem(rule_engine.FEATURES, f"test_{name}", lambda t, ctx, name=name: calls.append(name) or 1)
+    return calls
+
+
+def _rules():
+    fire = lambda t, f: "fired"
+    return [
+        Rule("first", ("test_a",), fire),
+        Rule("second", ("test_a", "test_b"), fire),
+        Rule("third", ("test_b",), fire),
+    ]
+
+
+def test_each_feature_is_fetched_once_by_the_first_rule_needing_it(fetched):
+    plan = compile_plan(_rules(), risk_threshold=None)
+
+    assert [fetch for _, fetch in plan.steps] == [("test_a",), ("test_b",), ()]
+    assert plan.evaluate(None, DetectionContext()) == (3.0, ["fired"] * 3)
+    assert fetched == ["a", "b"]
+
+
+def test_evaluation_stops_once_the_risk_threshold_is_reached(fetched):
+    plan = compile_plan(_rules(), risk_threshold=1.0)
+
+    assert plan.evaluate(None, DetectionContext()) == (1.0, ["fired"])
+    # features of the skipped rules are never fetched
+    assert fetched == ["a"]
+
+
+def test_unregistered_feature_is_rejected():
+    with pytest.raises(ValueError, match="test_missing"):
+        compile_plan([Rule("broken", ("test_missing",), lambda t, f: None)])
+
+
+def test_rule_stats_count_evaluations_and_hits():
+    before = get_rule_stats()
+    transaction = Transaction(
+        transaction_id="t1", user_id="u1", amount=9000.0, currency="USD", merchant="Grocer",
+        category="food", transaction_date=datetime(2026, 1, 9, 12, 0),
+    )
+    context = DetectionContext(
+        db=None, profiles=ProfileCache(), bursts=BurstCounter(), merchants=MerchantSketchStore()
+    )
+    compile_plan(risk_threshold=None).evaluate(transaction, context)
+    after = get_rule_stats()
+
+    for name in after:
+        assert after[name]["evaluations"] == before[name]["evaluations"] + 1
+    assert after["high_amount"]["hits"] == before["high_amount"]["hits"] + 1
+    assert after["unusual_hour"]["hits"] == before["unusual_hour"]["hits"]
+    assert after["high_amount"]["total_seconds"] > before["high_amount"]["total_seconds"]
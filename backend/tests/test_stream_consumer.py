@@ -0,0 +1,145 @@
+import asyncio
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import stream_consumer
+from services.burst_counter import BURST_COUNTER
+from services.stream_consumer import DetectionConsumer, InProcessStream
+
+
+class _RecordingStream(InProcessStream):
+    def __init__(self):
+        super().__init__()
+        self.acked = []
+
+    async def ack(self, message_ids):
+        self.acked.extend(message_ids)
+
+
+def _payload(transaction_id: str, user_id: str = "u1") -> dict:
+    return {
+        "transaction_id": transaction_id, "user_id": user_id, "amount": 10.0, "currency": "USD",
+        "merchant": "Shop", "category": "food", "transaction_date": "2026-01-01T12:00:00",
+    }
+
+
+def _not_suspicious(transactions):
+    return [{"transaction_id": t.transaction_id, "suspicious": False, "reason": "Normal"} for t in transactions]
+
+
+async def _no_slow_path(transaction, reason):
+    pass
+
+
+def test_bad_messages_are_dead_lettered_without_failing_the_batch(monkeypatch):
+    monkeypatch.setattr(stream_consumer, "_score", _not_suspicious)
+    approved = []
+
+    def fast_path(transaction):
+        if transaction.user_id == "broken":
+            raise RuntimeError("ledger down")
+        approved.append(transaction.transaction_id)
+
+    stream = _RecordingStream()
+    consumer = DetectionConsumer(stream, slow_path=_no_slow_path, fast_path=fast_path)
+    messages = [
+        ("1", _payload("t1")),
+        ("2", {"transaction_id": "t2"}),
+        ("3", "not json"),
+        ("4", _payload("t4", user_id="broken")),
+        ("5", _payload("t5")),
+    ]
+    asyncio.run(consumer.process_batch(messages))
+
+    assert approved == ["t1", "t5"]
+    assert stream.acked == ["1", "2", "3", "4", "5"]
+    assert [message_id for message_id, _, _ in stream.dead_letters] == ["2", "3", "4"]
+    assert [v["transaction_id"] for v in stream.verdicts] == ["t1", "t4", "t5"]
+
+
+def test_suspicious_messages_are_acknowledged_after_the_slow_path(monkeypatch):
+    def flag_user_x(transactions):
+        return [
+            {"transaction_id": t.transaction_id, "suspicious": t.user_id == "x", "reason": "flagged"}
+            for t in transactions
+        ]
+
+    monkeypatch.setattr(stream_consumer, "_score", flag_user_x)
+
+    async def slow_path(transaction, reason):
+        if transaction.transaction_id == "t3":
+            raise RuntimeError("notification store down")
+
+    async def scenario():
+        stream = _RecordingStream()
+        consumer = DetectionConsumer(stream, slow_path=slow_path, fast_path=lambda t: None)
+        await consumer.process_batch([("1", _payload("t1")), ("2", _payload("t2", "x")), ("3", _payload("t3", "x"))])
+        acked_with_batch = list(stream.acked)
+        worker = asyncio.create_task(consumer._slow_path_worker())
+        await consumer._suspicious.join()
+        worker.cancel()
+        return acked_with_batch, stream.acked
+
+    acked_with_batch, acked = asyncio.run(scenario())
+    assert acked_with_batch == ["1"]
+    # the failed one stays pending for redelivery
+    assert acked == ["1", "2"]
+
+
+def test_a_burst_arriving_over_the_stream_is_flagged(monkeypatch):
+    monkeypatch.setattr(stream_consumer, "read_session_factory", lambda: (lambda: nullcontext(None)))
+    start = datetime(2026, 1, 9, 12, 0)
+    messages = [
+        (str(i), {**_payload(f"burst-{i}", user_id="stream-burst"),
+                  "transaction_date": (start + timedelta(minutes=i)).isoformat()})
+        for i in range(6)
+    ]
+
+    async def scenario():
+        consumer = DetectionConsumer(_RecordingStream(), slow_path=_no_slow_path, fast_path=lambda t: None)
+        await consumer.process_batch(messages)
+        return consumer.stream
+
+    try:
+        stream = asyncio.run(scenario())
+        assert [v["suspicious"] for v in stream.verdicts] == [False] * 5 + [True]
+        assert "Unusual burst" in stream.verdicts[-1]["reason"]
+        # the synchronous path sees the streamed traffic too
+        assert BURST_COUNTER.count("stream-burst", "10m", start + timedelta(minutes=6)) == 6
+    finally:
+        BURST_COUNTER.clear()
+
+
+def test_redis_stream_reclaims_stale_pending_entries(monkeypatch):
+    pytest.importorskip("redis")
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(stream_consumer, "STREAM_CLAIM_IDLE_MS", 1)
+    monkeypatch.setattr(stream_consumer, "STREAM_MAX_DELIVERIES", 2)
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        crashed = stream_consumer.RedisStream("redis://unused", "pod-a")
+        crashed._redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        survivor = stream_consumer.RedisStream("redis://unused", "pod-b")
+        survivor._redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        await crashed.start()
+        await crashed.publish(_payload("t1"))
+        crashed._reclaim_at = float("inf")
+        assert [m for m, _ in await crashed.read(10, 1)]  # read, never acknowledged
+
+        await asyncio.sleep(0.01)
+        reclaimed = await survivor.read(10, 1)
+        survivor._reclaim_at = 0.0
+        await asyncio.sleep(0.01)
+        exhausted = await survivor.read(10, 1)
+        dead = await survivor._redis.xrange(stream_consumer.STREAM_DEAD_LETTER_NAME)
+        pending = await survivor._redis.xpending(stream_consumer.STREAM_INGEST_NAME, stream_consumer.STREAM_GROUP)
+        return reclaimed, exhausted, dead, pending
+
+    reclaimed, exhausted, dead, pending = asyncio.run(scenario())
+    assert [payload["transaction_id"] for _, payload in reclaimed] == ["t1"]
+    assert exhausted == []
+    assert len(dead) == 1 and "deliveries" in dead[0][1]["error"]
+    assert pending["pending"] == 0
@@ -0,0 +1,31 @@
+from services.transaction_store import TransactionStore
+
+
+def _record(tx_id: str, user_id: str = "u1", status: str = "approved") -> dict:
+    return {"transaction_id": tx_id, "user_id": user_id, "status": status}
+
+
+def test_evicted_records_leave_every_index():
+    store = TransactionStore(capacity=2)
+    store.put(_record("t1", "u1", "approved"))
+    store.put(_record("t2", "u2", "blocked"))
+    store.put(_record("t3", "u2", "approved"))
+
+    assert len(store) == 2 and store.get("t1") is None
+    assert store.list(user_id="u1") == ([], 0)
+    assert store.list(status="approved") == ([_record("t3", "u2", "approved")], 1)
+    assert "u1" not in store._by_user
+    assert list(store._by_status["approved"]) == ["t3"]
+
+
+def test_status_update_moves_the_record_between_buckets():
+    store = TransactionStore()
+    store.put(_record("t1", status="blocked"))
+    store.put(_record("t2", status="blocked"))
+    store.put(_record("t1", status="approved"))
+
+    assert [r["transaction_id"] for r in store.list(status="blocked")[0]] == ["t2"]
+    assert store.list(status="approved") == ([_record("t1", status="approved")], 1)
+    # the rewrite made t1 the newest record
+    assert [r["transaction_id"] for r in store.list(user_id="u1")[0]] == ["t1", "t2"]
+    assert [r["transaction_id"] for r in store.list(user_id="u1", status="approved")[0]] == ["t1"]
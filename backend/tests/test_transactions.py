@@ -0,0 +1,114 @@
+import base64
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+
+from models.Transcation import TransactionDB, TxStatus
+from providers.transactions import create_transactions, list_transactions, transaction_ts
+from schemas.transaction import TransactionIn
+
+
+def _payloads():
+    # dates in different months land in different partitions on Postgres
+    days = [date(2026, 3, 5), date(2026, 1, 9), date(2026, 2, 1), date(2026, 1, 2)]
+    return [
+        TransactionIn(amount=Decimal("1.00"), vendor=f"vendor-{i}", category="food", date=day)
+        for i, day in enumerate(days)
+    ]
+
+
+def _assert_payload_order(engine):
+    with Session(engine) as db:
+        rows = create_transactions(db, _payloads())
+    assert [row.vendor for row in rows] == [f"vendor-{i}" for i in range(4)]
+
+
+def test_batch_insert_returns_rows_in_payload_order(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'transactions.db'}")
+    TransactionDB.__table__.create(engine)
+    _assert_payload_order(engine)
+
+
+def test_batch_insert_returns_rows_in_payload_order_on_postgres(postgres_engine):
+    _assert_payload_order(postgres_engine)
+
+
+def test_transaction_time_comes_from_the_payload():
+    now = datetime(2026, 3, 5, 14, 0)
+    payload = TransactionIn(amount=Decimal("1.00"), vendor="v", category="c", date=date(2026, 1, 9))
+    assert transaction_ts(payload, now) == datetime(2026, 1, 9)
+    assert transaction_ts(payload.model_copy(update={"time": time(8, 30)}), now) == datetime(2026, 1, 9, 8, 30)
+    aware = payload.model_copy(update={"time": time(8, 30, tzinfo=timezone(timedelta(hours=2)))})
+    assert transaction_ts(aware, now) == datetime(2026, 1, 9, 6, 30)
+    assert transaction_ts(payload.model_copy(update={"date": now.date()}), now) == now
+
+
+def _page_through(engine, page_size, **filters):
+    """Follow (tx_date, id) cursors the way /list_trx does; returns every page's ids."""
+    pages, after = [], None
+    with Session(engine) as db:
+        while True:
+            rows = list_transactions(db, page_size, after=after, **filters)
+            if not rows:
+                return pages
+            pages.append([row.id for row in rows])
+            after = (rows[-1].tx_date, rows[-1].id)
+
+
+def _assert_keyset_paging(engine):
+    # many rows share a date, so pages must break ties on id
+    days = [date(2026, 1, 9)] * 5 + [date(2026, 1, 8)] * 3 + [date(2026, 1, 10)]
+    with Session(engine) as db:
+        db.add_all(
+            TransactionDB(amount=Decimal("1.00"), vendor="shop" if i % 3 else "cafe", category="keyset",
+                          tx_date=day, status=TxStatus.pending if i == 2 else TxStatus.approved)
+            for i, day in enumerate(days)
+        )
+        db.commit()
+        rows = db.query(TransactionDB).filter(TransactionDB.category == "keyset").all()
+    expected = [row.id for row in sorted(rows, key=lambda r: (r.tx_date, r.id), reverse=True)]
+
+    try:
+        pages = _page_through(engine, 2, category="keyset")
+        assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+        assert [tx_id for page in pages for tx_id in page] == expected
+
+        filtered = {"category": "keyset", "vendor": "shop", "status": TxStatus.approved, "date_from": date(2026, 1, 9)}
+        matching = [
+            row.id for row in sorted(rows, key=lambda r: (r.tx_date, r.id), reverse=True)
+            if row.vendor == "shop" and row.status == TxStatus.approved and row.tx_date >= date(2026, 1, 9)
+        ]
+        assert len(matching) > 1
+        assert [tx_id for page in _page_through(engine, 1, **filtered) for tx_id in page] == matching
+    finally:
+        with Session(engine) as db:
+            db.execute(delete(TransactionDB).where(TransactionDB.category == "keyset"))
+            db.commit()
+
+
+def test_keyset_pages_have_no_gaps_or_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'transactions.db'}")
+    TransactionDB.__table__.create(engine)
+    _assert_keyset_paging(engine)
+
+
+def test_keyset_pages_have_no_gaps_or_duplicates_on_postgres(postgres_engine):
+    _assert_keyset_paging(postgres_engine)
+
+
+def test_list_cursor_round_trips_and_rejects_garbage():
+    router = pytest.importorskip("routers.transaction_router", exc_type=ImportError)
+    from fastapi import HTTPException
+
+    row = TransactionDB(id=42, tx_date=date(2026, 1, 9))
+    assert router._decode_cursor(router._encode_cursor(row)) == (date(2026, 1, 9), 42)
+    garbage = ["not-base64!"] + [
+        base64.urlsafe_b64encode(raw).decode() for raw in (b"no-separator", b"2026-13-40|1", b"2026-01-09|x")
+    ]
+    for cursor in garbage:
+        with pytest.raises(HTTPException) as excinfo:
+            router._decode_cursor(cursor)
+        assert excinfo.value.status_code == 400
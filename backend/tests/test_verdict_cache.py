@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from services.verdict_cache import VerdictCache
+
+
+def test_concurrent_requests_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"suspicious": False}
+
+    async def scenario():
+        cache = VerdictCache()
+        return await asyncio.gather(*(cache.get_or_compute("t1", compute) for _ in range(5)))
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert responses == [{"suspicious": False}] * 5
+
+
+def test_failed_computation_is_not_cached():
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("LLM down")
+        return {"suspicious": True}
+
+    async def scenario():
+        cache = VerdictCache()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("t1", compute)
+        assert cache.get("t1") is None
+        return await cache.get_or_compute("t1", compute)
+
+    assert asyncio.run(scenario()) == {"suspicious": True}
+    assert len(attempts) == 2
+
+
+def test_expired_and_invalidated_responses_are_recomputed():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    async def scenario():
+        expiring = VerdictCache(ttl_seconds=0)
+        await expiring.get_or_compute("t1", compute)
+        await expiring.get_or_compute("t1", compute)
+
+        cache = VerdictCache()
+        await cache.get_or_compute("t1", compute)
+        assert await cache.get_or_compute("t1", compute) == {"call": 3}
+        cache.invalidate("t1")
+        return await cache.get_or_compute("t1", compute)
+
+    assert asyncio.run(scenario()) == {"call": 4}
+    assert len(calls) == 4
@@ -0,0 +1,31 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from models.Transcation import TransactionDB, TxStatus
+from services import verification_service
+from services.burst_counter import BURST_COUNTER
+
+
+def test_new_transactions_are_verified_in_the_background(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'verify.db'}")
+    TransactionDB.__table__.create(engine)
+    with Session(engine) as db:
+        for amount in ("10.00", "9000.00"):
+            db.add(TransactionDB(user_id=None, amount=Decimal(amount), vendor="v", category="food",
+                                 tx_date=date(2026, 1, 9), tx_ts=datetime(2026, 1, 9, 12), status=TxStatus.pending))
+        db.commit()
+    monkeypatch.setattr(verification_service, "SessionLocal", sessionmaker(bind=engine))
+    locked = []
+    monkeypatch.setattr(verification_service, "lock_transaction_for_verification",
+                        lambda db, tx_id, reason: locked.append((tx_id, reason)))
+
+    for tx_id in (1, 2, 3):
+        verification_service.verify_new_transaction(tx_id)
+
+    assert [tx_id for tx_id, _ in locked] == [2]
+    assert "High transaction amount" in locked[0][1]
+    # transactions without a user share no burst window
+    assert BURST_COUNTER.count("", "10m", datetime(2026, 1, 9, 12, 1)) == 0